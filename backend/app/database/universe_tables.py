@@ -0,0 +1,253 @@
+"""
+Couche d'accès aux tables d'univers (mundo, fruity, trigga, roaster, sunshine)
+
+Les noms de tables ne sont jamais interpolés depuis l'entrée utilisateur :
+ils passent par une liste blanche, et chaque requête d'agrégation est
+construite une seule fois par (dialecte, univers, type de marquage) puis
+réutilisée telle quelle, ce qui permet au cache de compilation SQLAlchemy
+(et aux requêtes préparées du driver) de s'appliquer.
+
+Les regroupements se font sur la colonne entière chip_number (1-48) plutôt
+que sur la chaîne 'chipN', qui n'a plus à être analysée côté Python.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+# Liste blanche des tables d'univers
+UNIVERSE_TABLES = ('mundo', 'fruity', 'trigga', 'roaster', 'sunshine')
+
+# Numéro de chip normalisé (entier 1-48) utilisé pour tous les regroupements
+CHIP_COLUMN = 'chip_number'
+TOTAL_CHIPS = 48
+
+_CHIP_DIGITS = re.compile(r'(-?\d+)')
+
+# Colonne de marquage par type (None = agrégation par chip uniquement)
+MARKING_COLUMNS = {
+    'chip': None,
+    'combination': 'combination_id',
+    'denomination': 'denomination',
+    'tome': 'tome',
+    'forme': 'forme',
+    'granque': 'granque_name',
+}
+
+# Colonnes renvoyées sous forme de liste (DISTINCT concaténé) pour chaque type
+DETAIL_COLUMNS = {
+    'chip': ('denomination', 'forme', 'tome', 'granque_name'),
+    'combination': ('denomination',),
+    'denomination': ('forme', 'tome'),
+    'tome': ('denomination',),
+    'forme': ('denomination',),
+    'granque': ('denomination',),
+}
+
+# Alias des colonnes agrégées dans les lignes de résultat
+LIST_ALIASES = {
+    'denomination': 'denominations',
+    'forme': 'formes',
+    'tome': 'tomes',
+    'granque_name': 'granques',
+}
+
+_STATEMENT_CACHE: Dict[Tuple[str, str, str], TextClause] = {}
+
+
+def validate_universe(universe: str) -> str:
+    """Retourne le nom de table validé ou lève ValueError"""
+    table = (universe or '').strip().lower()
+    if table not in UNIVERSE_TABLES:
+        raise ValueError(f"Univers inconnu: {universe}")
+    return table
+
+
+def validate_marking_type(marking_type: str) -> str:
+    """Retourne le type de marquage validé (chip par défaut)"""
+    return marking_type if marking_type in MARKING_COLUMNS else 'chip'
+
+
+def concat_distinct(column: str, dialect_name: str) -> str:
+    """Agrégat 'valeurs distinctes séparées par des virgules' selon le dialecte"""
+    if dialect_name == 'postgresql':
+        return f"STRING_AGG(DISTINCT CAST({column} AS TEXT), ',')"
+    return f"GROUP_CONCAT(DISTINCT {column})"
+
+
+def _build_marking_statement(table: str, marking_type: str, dialect_name: str) -> TextClause:
+    """Construit la requête d'agrégation par date pour un univers et un type de marquage"""
+    marking_column = MARKING_COLUMNS[marking_type]
+
+    group_columns = [CHIP_COLUMN] + ([marking_column] if marking_column else [])
+    select_parts = list(group_columns)
+    select_parts.append('COUNT(*) AS occurrence_count')
+    for column in DETAIL_COLUMNS[marking_type]:
+        select_parts.append(f"{concat_distinct(column, dialect_name)} AS {LIST_ALIASES[column]}")
+    if marking_type == 'chip':
+        select_parts.append('MIN(date_tirage) AS first_occurrence')
+        select_parts.append('MAX(date_tirage) AS last_occurrence')
+
+    group_clause = ', '.join(group_columns)
+    filters = ''.join(f"\n        AND {column} IS NOT NULL" for column in group_columns)
+
+    return text(f"""
+        SELECT {', '.join(select_parts)}
+        FROM {table}
+        WHERE date_tirage BETWEEN :date_start AND :date_end{filters}
+        GROUP BY {group_clause}
+        ORDER BY {group_clause}
+    """)
+
+
+def marking_statement(universe: str, marking_type: str, dialect_name: str) -> TextClause:
+    """Retourne la requête pré-compilée pour (dialecte, univers, type de marquage)"""
+    table = validate_universe(universe)
+    marking_type = validate_marking_type(marking_type)
+    key = (dialect_name, table, marking_type)
+
+    statement = _STATEMENT_CACHE.get(key)
+    if statement is None:
+        statement = _build_marking_statement(table, marking_type, dialect_name)
+        _STATEMENT_CACHE[key] = statement
+    return statement
+
+
+def fetch_marking_aggregates(
+    db: Session,
+    universe: str,
+    marking_type: str,
+    date_start: str,
+    date_end: str
+) -> List:
+    """Exécute l'agrégation d'un univers sur une plage de dates"""
+    statement = marking_statement(universe, marking_type, db.bind.dialect.name)
+    result = db.execute(statement, {
+        'date_start': date_start,
+        'date_end': date_end
+    })
+    return result.fetchall()
+
+
+def index_definitions(universe: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    Index composites (date_tirage, chip_number, colonne de marquage, colonnes de détail)
+    couvrant chaque requête d'agrégation pour permettre des index-only scans
+    """
+    table = validate_universe(universe)
+    definitions = []
+
+    for marking_type, marking_column in MARKING_COLUMNS.items():
+        columns = ['date_tirage', CHIP_COLUMN]
+        if marking_column:
+            columns.append(marking_column)
+        for column in DETAIL_COLUMNS[marking_type]:
+            if column not in columns:
+                columns.append(column)
+        definitions.append((f"idx_{table}_date_chipnum_{marking_type}", tuple(columns)))
+
+    return definitions
+
+
+def legacy_index_names(universe: str) -> List[str]:
+    """Anciens index construits sur la colonne texte 'chip'"""
+    table = validate_universe(universe)
+    return [f"idx_{table}_date_chip_{marking_type}" for marking_type in MARKING_COLUMNS]
+
+
+def normalize_chip_number(value) -> Optional[int]:
+    """
+    Convertit une valeur de chip ('chip12', '12', 'CHIP-12', 60...) en entier 1-48
+
+    Les numéros hors plage sont ramenés sur la matrice de Katula (modulo 48),
+    comme le faisait le mapping historique sur chip_id.
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        number = value
+    else:
+        match = _CHIP_DIGITS.search(str(value))
+        if not match:
+            return None
+        number = abs(int(match.group(1)))
+    if number < 1:
+        return None
+    return ((number - 1) % TOTAL_CHIPS) + 1
+
+
+def chip_number_sql(id_column: str = 'chip_id') -> str:
+    """
+    Expression SQL du chip normalisé d'une ligne de combinations
+
+    chip_number s'il est renseigné, sinon chip_id ramené sur 1-48 comme par
+    normalize_chip_number : les lignes non migrées ou insérées sans
+    chip_number restent placées sur leur vrai chip.
+    """
+    return (f"COALESCE({CHIP_COLUMN}, CASE WHEN {id_column} >= 1 "
+            f"THEN (({id_column} - 1) % {TOTAL_CHIPS}) + 1 END)")
+
+
+def ensure_chip_number_column(connection, table: str, source_columns=('chip',)) -> int:
+    """
+    Ajoute la colonne entière chip_number si besoin, la remplit et l'indexe
+
+    Le remplissage se fait par valeur distincte de la colonne source : une
+    seule conversion Python par valeur, puis un UPDATE ensembliste.
+    Retourne le nombre de lignes renseignées.
+    """
+    columns = {column['name'] for column in inspect(connection).get_columns(table)}
+    if CHIP_COLUMN not in columns:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {CHIP_COLUMN} INTEGER"))
+
+    filled = 0
+    for source in source_columns:
+        if source not in columns:
+            continue
+        values = connection.execute(text(f"""
+            SELECT DISTINCT {source} FROM {table}
+            WHERE {CHIP_COLUMN} IS NULL AND {source} IS NOT NULL
+        """)).scalars().all()
+
+        for value in values:
+            number = normalize_chip_number(value)
+            if number is None:
+                continue
+            result = connection.execute(text(f"""
+                UPDATE {table} SET {CHIP_COLUMN} = :number
+                WHERE {source} = :value AND {CHIP_COLUMN} IS NULL
+            """), {'number': number, 'value': value})
+            filled += result.rowcount or 0
+
+    connection.execute(text(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{CHIP_COLUMN} ON {table} ({CHIP_COLUMN})"
+    ))
+    return filled
+
+
+def ensure_indexes(connection, universes=UNIVERSE_TABLES) -> Dict[str, List[str]]:
+    """
+    Prépare les tables d'univers existantes : colonne chip_number remplie,
+    anciens index sur la colonne texte supprimés, index composites créés
+    """
+    existing_tables = set(inspect(connection).get_table_names())
+    created = {}
+
+    for universe in universes:
+        table = validate_universe(universe)
+        if table not in existing_tables:
+            continue
+
+        ensure_chip_number_column(connection, table)
+        for index_name in legacy_index_names(table):
+            connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+        created[table] = []
+        for index_name, columns in index_definitions(table):
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({', '.join(columns)})"
+            ))
+            created[table].append(index_name)
+
+    return created
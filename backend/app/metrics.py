@@ -0,0 +1,328 @@
+"""
+Métriques de performance au format Prometheus
+
+- MetricsMiddleware mesure chaque requête HTTP : latence par route (modèle
+  de chemin, pas l'URL brute), nombre et durée des requêtes SQL exécutées
+  pendant la requête (hooks SQLAlchemy, installés par install_db_hooks) ;
+- timer() et observe() instrumentent n'importe quel bloc de code, par
+  exemple l'inférence des modèles ;
+- register_cache() expose les hits/misses d'un cache à partir de sa
+  méthode stats().
+
+Les requêtes plus lentes que SLOW_REQUEST_MS (variable d'environnement,
+1000 ms par défaut) sont conservées avec la liste de leurs requêtes SQL
+(slow_requests()). render() produit le texte servi sur /metrics.
+
+Les valeurs sont propres au processus : avec plusieurs workers, chaque
+worker expose ses propres compteurs.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PREFIX = "eazzylotto_"
+
+# Bornes des histogrammes de durée (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bornes du nombre de requêtes SQL par requête HTTP
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_LOG_SIZE = 50
+# Requêtes SQL conservées par requête HTTP (pour le journal des lentes)
+MAX_TRACKED_QUERIES = 100
+MAX_STATEMENT_LENGTH = 300
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], le: Optional[str] = None) -> str:
+    pairs = ['%s="%s"' % (name, _escape(str(value))) for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append('le="%s"' % le)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Histogramme cumulatif à labels (sémantique Prometheus)"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [compteurs par borne..., somme, total]
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, _format_value(bound))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, '+Inf')} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {round(values[-2], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    """Compteur monotone à labels"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+_metrics: Dict[str, Any] = {}
+_caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name: str, help_text: str = "", labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+    """Histogramme PREFIX+name, créé au premier appel"""
+    name = PREFIX + name
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = Histogram(name, help_text or name, labels, buckets)
+        return _metrics[name]
+
+
+def counter(name: str, help_text: str = "", labels: Tuple[str, ...] = ()) -> Counter:
+    """Compteur PREFIX+name, créé au premier appel"""
+    name = PREFIX + name
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = Counter(name, help_text or name, labels)
+        return _metrics[name]
+
+
+def observe(name: str, seconds: float, **labels):
+    """Enregistre une durée (secondes) dans l'histogramme name"""
+    histogram(name, labels=tuple(sorted(labels))).observe(seconds, **labels)
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """Mesure la durée d'un bloc dans l'histogramme name (même en cas d'erreur)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]):
+    """Expose un cache dont stats() renvoie au moins hits, misses et size"""
+    _caches[name] = stats
+
+
+REQUEST_LATENCY = histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP par route", ("method", "route", "status")
+)
+REQUEST_QUERIES = histogram(
+    "http_request_db_queries", "Nombre de requêtes SQL par requête HTTP", ("route",), QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = histogram(
+    "http_request_db_duration_seconds", "Temps passé en SQL par requête HTTP", ("route",)
+)
+DB_QUERY_LATENCY = histogram(
+    "db_query_duration_seconds", "Durée des requêtes SQL par type d'instruction", ("statement",)
+)
+SLOW_REQUESTS = counter(
+    "http_slow_requests_total", f"Requêtes HTTP plus lentes que {SLOW_REQUEST_MS:.0f} ms", ("route",)
+)
+
+
+# --- Requêtes SQL -----------------------------------------------------------
+
+# Suivi de la requête HTTP en cours (propagé aux threads des endpoints sync)
+_current_request: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_request", default=None)
+_db_hooks_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    DB_QUERY_LATENCY.observe(elapsed, statement=verb)
+
+    request = _current_request.get()
+    if request is not None:
+        request["db_queries"] += 1
+        request["db_seconds"] += elapsed
+        if len(request["queries"]) < MAX_TRACKED_QUERIES:
+            request["queries"].append({
+                "sql": " ".join(statement.split())[:MAX_STATEMENT_LENGTH],
+                "ms": round(elapsed * 1000, 2)
+            })
+
+
+def install_db_hooks():
+    """Mesure toutes les requêtes SQL de tous les moteurs SQLAlchemy (une seule fois)"""
+    global _db_hooks_installed
+    if _db_hooks_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _db_hooks_installed = True
+
+
+# --- Requêtes HTTP ----------------------------------------------------------
+
+_slow_requests: deque = deque(maxlen=SLOW_REQUEST_LOG_SIZE)
+
+
+def _route_label(scope) -> str:
+    """Modèle de chemin de la route servie (cardinalité bornée)"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for candidate in getattr(app, "routes", []):
+            if getattr(candidate, "endpoint", None) is endpoint:
+                return candidate.path
+    if scope["path"].startswith("/api"):
+        return "<unmatched>"
+    return "<static>"
+
+
+class MetricsMiddleware:
+    """Latence, requêtes SQL et journal des requêtes lentes, par requête HTTP"""
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = {"db_queries": 0, "db_seconds": 0.0, "queries": []}
+        token = _current_request.set(request)
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_request.reset(token)
+            elapsed = time.perf_counter() - start
+            route = _route_label(scope)
+            REQUEST_LATENCY.observe(elapsed, method=scope["method"], route=route, status=status["code"])
+            REQUEST_QUERIES.observe(request["db_queries"], route=route)
+            REQUEST_DB_TIME.observe(request["db_seconds"], route=route)
+
+            elapsed_ms = elapsed * 1000
+            if elapsed_ms >= self.slow_request_ms:
+                SLOW_REQUESTS.inc(route=route)
+                _slow_requests.append({
+                    "timestamp": datetime.now().isoformat(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status["code"],
+                    "duration_ms": round(elapsed_ms, 1),
+                    "db_queries": request["db_queries"],
+                    "db_ms": round(request["db_seconds"] * 1000, 1),
+                    "queries": request["queries"]
+                })
+                print(f"🐢 Requête lente {scope['method']} {scope['path']}: {elapsed_ms:.0f} ms, "
+                      f"{request['db_queries']} requêtes SQL ({request['db_seconds'] * 1000:.0f} ms)")
+
+
+def slow_requests() -> List[Dict[str, Any]]:
+    """Dernières requêtes lentes, la plus récente en premier"""
+    return list(reversed(_slow_requests))
+
+
+# --- Exposition -------------------------------------------------------------
+
+def _cache_samples() -> List[str]:
+    rows = []
+    for name, stats in sorted(_caches.items()):
+        try:
+            rows.append((name, stats()))
+        except Exception as e:
+            print(f"⚠️ Statistiques du cache {name} indisponibles: {e}")
+
+    lines = []
+    for metric, key, kind, help_text in (
+        ("cache_hits_total", "hits", "counter", "Lectures de cache réussies"),
+        ("cache_misses_total", "misses", "counter", "Lectures de cache manquées"),
+        ("cache_entries", "size", "gauge", "Entrées en cache"),
+        ("cache_hit_ratio", "hit_rate", "gauge", "Taux de hit du cache"),
+    ):
+        lines += [f"# HELP {PREFIX}{metric} {help_text}", f"# TYPE {PREFIX}{metric} {kind}"]
+        for name, stats in rows:
+            if stats.get(key) is not None:
+                lines.append(f'{PREFIX}{metric}{{cache="{name}"}} {_format_value(stats[key])}')
+    return lines
+
+
+def render() -> str:
+    """Toutes les métriques au format texte Prometheus (version 0.0.4)"""
+    with _registry_lock:
+        metrics = [_metrics[name] for name in sorted(_metrics)]
+    lines = []
+    for metric in metrics:
+        lines += metric.samples()
+    lines += _cache_samples()
+    return "\n".join(lines) + "\n"
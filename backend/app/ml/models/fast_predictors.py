@@ -0,0 +1,234 @@
+"""
+Prédicteurs rapides en NumPy (sans TensorFlow)
+
+Trois modèles légers sur les codes d'un attribut (voir SequenceDataset) :
+- MarkovPredictor : n-gramme d'ordre k avec lissage de Laplace et repli sur
+  les ordres inférieurs quand le contexte n'a jamais été vu ;
+- LogisticPredictor : régression logistique multinomiale sur les k valeurs
+  précédentes encodées en one-hot ;
+- EnsemblePredictor : moyenne des distributions pondérée par la précision de
+  chaque modèle sur la fin de l'historique.
+
+Un contexte de k valeurs n'a que len(classes)**k états possibles : les deux
+modèles s'entraînent sur la table (contexte unique -> histogramme des
+cibles) plutôt que sur chaque fenêtre, ce qui ramène l'entraînement à
+quelques millisecondes quel que soit le nombre de combinaisons.
+"""
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from app.ml.sequence_dataset import SequenceDataset
+
+# Au-delà de ce nombre de contextes possibles, la table est construite par tri
+MAX_DENSE_CONTEXTS = 1_000_000
+
+
+def context_table(codes: np.ndarray, order: int, num_classes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Contextes distincts et histogramme des valeurs suivantes
+
+    Retourne (contexts, counts) : contexts[i] est une fenêtre de `order`
+    codes et counts[i, c] le nombre de fois où c l'a suivie.
+    """
+    X, y = SequenceDataset.windows(codes, order)
+    if len(y) == 0:
+        return np.empty((0, order), dtype=np.int64), np.empty((0, num_classes))
+
+    # Chaque fenêtre devient un entier en base num_classes
+    index = np.zeros(len(y), dtype=np.int64)
+    for j in range(order):
+        index = index * num_classes + X[:, j]
+
+    if num_classes ** order <= MAX_DENSE_CONTEXTS:
+        counts = np.bincount(index * num_classes + y, minlength=num_classes ** (order + 1))
+        counts = counts.reshape(num_classes ** order, num_classes)
+        keys = np.flatnonzero(counts.sum(axis=1))
+        counts = counts[keys]
+    else:
+        keys, inverse = np.unique(index, return_inverse=True)
+        counts = np.bincount(inverse * num_classes + y, minlength=len(keys) * num_classes)
+        counts = counts.reshape(len(keys), num_classes)
+
+    # Décodage des entiers en fenêtres de codes
+    contexts = np.empty((len(keys), order), dtype=np.int64)
+    for j in range(order - 1, -1, -1):
+        keys, contexts[:, j] = np.divmod(keys, num_classes)
+    return contexts, counts.astype(np.float64)
+
+
+class MarkovPredictor:
+    """
+    Modèle n-gramme : P(valeur | k valeurs précédentes)
+    """
+
+    name = "markov"
+
+    def __init__(self, order: int = 3, alpha: float = 1.0):
+        self.order = order
+        self.alpha = alpha
+        self.num_classes = 0
+        self.tables: List[Dict[tuple, np.ndarray]] = []
+
+    def fit(self, codes: np.ndarray, num_classes: int) -> "MarkovPredictor":
+        """Compte les transitions pour chaque ordre 0..k"""
+        self.num_classes = num_classes
+        self.tables = []
+        for k in range(self.order + 1):
+            if k == 0:
+                counts = np.bincount(codes, minlength=num_classes).astype(np.float64)
+                self.tables.append({(): counts})
+                continue
+            contexts, counts = context_table(codes, k, num_classes)
+            self.tables.append({tuple(context): row for context, row in zip(contexts.tolist(), counts)})
+        return self
+
+    def predict_proba(self, history: np.ndarray) -> np.ndarray:
+        """Distribution de la valeur suivante, contexte le plus long connu"""
+        history = [int(code) for code in history[-self.order:]] if self.order else []
+        for k in range(min(self.order, len(history)), -1, -1):
+            counts = self.tables[k].get(tuple(history[len(history) - k:]))
+            if counts is not None:
+                smoothed = counts + self.alpha
+                return smoothed / smoothed.sum()
+        return np.full(self.num_classes, 1.0 / self.num_classes)
+
+
+class LogisticPredictor:
+    """
+    Régression logistique multinomiale sur les valeurs décalées (lags)
+    """
+
+    name = "regression"
+
+    def __init__(self, lags: int = 3, l2: float = 1e-3, learning_rate: float = 0.5, iterations: int = 200):
+        self.lags = lags
+        self.l2 = l2
+        self.learning_rate = learning_rate
+        self.iterations = iterations
+        self.num_classes = 0
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    def _features(self, contexts: np.ndarray) -> np.ndarray:
+        """One-hot des lags : (n, lags * num_classes)"""
+        n = len(contexts)
+        features = np.zeros((n, self.lags * self.num_classes))
+        columns = contexts + np.arange(self.lags) * self.num_classes
+        features[np.arange(n)[:, None], columns] = 1.0
+        return features
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def fit(self, codes: np.ndarray, num_classes: int) -> "LogisticPredictor":
+        """Descente de gradient sur la table des contextes pondérée par les comptes"""
+        self.num_classes = num_classes
+        self.weights = np.zeros((self.lags * num_classes, num_classes))
+        self.bias = np.zeros(num_classes)
+
+        contexts, counts = context_table(codes, self.lags, num_classes)
+        total = counts.sum()
+        if total == 0:
+            return self
+
+        features = self._features(contexts)
+        row_weights = counts.sum(axis=1, keepdims=True)
+        targets = counts / total  # Distribution empirique des cibles, pondérée
+
+        prior = counts.sum(axis=0) + 1.0
+        self.bias = np.log(prior / prior.sum())
+
+        for _ in range(self.iterations):
+            probs = self._softmax(features @ self.weights + self.bias)
+            gradient = probs * (row_weights / total) - targets
+            self.weights -= self.learning_rate * (features.T @ gradient + self.l2 * self.weights)
+            self.bias -= self.learning_rate * gradient.sum(axis=0)
+        return self
+
+    def predict_proba(self, history: np.ndarray) -> np.ndarray:
+        """Distribution de la valeur suivante"""
+        if len(history) < self.lags:
+            return self._softmax(self.bias)
+        context = np.asarray(history[-self.lags:], dtype=np.int64)[None, :]
+        return self._softmax(self._features(context) @ self.weights + self.bias)[0]
+
+
+class EnsemblePredictor:
+    """
+    Moyenne pondérée des distributions de plusieurs modèles
+    """
+
+    name = "ensemble"
+
+    def __init__(self, models: List[Any], weights: Optional[List[float]] = None):
+        self.models = models
+        self.weights = np.asarray(weights if weights is not None else [1.0] * len(models), dtype=np.float64)
+
+    def predict_proba(self, history: np.ndarray) -> np.ndarray:
+        weights = self.weights / self.weights.sum()
+        return sum(w * model.predict_proba(history) for w, model in zip(weights, self.models))
+
+
+def holdout_probabilities(model: Any, codes: np.ndarray, num_classes: int, holdout: int) -> Optional[np.ndarray]:
+    """
+    Distributions prédites pour les `holdout` dernières valeurs
+
+    Le modèle est entraîné sur ce qui précède ; None si l'historique est trop
+    court pour évaluer.
+    """
+    context = getattr(model, "order", getattr(model, "lags", 0))
+    if holdout <= 0 or len(codes) - holdout <= context:
+        return None
+    model.fit(codes[:-holdout], num_classes)
+    return np.array([
+        model.predict_proba(codes[i - context:i])
+        for i in range(len(codes) - holdout, len(codes))
+    ])
+
+
+def fit_models(codes: np.ndarray, num_classes: int, order: int = 3, holdout: int = 200) -> Dict[str, Dict[str, Any]]:
+    """
+    Entraîne Markov, régression et ensemble sur un historique
+
+    Chaque modèle est d'abord évalué sur les `holdout` dernières valeurs, puis
+    réentraîné sur tout l'historique ; les précisions servent de poids à
+    l'ensemble.
+    """
+    holdout = min(holdout, len(codes) // 5)
+    targets = codes[len(codes) - holdout:]
+    models = [MarkovPredictor(order=order), LogisticPredictor(lags=order)]
+
+    results, probabilities = {}, {}
+    for model in models:
+        probabilities[model.name] = holdout_probabilities(model, codes, num_classes, holdout)
+        accuracy = None
+        if probabilities[model.name] is not None:
+            accuracy = float(np.mean(probabilities[model.name].argmax(axis=1) == targets))
+        results[model.name] = {"model": model.fit(codes, num_classes), "validation_accuracy": accuracy}
+
+    weights = [max(results[model.name]["validation_accuracy"] or 0.0, 1e-3) for model in models]
+    ensemble = EnsemblePredictor(models, weights)
+
+    ensemble_accuracy = None
+    if all(p is not None for p in probabilities.values()):
+        normalized = ensemble.weights / ensemble.weights.sum()
+        blended = sum(w * probabilities[model.name] for w, model in zip(normalized, models))
+        ensemble_accuracy = float(np.mean(blended.argmax(axis=1) == targets))
+    results["ensemble"] = {"model": ensemble, "validation_accuracy": ensemble_accuracy}
+
+    return results
+
+
+def top_predictions(probabilities: np.ndarray, classes: List[str], top_k: int) -> List[Dict[str, Any]]:
+    """Valeurs les plus probables au format de LSTMPredictor.predict_next"""
+    ranking = np.argsort(probabilities)[::-1][:top_k]
+    return [
+        {
+            "predicted_value": classes[code],
+            "confidence": round(float(probabilities[code]), 4),
+            "confidence_percent": round(float(probabilities[code]) * 100, 2)
+        }
+        for code in ranking
+    ]
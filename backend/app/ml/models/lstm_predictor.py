@@ -1,8 +1,7 @@
 import numpy as np
-import pandas as pd
 import os
 import json
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime
@@ -12,89 +11,60 @@ from tensorflow.keras.layers import LSTM, Dense, Dropout, Embedding
 from tensorflow.keras.optimizers import Adam
 from sklearn.preprocessing import LabelEncoder, MinMaxScaler
 import joblib
+from app.ml.sequence_dataset import SequenceDataset
+from app.ml.models import numpy_lstm
 
 class LSTMPredictor:
     """
     Réseau LSTM pour prédictions sophistiquées des attributs de loterie
     """
     
+    # Époques d'affinage d'un modèle existant sur les nouvelles lignes
+    FINE_TUNE_EPOCHS = 5
+    
     def __init__(self, attribute_type: str, universe: str = "mundo"):
         self.attribute_type = attribute_type
         self.universe = universe
         self.model = None
+        self.metadata = {}
         self.label_encoder = LabelEncoder()
         self.scaler = MinMaxScaler()
         self.sequence_length = 10  # Longueur des séquences pour LSTM
+        self.max_training_rows = None  # Historique complet (None) ou N lignes les plus récentes
         self.model_path = f"backend/app/ml/models/saved/{universe}_{attribute_type}_lstm.h5"
         self.encoder_path = f"backend/app/ml/models/saved/{universe}_{attribute_type}_encoder.pkl"
         self.scaler_path = f"backend/app/ml/models/saved/{universe}_{attribute_type}_scaler.pkl"
+        self.meta_path = f"backend/app/ml/models/saved/{universe}_{attribute_type}_lstm_meta.json"
+        self.export_path = numpy_lstm.NumpyLSTMPredictor.path_for(attribute_type, universe)
         
         # Créer le dossier de sauvegarde s'il n'existe pas
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
     
-    def prepare_data(self, db: Session) -> Tuple[np.ndarray, np.ndarray, List[str]]:
-        """Prépare les données pour l'entraînement LSTM"""
+    def prepare_codes(self, db: Session, max_rows: int = None) -> Tuple[np.ndarray, List[str], int]:
+        """Historique encodé de l'attribut (int32), ses valeurs possibles et le dernier combination_id lu"""
         
-        print(f"🔄 Préparation des données LSTM pour {self.attribute_type}...")
-        
-        # Récupérer les données historiques
-        if self.attribute_type in ['forme', 'engine', 'beastie', 'tome', 'chip']:
-            query = f"""
-                SELECT 
-                    c.{self.attribute_type} as attribute_value,
-                    c.combination_id,
-                    ROW_NUMBER() OVER (ORDER BY c.combination_id ASC) as sequence_order
-                FROM combinations c 
-                WHERE c.univers = :universe 
-                AND c.{self.attribute_type} IS NOT NULL
-                ORDER BY c.combination_id ASC
-                LIMIT 2000
-            """
-        elif self.attribute_type == 'parite':
-            query = """
-                SELECT 
-                    p.parite as attribute_value,
-                    c.combination_id,
-                    ROW_NUMBER() OVER (ORDER BY c.combination_id ASC) as sequence_order
-                FROM combinations c 
-                LEFT JOIN parite p ON c.parite_id = p.parite_id
-                WHERE c.univers = :universe 
-                AND p.parite IS NOT NULL
-                ORDER BY c.combination_id ASC
-                LIMIT 2000
-            """
-        elif self.attribute_type == 'unidos':
-            query = """
-                SELECT 
-                    u.unidos as attribute_value,
-                    c.combination_id,
-                    ROW_NUMBER() OVER (ORDER BY c.combination_id ASC) as sequence_order
-                FROM combinations c 
-                LEFT JOIN unidos u ON c.unidos_id = u.unidos_id
-                WHERE c.univers = :universe 
-                AND u.unidos IS NOT NULL
-                ORDER BY c.combination_id ASC
-                LIMIT 2000
-            """
-        
-        result = db.execute(text(query), {"universe": self.universe})
-        data = result.fetchall()
+        codes, classes, last_row_id = SequenceDataset.fetch_codes(
+            db, self.attribute_type, self.universe,
+            max_rows if max_rows is not None else self.max_training_rows
+        )
         
-        if len(data) < self.sequence_length + 10:
+        if len(codes) < self.sequence_length + 10:
             raise ValueError(f"Pas assez de données pour {self.attribute_type} (minimum {self.sequence_length + 10})")
         
-        # Convertir en DataFrame
-        df = pd.DataFrame(data, columns=['attribute_value', 'combination_id', 'sequence_order'])
+        # Même état qu'après LabelEncoder.fit : classes triées
+        self.label_encoder.classes_ = np.array(classes)
+        
+        return codes, classes, last_row_id
+    
+    def prepare_data(self, db: Session) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Prépare les données pour l'entraînement LSTM"""
         
-        # Encoder les valeurs catégorielles
-        values = df['attribute_value'].values
-        unique_values = list(set(values))
+        print(f"🔄 Préparation des données LSTM pour {self.attribute_type}...")
         
-        # Encoder les valeurs
-        encoded_values = self.label_encoder.fit_transform(values)
+        codes, unique_values, _ = self.prepare_codes(db)
         
-        # Créer des séquences pour LSTM
-        X, y = self._create_sequences(encoded_values)
+        # Créer des séquences pour LSTM (vues sur codes, sans copie)
+        X, y = self._create_sequences(codes)
         
         print(f"✅ Données préparées: {len(X)} séquences de longueur {self.sequence_length}")
         print(f"📊 Valeurs uniques: {len(unique_values)} - {unique_values}")
@@ -103,16 +73,7 @@ class LSTMPredictor:
     
     def _create_sequences(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Crée des séquences temporelles pour LSTM"""
-        
-        X, y = [], []
-        
-        for i in range(len(data) - self.sequence_length):
-            # Séquence d'entrée (10 valeurs précédentes)
-            X.append(data[i:(i + self.sequence_length)])
-            # Valeur à prédire (valeur suivante)
-            y.append(data[i + self.sequence_length])
-        
-        return np.array(X), np.array(y)
+        return SequenceDataset.windows(data, self.sequence_length)
     
     def build_model(self, num_classes: int) -> Sequential:
         """Construit le modèle LSTM"""
@@ -149,60 +110,164 @@ class LSTMPredictor:
         print("✅ Modèle LSTM construit avec succès!")
         return model
     
-    def train(self, db: Session, epochs: int = 50, validation_split: float = 0.2) -> Dict[str, Any]:
-        """Entraîne le modèle LSTM"""
+    def train(
+        self,
+        db: Session,
+        epochs: int = 50,
+        validation_split: float = 0.2,
+        max_rows: int = None,
+        warm_start: bool = False,
+        fine_tune_epochs: int = None
+    ) -> Dict[str, Any]:
+        """
+        Entraîne le modèle LSTM
+        
+        max_rows limite l'entraînement aux N lignes les plus récentes (fenêtre
+        glissante). Avec warm_start, le modèle sauvegardé est affiné sur les
+        seules lignes ajoutées depuis son dernier entraînement ; on revient à
+        un entraînement complet si ce n'est pas possible (pas de modèle, valeur
+        d'attribut inconnue du modèle, longueur de séquence changée).
+        """
         
         print(f"🚀 Début de l'entraînement LSTM pour {self.attribute_type}...")
         
         try:
+            if warm_start:
+                result = self._fine_tune(db, fine_tune_epochs or self.FINE_TUNE_EPOCHS)
+                if result is not None:
+                    return result
+            
             # Préparer les données
-            X, y, unique_values = self.prepare_data(db)
+            codes, unique_values, last_row_id = self.prepare_codes(db, max_rows)
+            num_samples = len(codes) - self.sequence_length
+            print(f"✅ Données préparées: {num_samples} séquences de longueur {self.sequence_length}")
             
             # Construire le modèle
             self.model = self.build_model(len(unique_values))
             
-            # Entraîner le modèle
+            # Entraîner le modèle par lots (fenêtres assemblées à la volée)
+            train_data, validation_data = SequenceDataset.tf_datasets(
+                codes, self.sequence_length,
+                batch_size=32,
+                validation_split=validation_split
+            )
             history = self.model.fit(
-                X, y,
+                train_data,
+                validation_data=validation_data,
                 epochs=epochs,
-                batch_size=32,
-                validation_split=validation_split,
-                verbose=1,
-                shuffle=True
+                verbose=1
             )
             
-            # Sauvegarder le modèle et les encodeurs
-            self.save_model()
+            # Sauvegarder le modèle, les encodeurs et le point de reprise
+            training_mode = "rolling" if (max_rows or self.max_training_rows) else "full"
+            self.save_model(last_row_id=last_row_id, trained_rows=len(codes), training_mode=training_mode)
             
-            # Calculer les métriques finales
-            final_loss = history.history['loss'][-1]
-            final_accuracy = history.history['accuracy'][-1]
-            val_loss = history.history['val_loss'][-1] if 'val_loss' in history.history else None
-            val_accuracy = history.history['val_accuracy'][-1] if 'val_accuracy' in history.history else None
+            return self._training_results(history, epochs, unique_values, num_samples, training_mode)
             
-            training_results = {
+        except Exception as e:
+            print(f"❌ Erreur lors de l'entraînement: {e}")
+            raise e
+    
+    def _fine_tune(self, db: Session, epochs: int) -> Optional[Dict[str, Any]]:
+        """
+        Affine le modèle sauvegardé sur les lignes postérieures au dernier point de reprise
+        
+        Retourne None si un entraînement complet est nécessaire.
+        """
+        metadata = self.load_metadata()
+        if not metadata or not os.path.exists(self.model_path):
+            print(f"ℹ️ Aucun point de reprise pour {self.attribute_type}: entraînement complet")
+            return None
+        if metadata.get("sequence_length") != self.sequence_length:
+            print(f"ℹ️ Longueur de séquence modifiée pour {self.attribute_type}: entraînement complet")
+            return None
+        
+        classes = metadata["classes"]
+        last_row_id = metadata["last_row_id"]
+        
+        new_codes, new_classes, new_last_id = SequenceDataset.fetch_codes(
+            db, self.attribute_type, self.universe, classes=classes, after_id=last_row_id
+        )
+        if len(new_classes) > len(classes):
+            print(f"ℹ️ Nouvelles valeurs de {self.attribute_type} {new_classes[len(classes):]}: entraînement complet")
+            return None
+        
+        if len(new_codes) == 0:
+            print(f"✅ {self.attribute_type} déjà à jour (dernière ligne {last_row_id})")
+            return {
                 "attribute_type": self.attribute_type,
                 "universe": self.universe,
-                "epochs_trained": epochs,
-                "final_loss": float(final_loss),
-                "final_accuracy": float(final_accuracy),
-                "validation_loss": float(val_loss) if val_loss else None,
-                "validation_accuracy": float(val_accuracy) if val_accuracy else None,
-                "unique_values": unique_values,
-                "training_samples": len(X),
-                "sequence_length": self.sequence_length,
+                "training_mode": "up_to_date",
+                "new_rows": 0,
+                "last_row_id": last_row_id,
                 "timestamp": datetime.now().isoformat()
             }
-            
-            print(f"✅ Entraînement terminé!")
-            print(f"📊 Précision finale: {final_accuracy:.3f}")
-            print(f"📊 Précision validation: {val_accuracy:.3f}" if val_accuracy else "")
-            
-            return training_results
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de l'entraînement: {e}")
-            raise e
+        
+        # Les sequence_length lignes précédant le point de reprise servent de contexte
+        context, context_classes, _ = SequenceDataset.fetch_codes(
+            db, self.attribute_type, self.universe,
+            max_rows=self.sequence_length, classes=classes, until_id=last_row_id
+        )
+        if len(context_classes) > len(classes) or len(context) < self.sequence_length:
+            print(f"ℹ️ Contexte incomplet pour {self.attribute_type}: entraînement complet")
+            return None
+        codes = np.concatenate([context, new_codes])
+        
+        self.load_model()
+        self.label_encoder.classes_ = np.array(classes)
+        
+        train_data, _ = SequenceDataset.tf_datasets(
+            codes, self.sequence_length, batch_size=32, validation_split=0
+        )
+        history = self.model.fit(train_data, epochs=epochs, verbose=0)
+        
+        self.save_model(
+            last_row_id=new_last_id,
+            trained_rows=metadata.get("trained_rows", 0) + len(new_codes),
+            training_mode="fine_tune"
+        )
+        
+        results = self._training_results(history, epochs, classes, len(new_codes), "fine_tune")
+        results["new_rows"] = len(new_codes)
+        return results
+    
+    def _training_results(
+        self,
+        history,
+        epochs: int,
+        unique_values: List[str],
+        num_samples: int,
+        training_mode: str
+    ) -> Dict[str, Any]:
+        """Résumé d'un entraînement à partir de l'historique Keras"""
+        
+        # Calculer les métriques finales
+        final_loss = history.history['loss'][-1]
+        final_accuracy = history.history['accuracy'][-1]
+        val_loss = history.history['val_loss'][-1] if 'val_loss' in history.history else None
+        val_accuracy = history.history['val_accuracy'][-1] if 'val_accuracy' in history.history else None
+        
+        training_results = {
+            "attribute_type": self.attribute_type,
+            "universe": self.universe,
+            "training_mode": training_mode,
+            "epochs_trained": epochs,
+            "final_loss": float(final_loss),
+            "final_accuracy": float(final_accuracy),
+            "validation_loss": float(val_loss) if val_loss else None,
+            "validation_accuracy": float(val_accuracy) if val_accuracy else None,
+            "unique_values": list(unique_values),
+            "training_samples": num_samples,
+            "sequence_length": self.sequence_length,
+            "last_row_id": self.metadata.get("last_row_id"),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        print(f"✅ Entraînement terminé ({training_mode})!")
+        print(f"📊 Précision finale: {final_accuracy:.3f}")
+        print(f"📊 Précision validation: {val_accuracy:.3f}" if val_accuracy else "")
+        
+        return training_results
     
     def predict_next(self, db: Session, sequence_length: int = None) -> Dict[str, Any]:
         """Prédit la prochaine valeur avec LSTM"""
@@ -271,37 +336,9 @@ class LSTMPredictor:
     def _get_recent_sequence(self, db: Session, length: int) -> np.ndarray:
         """Récupère la séquence récente pour la prédiction"""
         
-        if self.attribute_type in ['forme', 'engine', 'beastie', 'tome', 'chip']:
-            query = f"""
-                SELECT c.{self.attribute_type} as attribute_value
-                FROM combinations c 
-                WHERE c.univers = :universe 
-                AND c.{self.attribute_type} IS NOT NULL
-                ORDER BY c.combination_id DESC
-                LIMIT :length
-            """
-        elif self.attribute_type == 'parite':
-            query = """
-                SELECT p.parite as attribute_value
-                FROM combinations c 
-                LEFT JOIN parite p ON c.parite_id = p.parite_id
-                WHERE c.univers = :universe 
-                AND p.parite IS NOT NULL
-                ORDER BY c.combination_id DESC
-                LIMIT :length
-            """
-        elif self.attribute_type == 'unidos':
-            query = """
-                SELECT u.unidos as attribute_value
-                FROM combinations c 
-                LEFT JOIN unidos u ON c.unidos_id = u.unidos_id
-                WHERE c.univers = :universe 
-                AND u.unidos IS NOT NULL
-                ORDER BY c.combination_id DESC
-                LIMIT :length
-            """
-        
-        result = db.execute(text(query), {"universe": self.universe, "length": length})
+        query = SequenceDataset.attribute_query(self.attribute_type, descending=True, limited=True)
+        
+        result = db.execute(text(query), {"universe": self.universe, "limit": length})
         data = result.fetchall()
         
         # Inverser l'ordre pour avoir la séquence chronologique
@@ -309,13 +346,66 @@ class LSTMPredictor:
         
         return sequence
     
-    def save_model(self):
-        """Sauvegarde le modèle et les encodeurs"""
+    def save_model(self, **training_info):
+        """
+        Sauvegarde le modèle, les encodeurs et les métadonnées d'entraînement
+        
+        Les métadonnées (_meta.json) conservent le vocabulaire des classes et
+        le dernier combination_id vu, point de reprise de l'affinage.
+        """
         
         if self.model is not None:
             self.model.save(self.model_path)
             joblib.dump(self.label_encoder, self.encoder_path)
+            
+            self.metadata = {
+                "attribute_type": self.attribute_type,
+                "universe": self.universe,
+                "sequence_length": self.sequence_length,
+                "classes": [str(value) for value in self.label_encoder.classes_],
+                "trained_at": datetime.now().isoformat(),
+                **training_info
+            }
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+            
             print(f"💾 Modèle sauvegardé: {self.model_path}")
+            
+            self.export_npz()
+    
+    def export_npz(self) -> str:
+        """
+        Exporte les poids et le vocabulaire pour l'inférence NumPy (sans TensorFlow)
+        
+        Le .npz est lu par NumpyLSTMPredictor sur les workers de service.
+        """
+        
+        if self.model is None:
+            self.load_model()
+        
+        numpy_lstm.export_keras_model(
+            self.model,
+            [str(value) for value in self.label_encoder.classes_],
+            self.export_path,
+            metadata={
+                "attribute_type": self.attribute_type,
+                "universe": self.universe,
+                "sequence_length": self.sequence_length,
+                "trained_at": self.metadata.get("trained_at")
+            }
+        )
+        print(f"📦 Export NumPy: {self.export_path}")
+        return self.export_path
+    
+    def load_metadata(self) -> Dict[str, Any]:
+        """Métadonnées d'entraînement sauvegardées ({} si absentes ou illisibles)"""
+        
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                self.metadata = json.load(f)
+        except (OSError, ValueError):
+            self.metadata = {}
+        return self.metadata
     
     def load_model(self):
         """Charge le modèle et les encodeurs"""
@@ -323,38 +413,59 @@ class LSTMPredictor:
         if os.path.exists(self.model_path) and os.path.exists(self.encoder_path):
             self.model = load_model(self.model_path)
             self.label_encoder = joblib.load(self.encoder_path)
+            self.load_metadata()
             print(f"📂 Modèle chargé: {self.model_path}")
         else:
             raise FileNotFoundError(f"Modèle non trouvé pour {self.attribute_type}")
     
+    def vocabulary(self) -> List[str]:
+        """Valeurs connues du modèle, dans l'ordre de ses codes"""
+        
+        if self.model is None:
+            self.load_model()
+        return [str(value) for value in self.label_encoder.classes_]
+    
+    def evaluate_codes(self, codes: np.ndarray) -> Dict[str, Any]:
+        """Perte et précision sur un historique déjà encodé dans le vocabulaire du modèle"""
+        
+        if self.model is None:
+            self.load_model()
+        
+        test_data, _ = SequenceDataset.tf_datasets(
+            codes, self.sequence_length, batch_size=256, validation_split=0, shuffle=False
+        )
+        loss, accuracy = self.model.evaluate(test_data, verbose=0)
+        
+        return {
+            "attribute_type": self.attribute_type,
+            "universe": self.universe,
+            "test_loss": float(loss),
+            "test_accuracy": float(accuracy),
+            "test_samples": max(len(codes) - self.sequence_length, 0),
+            "unique_classes": len(self.label_encoder.classes_),
+            "runtime": "tensorflow",
+            "timestamp": datetime.now().isoformat()
+        }
+    
     def evaluate_model(self, db: Session) -> Dict[str, Any]:
         """Évalue la performance du modèle"""
         
         try:
-            # Préparer les données de test
-            X, y, unique_values = self.prepare_data(db)
-            
-            # Charger le modèle
-            if self.model is None:
-                self.load_model()
+            # Préparer les données de test, encodées avec le vocabulaire du modèle
+            unique_values = self.vocabulary()
+            codes, classes, _ = SequenceDataset.fetch_codes(
+                db, self.attribute_type, self.universe, self.max_training_rows, classes=unique_values
+            )
+            if len(classes) > len(unique_values):
+                raise ValueError(f"Valeurs inconnues du modèle {classes[len(unique_values):]}: réentraînement nécessaire")
             
             # Évaluer
-            loss, accuracy = self.model.evaluate(X, y, verbose=0)
-            
-            evaluation_results = {
-                "attribute_type": self.attribute_type,
-                "universe": self.universe,
-                "test_loss": float(loss),
-                "test_accuracy": float(accuracy),
-                "test_samples": len(X),
-                "unique_classes": len(unique_values),
-                "timestamp": datetime.now().isoformat()
-            }
+            evaluation_results = self.evaluate_codes(codes)
             
-            print(f"📊 Évaluation {self.attribute_type}: Précision = {accuracy:.3f}")
+            print(f"📊 Évaluation {self.attribute_type}: Précision = {evaluation_results['test_accuracy']:.3f}")
             
             return evaluation_results
             
         except Exception as e:
             print(f"❌ Erreur lors de l'évaluation: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
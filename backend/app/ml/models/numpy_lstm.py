@@ -0,0 +1,328 @@
+"""
+Inférence LSTM en NumPy pur
+
+Un modèle Keras entraîné (Embedding -> LSTM... -> Dense...) est exporté dans
+un fichier .npz non compressé : poids en float32, architecture (JSON) et
+vocabulaire des classes. Les workers de prédiction lisent ce fichier par
+memory-map, sans TensorFlow : le chargement prend quelques millisecondes et
+les pages de poids sont partagées entre processus par le cache du système.
+
+Conventions Keras reproduites : portes LSTM dans l'ordre (i, f, c, o),
+activation tanh, activation récurrente sigmoïde, dropout inactif en
+inférence.
+"""
+import json
+import os
+import threading
+import zipfile
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+# Version du format d'export (champ "format_version" de l'architecture)
+FORMAT_VERSION = 1
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "hard_sigmoid": lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+}
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    x = x - x.max(axis=-1, keepdims=True)
+    exp = np.exp(x)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def _activation(name: str):
+    if name == "softmax":
+        return _softmax
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Activation non supportée: {name}")
+    return ACTIVATIONS[name]
+
+
+# ----------------------------------------------------------------------
+# Export (nécessite TensorFlow, côté entraînement uniquement)
+# ----------------------------------------------------------------------
+
+def export_keras_model(model, classes: List[str], path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Écrit les poids d'un modèle Keras séquentiel dans un .npz portable
+
+    Couches prises en charge : Embedding, LSTM, Dense ; Dropout est ignoré
+    (sans effet en inférence).
+    """
+    layers, arrays = [], {}
+
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        weights = [np.asarray(w, dtype=np.float32) for w in layer.get_weights()]
+        index = len(layers)
+
+        if kind == "Dropout":
+            continue
+        if kind == "Embedding":
+            arrays[f"{index}_embeddings"] = weights[0]
+            layers.append({"type": "embedding"})
+        elif kind == "LSTM":
+            if not config.get("use_bias", True):
+                weights.append(np.zeros(weights[0].shape[1], dtype=np.float32))
+            arrays[f"{index}_kernel"], arrays[f"{index}_recurrent_kernel"], arrays[f"{index}_bias"] = weights
+            layers.append({
+                "type": "lstm",
+                "units": config["units"],
+                "return_sequences": config.get("return_sequences", False),
+                "activation": config.get("activation", "tanh"),
+                "recurrent_activation": config.get("recurrent_activation", "sigmoid"),
+            })
+        elif kind == "Dense":
+            if not config.get("use_bias", True):
+                weights.append(np.zeros(weights[0].shape[1], dtype=np.float32))
+            arrays[f"{index}_kernel"], arrays[f"{index}_bias"] = weights
+            layers.append({"type": "dense", "activation": config.get("activation", "linear")})
+        else:
+            raise ValueError(f"Couche non exportable: {kind}")
+
+    architecture = {"format_version": FORMAT_VERSION, "layers": layers, "metadata": metadata or {}}
+    arrays["architecture"] = np.array(json.dumps(architecture, ensure_ascii=False))
+    arrays["classes"] = np.array([str(value) for value in classes])
+
+    # Écriture atomique ; savez (non compressé) garde chaque tableau mappable
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ----------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------
+
+def load_npz(path: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Tableaux d'un .npz, en memory-map si possible
+
+    np.load ne mappe pas les membres d'une archive : chaque membre stocké sans
+    compression est donc mappé directement à son offset dans le fichier. Les
+    membres compressés (ou mmap=False) sont lus en mémoire.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+
+            # En-tête local ZIP : 30 octets + nom + champ extra
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject or dtype.kind == "U":
+                # Textes (architecture, classes) : petits, lus en mémoire
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode="r", offset=f.tell(),
+                shape=shape, order="F" if fortran_order else "C"
+            )
+    return arrays
+
+
+class NumpyLSTM:
+    """
+    Passe avant d'un modèle exporté par export_keras_model
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        architecture = json.loads(str(arrays["architecture"]))
+        if architecture.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Format d'export non supporté: {architecture.get('format_version')}")
+        self.layers = architecture["layers"]
+        self.metadata = architecture.get("metadata", {})
+        self.classes = [str(value) for value in arrays["classes"]]
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "NumpyLSTM":
+        return cls(load_npz(path, mmap=mmap))
+
+    def _lstm(self, index: int, layer: Dict[str, Any], x: np.ndarray) -> np.ndarray:
+        """x : (batch, temps, features) -> (batch, temps, units) ou (batch, units)"""
+        kernel = self.arrays[f"{index}_kernel"]
+        recurrent_kernel = self.arrays[f"{index}_recurrent_kernel"]
+        bias = self.arrays[f"{index}_bias"]
+        units = layer["units"]
+        activation = _activation(layer["activation"])
+        recurrent_activation = _activation(layer["recurrent_activation"])
+
+        batch, steps, _ = x.shape
+        # Projection des entrées pour tous les pas de temps en un seul produit
+        inputs = x @ kernel + bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if layer["return_sequences"] else None
+
+        for t in range(steps):
+            z = inputs[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+
+        return outputs if outputs is not None else h
+
+    def predict_proba(self, sequences: np.ndarray) -> np.ndarray:
+        """Probabilités des classes pour un lot de séquences de codes (batch, temps)"""
+        x = np.asarray(sequences)
+        if x.ndim == 1:
+            x = x[None, :]
+
+        for index, layer in enumerate(self.layers):
+            kind = layer["type"]
+            if kind == "embedding":
+                x = self.arrays[f"{index}_embeddings"][x.astype(np.int64)]
+            elif kind == "lstm":
+                x = self._lstm(index, layer, x)
+            elif kind == "dense":
+                x = _activation(layer["activation"])(x @ self.arrays[f"{index}_kernel"] + self.arrays[f"{index}_bias"])
+        return x
+
+
+# Modèles chargés, partagés par les requêtes du processus : chemin -> (mtime, modèle)
+_models: Dict[str, Tuple[float, NumpyLSTM]] = {}
+_lock = threading.Lock()
+
+
+def get_model(path: str) -> NumpyLSTM:
+    """Modèle mappé en mémoire, rechargé si le fichier a été réexporté"""
+    mtime = os.path.getmtime(path)
+    cached = _models.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _lock:
+        cached = _models.get(path)
+        if not cached or cached[0] != mtime:
+            _models[path] = (mtime, NumpyLSTM.load(path))
+        return _models[path][1]
+
+
+class NumpyLSTMPredictor:
+    """
+    Prédicteur de service sans TensorFlow, même interface que LSTMPredictor.predict_next
+    """
+
+    def __init__(self, attribute_type: str, universe: str = "mundo"):
+        self.attribute_type = attribute_type
+        self.universe = universe
+        self.export_path = NumpyLSTMPredictor.path_for(attribute_type, universe)
+
+    @staticmethod
+    def path_for(attribute_type: str, universe: str) -> str:
+        """Chemin du .npz exporté (à côté du .h5)"""
+        return f"backend/app/ml/models/saved/{universe}_{attribute_type}_lstm.npz"
+
+    # Fenêtres évaluées par passe avant (borne la mémoire des activations)
+    EVALUATION_BATCH_SIZE = 2048
+
+    def vocabulary(self) -> List[str]:
+        """Valeurs connues du modèle, dans l'ordre de ses codes"""
+        return get_model(self.export_path).classes
+
+    def evaluate_codes(self, codes: np.ndarray) -> Dict[str, Any]:
+        """Perte (entropie croisée) et précision sur un historique encodé"""
+        from app.ml.sequence_dataset import SequenceDataset
+
+        model = get_model(self.export_path)
+        sequence_length = model.metadata.get("sequence_length", 10)
+        X, y = SequenceDataset.windows(codes, sequence_length)
+
+        total_loss, hits = 0.0, 0
+        for start in range(0, len(y), self.EVALUATION_BATCH_SIZE):
+            batch_y = y[start:start + self.EVALUATION_BATCH_SIZE]
+            probabilities = model.predict_proba(X[start:start + self.EVALUATION_BATCH_SIZE])
+            # Même borne que Keras pour log(0)
+            total_loss -= np.log(np.clip(probabilities[np.arange(len(batch_y)), batch_y], 1e-7, 1.0)).sum()
+            hits += int((probabilities.argmax(axis=1) == batch_y).sum())
+
+        samples = len(y)
+        return {
+            "attribute_type": self.attribute_type,
+            "universe": self.universe,
+            "test_loss": float(total_loss / samples) if samples else 0.0,
+            "test_accuracy": hits / samples if samples else 0.0,
+            "test_samples": samples,
+            "unique_classes": len(model.classes),
+            "runtime": "numpy",
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def evaluate_model(self, db) -> Dict[str, Any]:
+        """Évalue le modèle exporté sur tout l'historique"""
+        from app.ml.sequence_dataset import SequenceDataset
+
+        try:
+            codes, classes, _ = SequenceDataset.fetch_codes(db, self.attribute_type, self.universe)
+            return self.evaluate_codes(SequenceDataset.reencode(codes, classes, self.vocabulary()))
+        except Exception as e:
+            print(f"❌ Erreur lors de l'évaluation: {e}")
+            return {"error": str(e)}
+
+    def predict_next(self, db, sequence_length: int = None) -> Dict[str, Any]:
+        """Prédit la prochaine valeur à partir du modèle exporté"""
+        from sqlalchemy import text
+        from app.ml.sequence_dataset import SequenceDataset
+
+        model = get_model(self.export_path)
+        if sequence_length is None:
+            sequence_length = model.metadata.get("sequence_length", 10)
+
+        query = SequenceDataset.attribute_query(self.attribute_type, descending=True, limited=True)
+        rows = db.execute(text(query), {"universe": self.universe, "limit": sequence_length}).fetchall()
+        recent_sequence = [str(row[0]) for row in reversed(rows)]
+        if len(recent_sequence) < sequence_length:
+            raise ValueError(f"Pas assez de données récentes ({len(recent_sequence)} < {sequence_length})")
+
+        vocabulary = {value: code for code, value in enumerate(model.classes)}
+        unknown = sorted({value for value in recent_sequence if value not in vocabulary})
+        if unknown:
+            raise ValueError(f"Valeurs inconnues du modèle {unknown}: réentraînement nécessaire")
+
+        predicted_probs = model.predict_proba(np.array([[vocabulary[v] for v in recent_sequence]]))[0]
+        results = [
+            {
+                "rank": rank + 1,
+                "predicted_value": model.classes[code],
+                "confidence": float(predicted_probs[code]),
+                "confidence_percent": round(float(predicted_probs[code]) * 100, 1)
+            }
+            for rank, code in enumerate(np.argsort(predicted_probs)[::-1][:5])
+        ]
+
+        return {
+            "attribute_type": self.attribute_type,
+            "universe": self.universe,
+            "predictions": results,
+            "model_type": "LSTM",
+            "runtime": "numpy",
+            "sequence_used": recent_sequence,
+            "timestamp": datetime.now().isoformat()
+        }
@@ -0,0 +1,93 @@
+"""
+Registre des backends ML, chargés à la première utilisation
+
+Importer TensorFlow, Keras et scikit-learn coûte plusieurs secondes et des
+centaines de Mo par worker. Les services ne référencent donc les modèles que
+par leur nom ; le module correspondant n'est importé qu'au premier appel de
+get_backend(), une seule fois par processus. Sans TensorFlow (dépendances de
+requirements-ml.txt absentes), l'API démarre normalement et seuls les
+appels au backend "lstm" échouent avec MLBackendUnavailable.
+
+ML_PRELOAD=lstm,fast (variable d'environnement) charge les backends listés
+au démarrage, pour les workers dédiés au ML.
+"""
+import importlib
+import importlib.util
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+
+class MLBackendUnavailable(RuntimeError):
+    """Backend ML demandé mais dépendances absentes"""
+
+
+# Nom -> (module, attribut exporté, paquets requis)
+BACKENDS = {
+    "lstm": ("app.ml.models.lstm_predictor", "LSTMPredictor", ["tensorflow", "sklearn", "joblib"]),
+    "fast": ("app.ml.models.fast_predictors", None, ["numpy"]),
+    "numpy_lstm": ("app.ml.models.numpy_lstm", "NumpyLSTMPredictor", ["numpy"]),
+}
+
+_loaded: Dict[str, Any] = {}
+_load_times: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def is_available(name: str) -> bool:
+    """Vrai si les paquets requis sont installés (sans les importer)"""
+    _, _, packages = BACKENDS[name]
+    return all(importlib.util.find_spec(package) is not None for package in packages)
+
+
+def get_backend(name: str) -> Any:
+    """Classe ou module du backend, importé au premier appel"""
+    if name in _loaded:
+        return _loaded[name]
+    if name not in BACKENDS:
+        raise ValueError(f"Backend ML inconnu: {name}")
+
+    with _lock:
+        if name not in _loaded:
+            module_name, attribute, packages = BACKENDS[name]
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError as e:
+                raise MLBackendUnavailable(
+                    f"Backend ML '{name}' indisponible ({e}). "
+                    f"Installer requirements-ml.txt ({', '.join(packages)})"
+                ) from e
+            _loaded[name] = getattr(module, attribute) if attribute else module
+            _load_times[name] = round((time.perf_counter() - start) * 1000, 1)
+            print(f"🧠 Backend ML '{name}' chargé en {_load_times[name]} ms")
+        return _loaded[name]
+
+
+def preload(names: List[str]) -> None:
+    """Charge des backends à l'avance (erreurs affichées, pas levées)"""
+    for name in names:
+        try:
+            get_backend(name)
+        except (MLBackendUnavailable, ValueError) as e:
+            print(f"⚠️ {e}")
+
+
+def preload_from_env() -> None:
+    """Précharge les backends listés dans ML_PRELOAD"""
+    names = [name.strip() for name in os.environ.get("ML_PRELOAD", "").split(",") if name.strip()]
+    if names:
+        preload(names)
+
+
+def status() -> Dict[str, Any]:
+    """État des backends : disponibles, chargés, temps de chargement"""
+    return {
+        name: {
+            "available": is_available(name),
+            "loaded": name in _loaded,
+            "load_ms": _load_times.get(name)
+        }
+        for name in BACKENDS
+    }
@@ -0,0 +1,296 @@
+"""
+Jeux de séquences pour l'entraînement LSTM
+
+Les valeurs d'un attribut sont lues en flux depuis le curseur et encodées à la
+volée dans un tableau int32 (une seule copie des données en mémoire). Les
+fenêtres glissantes (X) et les cibles (y) sont des vues sur ce tableau
+(sliding_window_view) : aucune séquence n'est recopiée. L'entraînement les
+consomme par lots, via un générateur NumPy ou un pipeline tf.data.
+"""
+import numpy as np
+from typing import List, Dict, Tuple, Optional, Iterator
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+
+class SequenceDataset:
+    """
+    Construction des séquences (X, y) d'un attribut de combinaison
+    """
+
+    # Attributs lus directement sur combinations
+    DIRECT_ATTRIBUTES = ['forme', 'engine', 'beastie', 'tome', 'chip']
+
+    # Attributs joints : (table, clé, colonne)
+    JOINED_ATTRIBUTES = {
+        'parite': ('parite', 'parite_id', 'parite'),
+        'unidos': ('unidos', 'unidos_id', 'unidos'),
+    }
+
+    # Lignes lues par aller-retour avec le curseur
+    FETCH_CHUNK_SIZE = 10000
+
+    @staticmethod
+    def attribute_query(
+        attribute_type: str,
+        descending: bool = False,
+        limited: bool = False,
+        after_id: bool = False,
+        until_id: bool = False
+    ) -> str:
+        """
+        Requête (valeur, combination_id) d'un attribut, triée par combination_id
+
+        after_id / until_id ajoutent les bornes :after_id (exclue) et
+        :until_id (incluse) sur combination_id.
+        """
+        order = "DESC" if descending else "ASC"
+        limit = "LIMIT :limit" if limited else ""
+        bounds = ""
+        if after_id:
+            bounds += " AND c.combination_id > :after_id"
+        if until_id:
+            bounds += " AND c.combination_id <= :until_id"
+
+        if attribute_type in SequenceDataset.DIRECT_ATTRIBUTES:
+            return f"""
+                SELECT c.{attribute_type} as attribute_value, c.combination_id
+                FROM combinations c
+                WHERE c.univers = :universe
+                AND c.{attribute_type} IS NOT NULL{bounds}
+                ORDER BY c.combination_id {order}
+                {limit}
+            """
+        if attribute_type in SequenceDataset.JOINED_ATTRIBUTES:
+            table, key, column = SequenceDataset.JOINED_ATTRIBUTES[attribute_type]
+            return f"""
+                SELECT j.{column} as attribute_value, c.combination_id
+                FROM combinations c
+                LEFT JOIN {table} j ON c.{key} = j.{key}
+                WHERE c.univers = :universe
+                AND j.{column} IS NOT NULL{bounds}
+                ORDER BY c.combination_id {order}
+                {limit}
+            """
+        raise ValueError(f"Type d'attribut non supporté: {attribute_type}")
+
+    @staticmethod
+    def fetch_codes(
+        db: Session,
+        attribute_type: str,
+        universe: str,
+        max_rows: Optional[int] = None,
+        classes: Optional[List[str]] = None,
+        after_id: Optional[int] = None,
+        until_id: Optional[int] = None
+    ) -> Tuple[np.ndarray, List[str], Optional[int]]:
+        """
+        Lit l'historique d'un attribut en flux et l'encode en int32
+
+        Retourne (codes, classes, dernier combination_id lu). Sans vocabulaire
+        fourni, les codes suivent l'ordre trié des valeurs (comme LabelEncoder),
+        donc classes[code] redonne la valeur. Avec `classes` (vocabulaire d'un
+        modèle déjà entraîné), les codes existants sont conservés ; une valeur
+        inconnue est ajoutée en fin de liste, ce que l'appelant détecte par
+        len(classes) plus grand. Avec max_rows, seules les max_rows lignes les
+        plus récentes sont gardées, dans l'ordre chronologique.
+        """
+        query = SequenceDataset.attribute_query(
+            attribute_type,
+            descending=max_rows is not None,
+            limited=max_rows is not None,
+            after_id=after_id is not None,
+            until_id=until_id is not None
+        )
+        params = {"universe": universe}
+        if max_rows is not None:
+            params["limit"] = max_rows
+        if after_id is not None:
+            params["after_id"] = after_id
+        if until_id is not None:
+            params["until_id"] = until_id
+
+        result = db.execute(text(query).execution_options(stream_results=True), params)
+
+        vocabulary = {value: code for code, value in enumerate(classes or [])}
+        chunks = []
+        last_id = None
+        for rows in result.partitions(SequenceDataset.FETCH_CHUNK_SIZE):
+            chunks.append(np.fromiter(
+                (vocabulary.setdefault(row[0], len(vocabulary)) for row in rows),
+                dtype=np.int32,
+                count=len(rows)
+            ))
+            if max_rows is None:
+                last_id = rows[-1][1]
+            elif last_id is None:
+                last_id = rows[0][1]  # Ordre décroissant : la plus récente en tête
+
+        codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32)
+        if max_rows is not None:
+            codes = codes[::-1].copy()
+
+        if classes:
+            # Vocabulaire imposé : ordre d'insertion (valeurs nouvelles en fin)
+            return codes, list(vocabulary), last_id
+
+        # Renumérotation dans l'ordre trié des valeurs
+        sorted_classes = sorted(vocabulary)
+        remap = np.empty(len(vocabulary), dtype=np.int32)
+        for sorted_code, value in enumerate(sorted_classes):
+            remap[vocabulary[value]] = sorted_code
+
+        return remap[codes], sorted_classes, last_id
+
+    @staticmethod
+    def attributes_query(attribute_types: List[str]) -> str:
+        """Requête de toutes les colonnes d'attributs d'un univers, triée par combination_id"""
+        columns, joins = [], []
+        for attribute_type in attribute_types:
+            if attribute_type in SequenceDataset.DIRECT_ATTRIBUTES:
+                columns.append(f"c.{attribute_type}")
+            elif attribute_type in SequenceDataset.JOINED_ATTRIBUTES:
+                table, key, column = SequenceDataset.JOINED_ATTRIBUTES[attribute_type]
+                columns.append(f"j_{table}.{column}")
+                joins.append(f"LEFT JOIN {table} j_{table} ON c.{key} = j_{table}.{key}")
+            else:
+                raise ValueError(f"Type d'attribut non supporté: {attribute_type}")
+        return f"""
+            SELECT c.combination_id, {", ".join(columns)}
+            FROM combinations c
+            {" ".join(joins)}
+            WHERE c.univers = :universe
+            ORDER BY c.combination_id ASC
+        """
+
+    @staticmethod
+    def fetch_attributes(
+        db: Session,
+        attribute_types: List[str],
+        universe: str
+    ) -> Dict[str, Tuple[np.ndarray, List[str], Optional[int]]]:
+        """
+        Historique de plusieurs attributs en une seule lecture de combinations
+
+        Retourne, par attribut, le même triplet que fetch_codes (codes dans
+        l'ordre trié des valeurs, classes, dernier combination_id) ; chaque
+        séquence ignore les lignes où son attribut est NULL, comme fetch_codes.
+        """
+        query = SequenceDataset.attributes_query(attribute_types)
+        result = db.execute(text(query).execution_options(stream_results=True), {"universe": universe})
+
+        vocabularies = [{} for _ in attribute_types]
+        chunks = [[] for _ in attribute_types]
+        last_ids = [None for _ in attribute_types]
+        for rows in result.partitions(SequenceDataset.FETCH_CHUNK_SIZE):
+            for position, vocabulary in enumerate(vocabularies):
+                column = position + 1
+                values = [(row[0], row[column]) for row in rows if row[column] is not None]
+                if not values:
+                    continue
+                chunks[position].append(np.fromiter(
+                    (vocabulary.setdefault(value, len(vocabulary)) for _, value in values),
+                    dtype=np.int32,
+                    count=len(values)
+                ))
+                last_ids[position] = values[-1][0]
+
+        datasets = {}
+        for position, attribute_type in enumerate(attribute_types):
+            vocabulary = vocabularies[position]
+            codes = np.concatenate(chunks[position]) if chunks[position] else np.empty(0, dtype=np.int32)
+            sorted_classes = sorted(vocabulary)
+            remap = np.empty(len(vocabulary), dtype=np.int32)
+            for sorted_code, value in enumerate(sorted_classes):
+                remap[vocabulary[value]] = sorted_code
+            datasets[attribute_type] = (remap[codes], sorted_classes, last_ids[position])
+        return datasets
+
+    @staticmethod
+    def reencode(codes: np.ndarray, classes: List[str], target_classes: List[str]) -> np.ndarray:
+        """
+        Réencode des codes dans le vocabulaire d'un modèle
+
+        ValueError si une valeur est inconnue du modèle (réentraînement nécessaire).
+        """
+        target = {str(value): code for code, value in enumerate(target_classes)}
+        unknown = [value for value in classes if str(value) not in target]
+        if unknown:
+            raise ValueError(f"Valeurs inconnues du modèle {unknown}: réentraînement nécessaire")
+        remap = np.array([target[str(value)] for value in classes], dtype=np.int32)
+        return remap[codes] if len(codes) else codes
+
+    @staticmethod
+    def windows(codes: np.ndarray, sequence_length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fenêtres glissantes sans copie
+
+        X[i] = codes[i:i + sequence_length] et y[i] = codes[i + sequence_length] ;
+        X et y sont des vues en lecture seule sur codes.
+        """
+        if len(codes) <= sequence_length:
+            empty = np.empty((0, sequence_length), dtype=codes.dtype)
+            return empty, np.empty(0, dtype=codes.dtype)
+        X = sliding_window_view(codes[:-1], sequence_length)
+        y = codes[sequence_length:]
+        return X, y
+
+    @staticmethod
+    def split_index(num_samples: int, validation_split: float) -> int:
+        """Indice de séparation entraînement / validation (validation en fin, comme Keras)"""
+        return int(num_samples * (1.0 - validation_split)) if validation_split else num_samples
+
+    @staticmethod
+    def batches(
+        X: np.ndarray,
+        y: np.ndarray,
+        batch_size: int = 32,
+        shuffle: bool = True,
+        seed: Optional[int] = None
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Générateur de lots ; seul le lot courant est matérialisé"""
+        order = np.arange(len(y))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            index = order[start:start + batch_size]
+            yield X[index], y[index]
+
+    @staticmethod
+    def tf_datasets(
+        codes: np.ndarray,
+        sequence_length: int,
+        batch_size: int = 32,
+        validation_split: float = 0.2,
+        shuffle: bool = True,
+        seed: Optional[int] = None
+    ):
+        """
+        Pipelines tf.data (entraînement, validation) construits sur codes
+
+        Chaque lot est assemblé par tf.gather à partir des indices de début de
+        fenêtre : la mémoire reste en O(len(codes)) quelle que soit la taille
+        de l'historique. Retourne (train, None) si validation_split vaut 0.
+        """
+        import tensorflow as tf
+
+        num_samples = max(len(codes) - sequence_length, 0)
+        split = SequenceDataset.split_index(num_samples, validation_split)
+        codes_tensor = tf.constant(codes, dtype=tf.int32)
+        offsets = tf.range(sequence_length, dtype=tf.int64)
+
+        def gather(starts):
+            X = tf.gather(codes_tensor, starts[:, None] + offsets[None, :])
+            y = tf.gather(codes_tensor, starts + sequence_length)
+            return X, y
+
+        def pipeline(start, stop, shuffled):
+            dataset = tf.data.Dataset.range(start, stop)
+            if shuffled:
+                dataset = dataset.shuffle(stop - start, seed=seed, reshuffle_each_iteration=True)
+            return dataset.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+        train = pipeline(0, split, shuffle)
+        validation = pipeline(split, num_samples, False) if split < num_samples else None
+        return train, validation
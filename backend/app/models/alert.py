@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Boolean, Float, Index
+from app.database.connection import Base
+
+class Alert(Base):
+    __tablename__ = "alerts"
+    
+    id = Column(String(64), primary_key=True)  # Identifiant stable dérivé du contenu
+    universe_key = Column(String, nullable=False)  # Univers, ou "{univers}_session_{id}"
+    source = Column(String, nullable=False)  # lstm, delay, pattern, frequency
+    alert_type = Column(String, nullable=False)  # LSTM_HIGH_CONFIDENCE, CRITICAL_DELAY, ...
+    urgency = Column(String)
+    actionable = Column(Boolean, default=False)
+    priority = Column(Float, default=0)
+    payload = Column(JSON)  # Contenu complet de l'alerte
+    first_seen = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    is_active = Column(Boolean, default=True)  # Faux quand la règle ne se déclenche plus
+    
+    __table_args__ = (
+        Index("idx_alerts_lookup", "universe_key", "is_active", "expires_at", "priority"),
+        Index("idx_alerts_filters", "universe_key", "alert_type", "urgency", "actionable"),
+    )
+
+class AlertEvaluation(Base):
+    __tablename__ = "alert_evaluations"
+    
+    universe_key = Column(String, primary_key=True)
+    data_version = Column(Integer, nullable=False, default=1)  # Incrémenté à chaque événement
+    evaluated_version = Column(Integer, nullable=False, default=0)  # Version des alertes stockées
+    evaluated_at = Column(DateTime)
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, event
 from app.database.connection import Base
+from app.database.universe_tables import normalize_chip_number
 
 class Combination(Base):
     __tablename__ = "combinations"
@@ -44,6 +45,7 @@ class Combination(Base):
     region = Column(String)
     gentillee = Column(String)
     chip = Column(String)
+    chip_number = Column(Integer, index=True)  # Chip normalisé 1-48 (table de Katula)
     ligne = Column(String)
     colonne = Column(String)
     petique = Column(String)
@@ -56,4 +58,11 @@ class Combination(Base):
     ash_num1 = Column(String)
     ash_num2 = Column(String)
     room_num1 = Column(String)
-    room_num2 = Column(String)
\ No newline at end of file
+    room_num2 = Column(String)
+
+
+@event.listens_for(Combination, "before_insert")
+def fill_chip_number(mapper, connection, target):
+    """Renseigne chip_number à l'insertion (chip_id prioritaire, comme la migration)"""
+    if target.chip_number is None:
+        target.chip_number = normalize_chip_number(target.chip_id) or normalize_chip_number(target.chip)
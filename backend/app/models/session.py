@@ -15,6 +15,8 @@ class WorkSession(Base):
     number_range_max = Column(Integer, default=90)  # Plage maximum
     total_draws = Column(Integer, nullable=False)  # Nombre total de tirages dans la session
     current_draw = Column(Integer, default=1)  # Tirage actuel
+    completed_draws = Column(Integer, default=0)  # Compteur des tirages complétés (No Draw inclus)
+    no_draw_count = Column(Integer, default=0)  # Compteur des No Draw
     cycle_length = Column(Integer, default=7)  # Longueur du cycle (ex: 7 jours)
     lottery_schedule = Column(JSON)  # Planning des lotos dans le cycle
     start_date = Column(DateTime, nullable=False)  # Date de début de la session
@@ -5,6 +5,7 @@ from typing import Optional, List
 from app.database.connection import get_db
 from app.services.analysis_service import AnalysisService
 from app.models.session import WorkSession
+from app.routes.responses import fast_response
 
 router = APIRouter()
 
@@ -35,6 +36,8 @@ async def get_statistical_journal(
     period_end: Optional[int] = Query(None, description="Période de fin"),
     periodicity: int = Query(1, description="Nombre de tirages par période"),
     session_id: Optional[int] = Query(None, description="ID de la session cyclique"),
+    fields: Optional[str] = Query(None, description="Sections à conserver (ex: period_frequencies)"),
+    exclude: Optional[str] = Query(None, description="Sections à retirer (ex: journal)"),
     db: Session = Depends(get_db)
 ):
     """Générer le journal statistique avec périodicité et filtres avancés"""
@@ -50,7 +53,7 @@ async def get_statistical_journal(
             session_id=session_id
         )
         
-        return result
+        return fast_response(result, fields, exclude)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -93,6 +96,8 @@ async def analyze_session(
     session_id: int,
     universe: Optional[str] = Query("mundo", description="Univers à analyser"),
     periodicity: int = Query(3, description="Périodicité pour l'analyse"),
+    fields: Optional[str] = Query(None, description="Sections à conserver"),
+    exclude: Optional[str] = Query(None, description="Sections à retirer (ex: journal)"),
     db: Session = Depends(get_db)
 ):
     """Analyser une session cyclique complète"""
@@ -138,7 +143,7 @@ async def analyze_session(
             "completed_draws": len(completed_draws)
         }
         
-        return result
+        return fast_response(result, fields, exclude)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Form, Body, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
 from app.services.gap_analysis_service import GapAnalysisService
-from typing import Dict, Any, List
+from app.routes.responses import fast_response
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import os
+import json
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
@@ -189,6 +192,41 @@ async def get_temporal_analysis(db: Session = Depends(get_db)) -> Dict[str, Any]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur analyse temporelle: {str(e)}")
 
+@router.post("/temporal-analysis/{universe}")
+async def analyze_temporal_patterns(
+    universe: str,
+    request: Dict[str, Any] = Body(...),
+    fields: Optional[str] = Query(None, description="Sections à conserver (ex: patterns)"),
+    exclude: Optional[str] = Query(None, description="Sections à retirer (ex: tables_data)"),
+    db: Session = Depends(get_db)
+):
+    """Analyse des patterns temporels sur les périodes historiques configurées"""
+    from app.services.temporal_analysis_service import TemporalAnalysisService
+    
+    result = TemporalAnalysisService.analyze_temporal_patterns(
+        db,
+        universe,
+        request.get("tables_config", []),
+        request.get("marking_type", "chip")
+    )
+    return fast_response(result, fields, exclude)
+
+@router.get("/katula/patterns/{universe}")
+async def get_katula_patterns(
+    universe: str,
+    limit: int = 100,
+    fields: Optional[str] = Query(None, description="Sections à conserver"),
+    exclude: Optional[str] = Query(None, description="Sections à retirer (ex: katula_table,position_history)"),
+    db: Session = Depends(get_db)
+):
+    """Patterns historiques des combinaisons récentes sur la Table de Katula"""
+    from app.services.katula_table_service import KatulaTableService
+    
+    result = KatulaTableService.analyze_historical_patterns(db, universe, limit)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=f"Erreur patterns Katula: {result['error']}")
+    return fast_response(result, fields, exclude)
+
 # ... (le reste du code reste inchangé)
 
 @router.get("/katula/table/{universe}")
@@ -471,3 +509,179 @@ async def get_denomination_details(universe: str, denomination: str, db: Session
             "status": "no_data",
             "source": "fallback"
         }
+
+# Routes du générateur de combinaisons
+def _generation_constraints(avoid_duplicates: bool, min_diversity: float, max_consecutive: int) -> Dict[str, Any]:
+    """Contraintes de sélection transmises par le formulaire du générateur"""
+    return {
+        "avoid_duplicates": avoid_duplicates,
+        "min_diversity": min_diversity,
+        "max_consecutive": max_consecutive,
+        "balance_attributes": True
+    }
+
+@router.get("/combinations/strategies")
+async def get_combination_strategies() -> Dict[str, Any]:
+    """Stratégies de génération disponibles"""
+    from app.services.combination_generator_service import CombinationGeneratorService
+    
+    return {"strategies": CombinationGeneratorService.GENERATION_STRATEGIES}
+
+@router.post("/combinations/generate/{universe}")
+async def generate_combinations(
+    universe: str,
+    strategy: str = Form("HYBRID_SMART"),
+    num_combinations: int = Form(10, ge=1, le=100),
+    session_id: Optional[int] = Form(None),
+    avoid_duplicates: bool = Form(True),
+    min_diversity: float = Form(0.7),
+    max_consecutive: int = Form(2),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Génère des combinaisons d'attributs selon une stratégie"""
+    from app.services.combination_generator_service import CombinationGeneratorService
+    
+    if strategy not in CombinationGeneratorService.GENERATION_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Stratégie inconnue: {strategy}")
+    
+    result = CombinationGeneratorService.generate_combinations(
+        db, universe, strategy, num_combinations, session_id,
+        _generation_constraints(avoid_duplicates, min_diversity, max_consecutive)
+    )
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=f"Erreur génération: {result['error']}")
+    return result
+
+@router.post("/numbers/batch-generate/{universe}")
+async def batch_generate_numbers(
+    universe: str,
+    combinations: List[Dict[str, Any]] = Body(...),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Convertit une liste de combinaisons en paires de numéros"""
+    try:
+        from app.services.number_generator_service import NumberGeneratorService
+        
+        return NumberGeneratorService.batch_generate_numbers(db, combinations, universe)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur conversion numéros: {str(e)}")
+
+@router.post("/combinations/generate-numbers/{universe}")
+async def generate_combinations_with_numbers(
+    universe: str,
+    strategy: str = Form("HYBRID_SMART"),
+    num_combinations: int = Form(10, ge=1, le=100),
+    session_id: Optional[int] = Form(None),
+    avoid_duplicates: bool = Form(True),
+    min_diversity: float = Form(0.7),
+    max_consecutive: int = Form(2),
+    stream: bool = Form(False),
+    db: Session = Depends(get_db)
+):
+    """
+    Génère des combinaisons et leurs paires de numéros en un seul appel
+    
+    Avec stream=true, la réponse est en NDJSON : une ligne de résumé, une
+    ligne par combinaison convertie, puis une ligne de fin.
+    """
+    from app.services.combination_generator_service import CombinationGeneratorService
+    
+    if strategy not in CombinationGeneratorService.GENERATION_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Stratégie inconnue: {strategy}")
+    
+    constraints = _generation_constraints(avoid_duplicates, min_diversity, max_consecutive)
+    
+    try:
+        if not stream:
+            result = CombinationGeneratorService.generate_with_numbers(
+                db, universe, strategy, num_combinations, session_id, constraints
+            )
+            if "error" in result:
+                raise HTTPException(status_code=500, detail=f"Erreur génération: {result['error']}")
+            return result
+        
+        entries = CombinationGeneratorService.stream_with_numbers(
+            db, universe, strategy, num_combinations, session_id, constraints
+        )
+        return StreamingResponse(
+            (json.dumps(entry, default=str) + "\n" for entry in entries),
+            media_type="application/x-ndjson"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur génération + numéros: {str(e)}")
+
+@router.get("/ml/prediction-cache")
+async def get_prediction_cache_stats() -> Dict[str, Any]:
+    """Taille et taux de hit du cache des prédictions LSTM"""
+    from app.services.prediction_cache import PredictionCache
+    
+    return PredictionCache.stats()
+
+# Routes des alertes intelligentes
+@router.get("/alerts/metrics/sources")
+async def get_alert_source_metrics() -> Dict[str, Any]:
+    """Latences et dépassements de délai par source d'alertes"""
+    try:
+        from app.services.alert_service import AlertService
+        
+        return AlertService.get_source_metrics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur métriques alertes: {str(e)}")
+
+@router.get("/alerts/{universe}/types")
+async def get_alert_types(universe: str) -> Dict[str, Any]:
+    """Types d'alertes disponibles"""
+    try:
+        from app.services.alert_service import AlertService
+        
+        return {
+            "universe": universe,
+            "alert_types": AlertService.ALERT_TYPES
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur types d'alertes: {str(e)}")
+
+@router.get("/alerts/{universe}")
+async def get_alerts(
+    universe: str,
+    session_id: Optional[int] = None,
+    alert_type: Optional[str] = None,
+    urgency: Optional[str] = None,
+    actionable_only: bool = False,
+    refresh: bool = False,
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Alertes actives d'un univers (réévaluées seulement après un nouveau tirage ou réentraînement)"""
+    try:
+        from app.services.alert_service import AlertService
+        
+        if refresh:
+            AlertService.generate_all_alerts(db, universe, session_id, force=True)
+        
+        if alert_type or urgency or actionable_only:
+            return AlertService.filter_alerts(
+                db, universe, session_id,
+                alert_type=alert_type,
+                urgency=urgency,
+                actionable_only=actionable_only
+            )
+        
+        return AlertService.generate_all_alerts(db, universe, session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur alertes: {str(e)}")
+
+@router.get("/alerts/{universe}/{alert_id}")
+async def get_alert(universe: str, alert_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Détail d'une alerte par son identifiant stable"""
+    try:
+        from app.services.alert_service import AlertService
+        
+        alert = AlertService.get_alert_by_id(db, alert_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur alerte: {str(e)}")
+    
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alerte non trouvée")
+    return alert
@@ -1,7 +1,7 @@
 """
 Routes pour le workflow KATOOLING
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
@@ -9,6 +9,7 @@ from datetime import datetime
 
 from app.database.connection import get_db
 from app.services.katooling_workflow_service import KatoolingWorkflowService
+from app.routes.responses import fast_response
 
 router = APIRouter()
 
@@ -32,6 +33,8 @@ class WorkflowResponse(BaseModel):
 @router.post("/execute", response_model=WorkflowResponse)
 async def execute_katooling_workflow(
     request: WorkflowRequest,
+    fields: Optional[str] = Query(None, description="Sections à conserver (ex: summary,steps)"),
+    exclude: Optional[str] = Query(None, description="Sections à retirer (ex: tables_data,katula_table_data)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -39,6 +42,8 @@ async def execute_katooling_workflow(
     
     Args:
         request: Paramètres du workflow
+        fields: Sections de premier niveau à conserver
+        exclude: Sections à retirer (nom simple ou chemin pointé)
         db: Session de base de données
     
     Returns:
@@ -102,7 +107,7 @@ async def execute_katooling_workflow(
             ) else "partial"
         }
         
-        return workflow_results
+        return fast_response(workflow_results, fields, exclude)
         
     except HTTPException:
         raise
@@ -116,6 +121,8 @@ async def execute_katooling_workflow(
 async def execute_workflow_step(
     step_name: str,
     request: WorkflowStepRequest,
+    fields: Optional[str] = Query(None, description="Sections à conserver"),
+    exclude: Optional[str] = Query(None, description="Sections à retirer (ex: tables_data)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -124,6 +131,8 @@ async def execute_workflow_step(
     Args:
         step_name: Nom de l'étape à exécuter
         request: Paramètres de l'étape
+        fields: Sections de premier niveau à conserver
+        exclude: Sections à retirer (nom simple ou chemin pointé)
         db: Session de base de données
     
     Returns:
@@ -165,12 +174,12 @@ async def execute_workflow_step(
             workflow_results = KatoolingWorkflowService.execute_full_workflow(db, request.input_numbers)
             result = KatoolingWorkflowService._step5_validation(db, workflow_results)
         
-        return {
+        return fast_response({
             "step_name": step_name,
             "timestamp": datetime.now().isoformat(),
             "input_numbers": request.input_numbers,
             "result": result
-        }
+        }, fields, exclude)
         
     except HTTPException:
         raise
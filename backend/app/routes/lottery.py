@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
 from app.database.connection import get_db
 from app.models.draw import Draw
 from app.services.combination_service import CombinationService
+from app.services.draw_ingestion_service import DrawIngestionService
+from app.services import events
 
 router = APIRouter()
 
@@ -56,6 +58,7 @@ async def create_draw(draw_data: DrawCreate, db: Session = Depends(get_db)):
         db.add(new_draw)
         db.commit()
         db.refresh(new_draw)
+        events.publish(events.DRAW_SAVED, db=db, draw_id=new_draw.id)
         
         # Générer les combinaisons pour prévisualisation
         combinations = CombinationService.generate_combinations(draw_data.winning_numbers)
@@ -73,6 +76,32 @@ async def create_draw(draw_data: DrawCreate, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/draws/bulk")
+async def import_draws(
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    lottery_name: Optional[str] = Form(None),
+    skip_existing: bool = Form(True),
+    db: Session = Depends(get_db)
+):
+    """Importer un historique de tirages (CSV ou JSON-lines)"""
+    if format and format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="Format non supporté (csv ou jsonl)")
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Le fichier doit être encodé en UTF-8")
+
+    try:
+        result = DrawIngestionService.ingest_content(
+            db, content, fmt=format, filename=file.filename,
+            default_lottery_name=lottery_name, skip_existing=skip_existing
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"message": f"{result['inserted']} tirages importés", **result}
+
 @router.get("/draws", response_model=List[dict])
 async def get_draws(limit: int = 20, db: Session = Depends(get_db)):
     """Récupérer la liste des tirages"""
@@ -116,6 +145,7 @@ async def delete_draw(draw_id: int, db: Session = Depends(get_db)):
     
     db.delete(draw)
     db.commit()
+    events.publish(events.DRAW_SAVED, db=db, draw_id=draw_id)
     
     return {"message": "Tirage supprimé avec succès"}
 
@@ -0,0 +1,119 @@
+"""
+Réponses JSON rapides pour les gros résultats d'analyse
+
+FastJSONResponse sérialise directement le dict retourné par un service avec
+orjson, sans le passage de jsonable_encoder que FastAPI applique aux valeurs
+de retour ordinaires. Elle est réservée aux charges déjà composées de types
+JSON simples (dict, list, str, nombres, dates, scalaires numpy).
+
+Les paramètres de requête `fields` et `exclude` permettent au client de ne
+recevoir que les sections dont il a besoin (ex. exclude=tables_data).
+"""
+import json
+import math
+from decimal import Decimal
+from typing import Any, Optional, Set
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Repli sur json (plus lent) si orjson n'est pas installé
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Types hors JSON rencontrés dans les résultats SQL / numpy"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "tolist"):  # Tableaux et scalaires numpy
+        return value.tolist()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def _finite(value: Any) -> Any:
+    """NaN et ±Infinity remplacés par None à toute profondeur, comme orjson"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée par orjson, sans passage par jsonable_encoder"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(
+                content,
+                default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+        # Même sortie qu'orjson : null au lieu de NaN/Infinity (JSON invalide)
+        return json.dumps(
+            _finite(content), default=lambda value: _finite(_default(value)),
+            ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        ).encode("utf-8")
+
+
+def _split(value: Optional[str]) -> Set[str]:
+    """'a, b,c' -> {'a', 'b', 'c'}"""
+    return {part.strip() for part in (value or "").split(",") if part.strip()}
+
+
+def _drop(payload: Any, names: Set[str], paths: Set[tuple]) -> Any:
+    """Retire les clés nommées (à toute profondeur) et les chemins pointés"""
+    if isinstance(payload, dict):
+        result = {}
+        for key, value in payload.items():
+            if key in names or (key,) in paths:
+                continue
+            sub_paths = {path[1:] for path in paths if len(path) > 1 and path[0] == key}
+            result[key] = _drop(value, names, sub_paths) if (names or sub_paths) else value
+        return result
+    if isinstance(payload, list) and names:
+        return [_drop(item, names, set()) for item in payload]
+    return payload
+
+
+def select_fields(payload: Any, fields: Optional[str] = None, exclude: Optional[str] = None) -> Any:
+    """
+    Sélection des sections d'une réponse
+
+    - fields : clés de premier niveau à conserver (ex. "patterns,universe")
+    - exclude : clés à retirer ; un nom simple est retiré à toute profondeur
+      (ex. "tables_data"), un chemin pointé cible une seule clé
+      (ex. "steps.step3_temporal_analysis")
+    """
+    if not isinstance(payload, dict):
+        return payload
+
+    keep = _split(fields)
+    if keep:
+        payload = {key: value for key, value in payload.items() if key in keep}
+
+    excluded = _split(exclude)
+    if excluded:
+        names = {name for name in excluded if "." not in name}
+        paths = {tuple(name.split(".")) for name in excluded if "." in name}
+        payload = _drop(payload, names, paths)
+
+    return payload
+
+
+def fast_response(
+    payload: Any,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    status_code: int = 200
+) -> FastJSONResponse:
+    """Réponse rapide après sélection éventuelle des sections"""
+    return FastJSONResponse(select_fields(payload, fields, exclude), status_code=status_code)
@@ -25,6 +25,9 @@ class SessionCreate(BaseModel):
     number_range_max: int = 90
     cycle_length: Optional[int] = 7  # Nombre de tirages par période
 
+class CyclesAppend(BaseModel):
+    cycles: int = 1  # Nombre de cycles complets à ajouter
+
 class DrawNumbersInput(BaseModel):
     numbers: List[int]
     draw_date: Optional[str] = None  # Format: "DD/MM/YYYY"
@@ -84,7 +87,7 @@ async def get_all_sessions(db: Session = Depends(get_db)):
         
         sessions_data = []
         for session in sessions:
-            progress = SessionService.get_session_progress(db, session.id)
+            progress = SessionService.session_progress(session)
             sessions_data.append({
                 "id": session.id,
                 "name": session.name,
@@ -119,7 +122,7 @@ async def get_active_session(db: Session = Depends(get_db)):
         if not session:
             return {"message": "Aucune session active"}
         
-        progress = SessionService.get_session_progress(db, session.id)
+        progress = SessionService.session_progress(session)
         
         return {
             "session": {
@@ -157,6 +160,21 @@ async def activate_session(session_id: int, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/sessions/{session_id}/cycles")
+async def append_session_cycles(session_id: int, data: CyclesAppend, db: Session = Depends(get_db)):
+    """Prolonger une session de N cycles du planning"""
+    try:
+        result = SessionService.append_cycles(db, session_id, data.cycles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Session non trouvée")
+    
+    return {"message": f"{data.cycles} cycle(s) ajouté(s)", **result}
+
 @router.get("/sessions/{session_id}/current-draw")
 async def get_current_draw(session_id: int, db: Session = Depends(get_db)):
     """Récupérer le tirage actuel d'une session"""
@@ -266,28 +284,22 @@ async def update_draw_numbers(
 ):
     """Modifier les numéros d'un tirage existant"""
     try:
-        from app.models.session import SessionDraw
+        # Mettre à jour la date si fournie
+        draw_date = None
+        if numbers_data.draw_date:
+            draw_date = datetime.strptime(numbers_data.draw_date, "%d/%m/%Y")
         
-        # Trouver le tirage à modifier
-        draw = db.query(SessionDraw).filter(
-            SessionDraw.session_id == session_id,
-            SessionDraw.id == draw_id
-        ).first()
+        draw = SessionService.update_draw_numbers(
+            db=db,
+            session_id=session_id,
+            draw_id=draw_id,
+            numbers=numbers_data.numbers,
+            draw_date=draw_date
+        )
         
         if not draw:
             raise HTTPException(status_code=404, detail="Tirage non trouvé")
         
-        # Mettre à jour les numéros
-        draw.winning_numbers = numbers_data.numbers
-        draw.is_completed = True
-        
-        # Mettre à jour la date si fournie
-        if numbers_data.draw_date:
-            draw.draw_date = datetime.strptime(numbers_data.draw_date, "%d/%m/%Y")
-        
-        db.commit()
-        db.refresh(draw)
-        
         return {
             "message": "Tirage modifié avec succès",
             "draw_id": draw.id,
@@ -295,6 +307,8 @@ async def update_draw_numbers(
             "numbers": draw.winning_numbers
         }
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -308,29 +322,15 @@ async def delete_draw(
 ):
     """Supprimer un tirage d'une session"""
     try:
-        from app.models.session import SessionDraw, WorkSession
-        
         # Vérifier que la session existe
-        session = db.query(WorkSession).filter(WorkSession.id == session_id).first()
-        if not session:
+        if not SessionService.get_session(db, session_id):
             raise HTTPException(status_code=404, detail="Session non trouvée")
         
-        # Trouver le tirage
-        draw = db.query(SessionDraw).filter(
-            SessionDraw.session_id == session_id,
-            SessionDraw.id == draw_id
-        ).first()
+        draw_number = SessionService.delete_draw(db, session_id, draw_id)
         
-        if not draw:
+        if draw_number is None:
             raise HTTPException(status_code=404, detail="Tirage non trouvé")
         
-        # Sauvegarder le numéro de tirage pour le message
-        draw_number = draw.draw_number
-        
-        # Supprimer le tirage
-        db.delete(draw)
-        db.commit()
-        
         return {"message": f"Tirage {draw_number} supprimé avec succès"}
         
     except HTTPException:
@@ -2,14 +2,17 @@
 Service d'Alertes Intelligentes
 Système proactif de notifications basé sur l'IA et les patterns
 """
-import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from app.services.ml_service import MLService
-from app.services.gap_analysis_service import GapAnalysisService
+from app.database.connection import SessionLocal
 from app.services.pattern_detection_service import PatternDetectionService
-from app.services.frequency_service import FrequencyService
+from app.services.analysis_snapshot_service import AnalysisSnapshotService
+from app.services.alert_store import AlertStore
 
 class AlertService:
     """
@@ -26,49 +29,238 @@ class AlertService:
         'CUSTOM_THRESHOLD': 'Seuil personnalisé atteint'
     }
     
+    # Sources d'alertes, dans l'ordre d'évaluation
+    SOURCES = ('lstm', 'delay', 'pattern', 'frequency')
+    
+    # Budget de temps par source (secondes, mesuré depuis le lancement de l'évaluation)
+    SOURCE_TIMEOUTS = {
+        'lstm': 5.0,
+        'delay': 2.0,
+        'pattern': 2.0,
+        'frequency': 2.0
+    }
+    
+    # Nombre d'alertes renvoyées par défaut
+    MAX_ALERTS = 20
+    
+    # Exécution concurrente des sources (chaque tâche ouvre sa propre session)
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="alert-source")
+    
+    # Métriques de latence par source
+    _metrics_lock = threading.Lock()
+    _latencies: Dict[str, deque] = {source: deque(maxlen=200) for source in SOURCES}
+    _counters: Dict[str, Dict[str, int]] = {
+        source: {"runs": 0, "timeouts": 0, "errors": 0, "late_results": 0} for source in SOURCES
+    }
+    
+    # Sources dont le résultat le plus récent n'est pas encore arrivé, par portée
+    _stale_sources: Dict[str, set] = {}
+    
+    @staticmethod
+    def generate_all_alerts(
+        db: Session,
+        universe: str = "mundo",
+        session_id: Optional[int] = None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Retourne les alertes d'un univers depuis le stockage persistant
+        
+        Les règles ne sont réévaluées que si un événement (tirage enregistré,
+        modèle réentraîné) a rendu les alertes stockées obsolètes, ou si force=True.
+        """
+        evaluated = AlertService._refresh(db, universe, session_id, force=force)
+        return AlertService._build_response(db, universe, session_id, evaluated=evaluated)
+    
+    @staticmethod
+    def _refresh(db: Session, universe: str, session_id: Optional[int] = None, force: bool = False) -> bool:
+        """Réévalue les règles si les alertes stockées sont obsolètes, retourne True si évaluées"""
+        
+        universe_key = AlertStore.universe_key(universe, session_id)
+        
+        version = AlertStore.pending_version(db, universe_key)
+        if force and version is None:
+            version = 0
+        if version is None:
+            return False
+        
+        print(f"🚨 Évaluation des alertes intelligentes pour {universe_key}...")
+        alerts, timed_out, failed = AlertService._evaluate_sources(universe, session_id)
+        # Les alertes des sources hors délai ou en erreur restent en place (stale)
+        completed = [source for source in AlertService.SOURCES if source not in timed_out and source not in failed]
+        stored = AlertStore.store_evaluation(db, universe_key, alerts, version, sources=completed)
+        print(f"✅ {stored} alertes enregistrées"
+              + (f" (sources hors délai: {timed_out})" if timed_out else "")
+              + (f" (sources en erreur: {failed})" if failed else ""))
+        
+        return True
+    
     @staticmethod
-    def generate_all_alerts(db: Session, universe: str = "mundo", session_id: Optional[int] = None) -> Dict[str, Any]:
-        """Génère toutes les alertes pour un univers donné"""
+    def _source_generator(source: str):
+        """
+        Générateur d'alertes d'une source : (db, universe, session_id) -> alertes
         
-        print(f"🚨 Génération des alertes intelligentes pour {universe}...")
+        Les générateurs ne rattrapent pas leurs erreurs : une source en échec
+        est comptée en erreur par _evaluate_sources et garde ses alertes stockées.
+        """
+        return {
+            'lstm': lambda db, universe, session_id: AlertService._generate_lstm_alerts(db, universe),
+            'delay': AlertService._generate_delay_alerts,
+            'pattern': lambda db, universe, session_id: AlertService._generate_pattern_alerts(db, universe),
+            'frequency': AlertService._generate_frequency_alerts,
+        }[source]
+    
+    @staticmethod
+    def _run_source(
+        source: str,
+        universe: str,
+        session_id: Optional[int],
+        deadline: float,
+        late_stored: set
+    ) -> List[Dict[str, Any]]:
+        """
+        Exécute une source dans sa propre session de base de données
+        
+        Si le résultat arrive après la date limite, il est enregistré
+        directement dans le stockage pour servir les lectures suivantes.
+        """
+        db = SessionLocal()
+        started = time.perf_counter()
+        try:
+            alerts = AlertService._source_generator(source)(db, universe, session_id)
+            for alert in alerts:
+                alert["source"] = source
+            
+            if time.perf_counter() > deadline:
+                universe_key = AlertStore.universe_key(universe, session_id)
+                AlertStore.store_evaluation(db, universe_key, alerts, None, sources=[source])
+                with AlertService._metrics_lock:
+                    late_stored.add(source)
+                    AlertService._stale_sources.get(universe_key, set()).discard(source)
+                AlertService._record(source, started, late=True)
+            else:
+                AlertService._record(source, started)
+            return alerts
+        except Exception:
+            AlertService._record(source, started, error=True)
+            raise
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _evaluate_sources(universe: str, session_id: Optional[int] = None):
+        """
+        Exécute toutes les règles d'alertes en parallèle, chacune avec son budget de temps
+        
+        Retourne (alertes des sources terminées à temps, sources hors délai,
+        sources en erreur). Les alertes persistées des sources hors délai ou en
+        erreur restent en place : elles sont servies avec le drapeau stale
+        jusqu'à l'arrivée d'un nouveau résultat.
+        """
+        started = time.perf_counter()
+        late_stored = set()
+        futures = {
+            source: AlertService._executor.submit(
+                AlertService._run_source, source, universe, session_id,
+                started + AlertService.SOURCE_TIMEOUTS[source], late_stored
+            )
+            for source in AlertService.SOURCES
+        }
         
         alerts = []
+        timed_out = []
+        failed = []
+        for source in AlertService.SOURCES:
+            remaining = started + AlertService.SOURCE_TIMEOUTS[source] - time.perf_counter()
+            try:
+                alerts.extend(futures[source].result(timeout=max(0.0, remaining)))
+            except FutureTimeoutError:
+                timed_out.append(source)
+                with AlertService._metrics_lock:
+                    AlertService._counters[source]["timeouts"] += 1
+                print(f"⏱️ Source d'alertes {source} hors délai ({AlertService.SOURCE_TIMEOUTS[source]}s)")
+            except Exception as e:
+                failed.append(source)
+                print(f"❌ Erreur source d'alertes {source}: {e}")
+        
+        # Une source terminée entre-temps a déjà enregistré son résultat
+        universe_key = AlertStore.universe_key(universe, session_id)
+        with AlertService._metrics_lock:
+            AlertService._stale_sources[universe_key] = (set(timed_out) - late_stored) | set(failed)
+        
+        return alerts, timed_out, failed
+    
+    @staticmethod
+    def _record(source: str, started: float, late: bool = False, error: bool = False):
+        """Enregistre la latence d'une exécution de source"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with AlertService._metrics_lock:
+            AlertService._latencies[source].append(elapsed_ms)
+            counters = AlertService._counters[source]
+            counters["runs"] += 1
+            if late:
+                counters["late_results"] += 1
+            if error:
+                counters["errors"] += 1
+    
+    @staticmethod
+    def get_source_metrics() -> Dict[str, Any]:
+        """Latences (ms) et compteurs par source d'alertes"""
+        metrics = {}
+        with AlertService._metrics_lock:
+            for source in AlertService.SOURCES:
+                samples = sorted(AlertService._latencies[source])
+                count = len(samples)
+                metrics[source] = {
+                    **AlertService._counters[source],
+                    "timeout_seconds": AlertService.SOURCE_TIMEOUTS[source],
+                    "last_ms": round(AlertService._latencies[source][-1], 1) if count else None,
+                    "avg_ms": round(sum(samples) / count, 1) if count else None,
+                    "p50_ms": round(samples[count // 2], 1) if count else None,
+                    "p95_ms": round(samples[min(count - 1, int(count * 0.95))], 1) if count else None,
+                    "max_ms": round(samples[-1], 1) if count else None
+                }
+        return {
+            "sources": metrics,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _build_response(
+        db: Session,
+        universe: str,
+        session_id: Optional[int] = None,
+        alert_type: Optional[str] = None,
+        urgency: Optional[str] = None,
+        actionable_only: bool = False,
+        evaluated: bool = False
+    ) -> Dict[str, Any]:
+        """Construit la réponse API à partir des alertes stockées"""
+        
+        universe_key = AlertStore.universe_key(universe, session_id)
+        alerts = AlertStore.query_alerts(
+            db, universe_key,
+            alert_type=alert_type,
+            urgency=urgency,
+            actionable_only=actionable_only
+        )
+        
+        with AlertService._metrics_lock:
+            stale_sources = set(AlertService._stale_sources.get(universe_key, set()))
+        for alert in alerts:
+            alert["stale"] = alert.get("source") in stale_sources
         
-        # 1. Alertes LSTM haute confiance
-        lstm_alerts = AlertService._generate_lstm_alerts(db, universe)
-        alerts.extend(lstm_alerts)
-        
-        # 2. Alertes de retards critiques
-        delay_alerts = AlertService._generate_delay_alerts(db, universe, session_id)
-        alerts.extend(delay_alerts)
-        
-        # 3. Alertes d'anomalies de patterns
-        pattern_alerts = AlertService._generate_pattern_alerts(db, universe)
-        alerts.extend(pattern_alerts)
-        
-        # 4. Alertes de fréquences
-        frequency_alerts = AlertService._generate_frequency_alerts(db, universe, session_id)
-        alerts.extend(frequency_alerts)
-        
-        # Trier par priorité (urgence décroissante)
-        alerts.sort(key=lambda x: x['priority'], reverse=True)
-        
-        # Statistiques des alertes
-        alert_stats = AlertService._calculate_alert_stats(alerts)
-        
-        result = {
+        return {
             "universe": universe,
             "session_id": session_id,
             "total_alerts": len(alerts),
-            "alerts": alerts[:20],  # Top 20 alertes
-            "alert_statistics": alert_stats,
+            "alerts": alerts[:AlertService.MAX_ALERTS],
+            "alert_statistics": AlertService._calculate_alert_stats(alerts),
             "generation_timestamp": datetime.now().isoformat(),
+            "evaluated": evaluated,
+            "stale_sources": sorted(stale_sources),
             "alert_types_available": AlertService.ALERT_TYPES
         }
-        
-        print(f"✅ {len(alerts)} alertes générées")
-        
-        return result
     
     @staticmethod
     def _generate_lstm_alerts(db: Session, universe: str) -> List[Dict[str, Any]]:
@@ -76,35 +268,29 @@ class AlertService:
         
         alerts = []
         
-        try:
-            # Obtenir les prédictions LSTM
-            lstm_predictions = MLService.predict_all_lstm(db, universe)
-            
-            if "top_predictions" in lstm_predictions:
-                for pred in lstm_predictions["top_predictions"]:
-                    confidence = pred.get("confidence_percent", 0)
+        # Obtenir les prédictions LSTM (instantané partagé)
+        lstm_predictions = AnalysisSnapshotService.get_snapshot(universe).lstm_predictions(db)
+        
+        if "top_predictions" in lstm_predictions:
+            for pred in lstm_predictions["top_predictions"]:
+                confidence = pred.get("confidence_percent", 0)
+                
+                # Alerte si confiance > 85%
+                if confidence > 85:
+                    priority = 90 + (confidence - 85)  # 90-105
                     
-                    # Alerte si confiance > 85%
-                    if confidence > 85:
-                        priority = 90 + (confidence - 85)  # 90-105
-                        
-                        alerts.append({
-                            "id": f"lstm_{pred['attribute_type']}_{datetime.now().strftime('%H%M%S')}",
-                            "type": "LSTM_HIGH_CONFIDENCE",
-                            "title": f"🧠 Prédiction LSTM Haute Confiance",
-                            "message": f"L'IA prédit {pred['predicted_value']} pour {pred['attribute_type']} avec {confidence}% de confiance",
-                            "attribute_type": pred['attribute_type'],
-                            "predicted_value": pred['predicted_value'],
-                            "confidence": confidence,
-                            "priority": priority,
-                            "urgency": "high" if confidence > 90 else "medium",
-                            "timestamp": datetime.now().isoformat(),
-                            "actionable": True,
-                            "action_suggestion": f"Considérer {pred['predicted_value']} pour le prochain tirage"
-                        })
-            
-        except Exception as e:
-            print(f"❌ Erreur alertes LSTM: {e}")
+                    alerts.append({
+                        "type": "LSTM_HIGH_CONFIDENCE",
+                        "title": f"🧠 Prédiction LSTM Haute Confiance",
+                        "message": f"L'IA prédit {pred['predicted_value']} pour {pred['attribute_type']} avec {confidence}% de confiance",
+                        "attribute_type": pred['attribute_type'],
+                        "predicted_value": pred['predicted_value'],
+                        "confidence": confidence,
+                        "priority": priority,
+                        "urgency": "high" if confidence > 90 else "medium",
+                        "actionable": True,
+                        "action_suggestion": f"Considérer {pred['predicted_value']} pour le prochain tirage"
+                    })
         
         return alerts
     
@@ -114,41 +300,33 @@ class AlertService:
         
         alerts = []
         
-        try:
-            # Adapter l'univers pour les requêtes selon la session
-            universe_key = f"{universe}_session_{session_id}" if session_id else universe
-            
-            # Obtenir les attributs en retard
-            overdue_data = GapAnalysisService.get_overdue_attributes(db, universe_key, threshold=2.0)
-            
-            for attr_type, attributes in overdue_data.items():
-                for attr in attributes[:3]:  # Top 3 par type
-                    delay_ratio = attr.get("delay_ratio", 0)
+        # Obtenir les attributs en retard (instantané de la session ou de l'univers)
+        snapshot = AnalysisSnapshotService.get_snapshot(universe, session_id)
+        overdue_data = snapshot.overdue(db, threshold_multiplier=2.0)
+        
+        for attr_type, attributes in overdue_data.items():
+            for attr in attributes[:3]:  # Top 3 par type
+                delay_ratio = attr.get("delay_ratio", 0)
+                
+                # Alerte si retard > 3x la moyenne
+                if delay_ratio > 3.0:
+                    priority = min(95, 70 + delay_ratio * 5)  # 70-95
                     
-                    # Alerte si retard > 3x la moyenne
-                    if delay_ratio > 3.0:
-                        priority = min(95, 70 + delay_ratio * 5)  # 70-95
-                        
-                        urgency = "critical" if delay_ratio > 5 else "high"
-                        
-                        alerts.append({
-                            "id": f"delay_{attr_type}_{attr['value']}_{datetime.now().strftime('%H%M%S')}",
-                            "type": "CRITICAL_DELAY",
-                            "title": f"⏰ Retard Critique Détecté",
-                            "message": f"{attr['value']} ({attr_type}) en retard de {delay_ratio:.1f}x la moyenne",
-                            "attribute_type": attr_type,
-                            "attribute_value": attr['value'],
-                            "delay_ratio": delay_ratio,
-                            "days_since_last": attr.get("days_since_last", 0),
-                            "priority": priority,
-                            "urgency": urgency,
-                            "timestamp": datetime.now().isoformat(),
-                            "actionable": True,
-                            "action_suggestion": f"Surveiller {attr['value']} - sortie probable imminente"
-                        })
-            
-        except Exception as e:
-            print(f"❌ Erreur alertes retards: {e}")
+                    urgency = "critical" if delay_ratio > 5 else "high"
+                    
+                    alerts.append({
+                        "type": "CRITICAL_DELAY",
+                        "title": f"⏰ Retard Critique Détecté",
+                        "message": f"{attr['value']} ({attr_type}) en retard de {delay_ratio:.1f}x la moyenne",
+                        "attribute_type": attr_type,
+                        "attribute_value": attr['value'],
+                        "delay_ratio": delay_ratio,
+                        "days_since_last": attr.get("days_since_last", 0),
+                        "priority": priority,
+                        "urgency": urgency,
+                        "actionable": True,
+                        "action_suggestion": f"Surveiller {attr['value']} - sortie probable imminente"
+                    })
         
         return alerts
     
@@ -158,33 +336,30 @@ class AlertService:
         
         alerts = []
         
-        try:
-            # Détecter les anomalies
-            anomalies = PatternDetectionService.detect_anomalies(db, universe, threshold=2.5)
+        # Détecter les anomalies
+        anomalies = PatternDetectionService.detect_anomalies(db, universe, threshold=2.5)
+        
+        for anomaly in anomalies.get("anomalies", [])[:5]:  # Top 5
+            severity = anomaly.get("severity", 0)
             
-            for anomaly in anomalies.get("anomalies", [])[:5]:  # Top 5
-                severity = anomaly.get("severity", 0)
+            if severity > 2.0:
+                priority = min(85, 50 + severity * 10)  # 50-85
                 
-                if severity > 2.0:
-                    priority = min(85, 50 + severity * 10)  # 50-85
-                    
-                    alerts.append({
-                        "id": f"pattern_{anomaly.get('type', 'unknown')}_{datetime.now().strftime('%H%M%S')}",
-                        "type": "PATTERN_ANOMALY",
-                        "title": f"🔍 Anomalie de Pattern Détectée",
-                        "message": f"Pattern inhabituel: {anomaly.get('description', 'Anomalie détectée')}",
-                        "pattern_type": anomaly.get("type"),
-                        "severity": severity,
-                        "description": anomaly.get("description"),
-                        "priority": priority,
-                        "urgency": "medium",
-                        "timestamp": datetime.now().isoformat(),
-                        "actionable": False,
-                        "action_suggestion": "Analyser les patterns récents pour comprendre l'anomalie"
-                    })
-            
-        except Exception as e:
-            print(f"❌ Erreur alertes patterns: {e}")
+                alerts.append({
+                    "type": "PATTERN_ANOMALY",
+                    "title": f"🔍 Anomalie de Pattern Détectée",
+                    "message": f"Pattern inhabituel: {anomaly.get('description', 'Anomalie détectée')}",
+                    "pattern_type": anomaly.get("type"),
+                    "attribute_type": anomaly.get("attribute_type"),
+                    "attribute_value": anomaly.get("value"),
+                    "z_score": anomaly.get("z_score"),
+                    "severity": severity,
+                    "description": anomaly.get("description"),
+                    "priority": priority,
+                    "urgency": "medium",
+                    "actionable": False,
+                    "action_suggestion": "Analyser les patterns récents pour comprendre l'anomalie"
+                })
         
         return alerts
     
@@ -194,39 +369,31 @@ class AlertService:
         
         alerts = []
         
-        try:
-            # Adapter l'univers pour les requêtes selon la session
-            universe_key = f"{universe}_session_{session_id}" if session_id else universe
-            
-            # Obtenir les attributs en tendance croissante
-            trending = FrequencyService.get_trending_attributes(db, universe_key, "increasing")
-            
-            for attr_type, attributes in trending.items():
-                for attr in attributes[:2]:  # Top 2 par type
-                    trend_strength = attr.get("trend_strength", 0)
+        # Obtenir les attributs en tendance croissante (instantané de la session ou de l'univers)
+        snapshot = AnalysisSnapshotService.get_snapshot(universe, session_id)
+        trending = snapshot.trending(db, "increasing")
+        
+        for attr_type, attributes in trending.items():
+            for attr in attributes[:2]:  # Top 2 par type
+                trend_strength = attr.get("trend_strength", 0)
+                
+                # Alerte si tendance très forte
+                if trend_strength > 0.7:
+                    priority = 60 + trend_strength * 20  # 60-80
                     
-                    # Alerte si tendance très forte
-                    if trend_strength > 0.7:
-                        priority = 60 + trend_strength * 20  # 60-80
-                        
-                        alerts.append({
-                            "id": f"freq_{attr_type}_{attr['value']}_{datetime.now().strftime('%H%M%S')}",
-                            "type": "FREQUENCY_SPIKE",
-                            "title": f"📈 Pic de Fréquence Détecté",
-                            "message": f"{attr['value']} ({attr_type}) montre une tendance croissante forte",
-                            "attribute_type": attr_type,
-                            "attribute_value": attr['value'],
-                            "trend_strength": trend_strength,
-                            "recent_frequency": attr.get("recent_frequency", 0),
-                            "priority": priority,
-                            "urgency": "medium",
-                            "timestamp": datetime.now().isoformat(),
-                            "actionable": True,
-                            "action_suggestion": f"Considérer {attr['value']} - fréquence en hausse"
-                        })
-            
-        except Exception as e:
-            print(f"❌ Erreur alertes fréquences: {e}")
+                    alerts.append({
+                        "type": "FREQUENCY_SPIKE",
+                        "title": f"📈 Pic de Fréquence Détecté",
+                        "message": f"{attr['value']} ({attr_type}) montre une tendance croissante forte",
+                        "attribute_type": attr_type,
+                        "attribute_value": attr['value'],
+                        "trend_strength": trend_strength,
+                        "recent_frequency": attr.get("recent_frequency", 0),
+                        "priority": priority,
+                        "urgency": "medium",
+                        "actionable": True,
+                        "action_suggestion": f"Considérer {attr['value']} - fréquence en hausse"
+                    })
         
         return alerts
     
@@ -266,46 +433,32 @@ class AlertService:
         }
     
     @staticmethod
-    def get_alert_by_id(alert_id: str, alerts_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def get_alert_by_id(db: Session, alert_id: str) -> Optional[Dict[str, Any]]:
         """Récupère une alerte spécifique par son ID"""
-        
-        for alert in alerts_data.get("alerts", []):
-            if alert.get("id") == alert_id:
-                return alert
-        
-        return None
+        return AlertStore.get_alert(db, alert_id)
     
     @staticmethod
-    def filter_alerts(alerts_data: Dict[str, Any], 
+    def filter_alerts(db: Session,
+                     universe: str = "mundo",
+                     session_id: Optional[int] = None,
                      alert_type: Optional[str] = None,
                      urgency: Optional[str] = None,
                      actionable_only: bool = False) -> Dict[str, Any]:
-        """Filtre les alertes selon des critères"""
-        
-        filtered_alerts = alerts_data.get("alerts", [])
-        
-        # Filtrer par type
-        if alert_type:
-            filtered_alerts = [a for a in filtered_alerts if a.get("type") == alert_type]
-        
-        # Filtrer par urgence
-        if urgency:
-            filtered_alerts = [a for a in filtered_alerts if a.get("urgency") == urgency]
-        
-        # Filtrer les actionnables seulement
-        if actionable_only:
-            filtered_alerts = [a for a in filtered_alerts if a.get("actionable", False)]
-        
-        # Recalculer les stats
-        filtered_stats = AlertService._calculate_alert_stats(filtered_alerts)
-        
-        return {
-            **alerts_data,
-            "alerts": filtered_alerts,
-            "alert_statistics": filtered_stats,
-            "filter_applied": {
-                "type": alert_type,
-                "urgency": urgency,
-                "actionable_only": actionable_only
-            }
-        }
\ No newline at end of file
+        """Filtre les alertes stockées selon des critères (filtrage indexé en base)"""
+        
+        # S'assurer que les alertes stockées sont à jour
+        evaluated = AlertService._refresh(db, universe, session_id)
+        
+        filtered = AlertService._build_response(
+            db, universe, session_id,
+            alert_type=alert_type,
+            urgency=urgency,
+            actionable_only=actionable_only,
+            evaluated=evaluated
+        )
+        filtered["filter_applied"] = {
+            "type": alert_type,
+            "urgency": urgency,
+            "actionable_only": actionable_only
+        }
+        return filtered
@@ -0,0 +1,258 @@
+"""
+Stockage persistant des alertes intelligentes
+
+Les alertes sont identifiées par un hash de leur contenu stable (portée, type,
+attribut, valeur) : une même condition garde le même identifiant d'une
+évaluation à l'autre, ce qui permet de dédupliquer, de conserver la date de
+première détection et d'expirer les alertes qui ne se déclenchent plus.
+
+Une table de versions indique, par portée, si les données ont changé depuis
+la dernière évaluation : les règles ne sont réévaluées qu'après un événement
+(tirage enregistré, modèle réentraîné), ou quand la dernière évaluation date
+de plus de ALERT_TTL (les alertes stockées auraient sinon toutes expiré).
+"""
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from app.models.alert import Alert, AlertEvaluation
+from app.services import events
+
+class AlertStore:
+
+    # Durée de vie d'une alerte non reconfirmée
+    ALERT_TTL = timedelta(hours=24)
+
+    # Champs stables définissant l'identité d'une alerte
+    IDENTITY_FIELDS = ("type", "attribute_type", "attribute_value", "predicted_value", "pattern_type")
+
+    # Champs stockés en colonnes plutôt que dans le payload
+    COLUMN_FIELDS = ("id", "timestamp", "first_seen", "last_seen", "stale")
+
+    # Sérialise les écritures : une source tardive enregistre son résultat
+    # dans sa propre session, en même temps que l'évaluation principale
+    _write_lock = threading.Lock()
+
+    @staticmethod
+    def universe_key(universe: str, session_id: Optional[int] = None) -> str:
+        """Portée des alertes : univers global ou univers d'une session"""
+        return f"{universe}_session_{session_id}" if session_id else universe
+
+    @staticmethod
+    def alert_id(universe_key: str, alert: Dict[str, Any]) -> str:
+        """Identifiant stable dérivé du contenu de l'alerte"""
+        parts = [universe_key] + [str(alert.get(field, "")) for field in AlertStore.IDENTITY_FIELDS]
+        digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+        source = alert.get("source", "alert")
+        return f"{source}_{digest}"
+
+    # ------------------------------------------------------------------
+    # Versions
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def pending_version(db: Session, universe_key: str) -> Optional[int]:
+        """
+        Version des données à évaluer, ou None si les alertes stockées sont à jour
+
+        Une évaluation plus ancienne que ALERT_TTL est refaite même sans
+        nouvel événement, pour renouveler l'expiration des alertes.
+        """
+        state = db.query(AlertEvaluation).filter(AlertEvaluation.universe_key == universe_key).first()
+        if state is None:
+            state = AlertEvaluation(universe_key=universe_key, data_version=1, evaluated_version=0)
+            db.add(state)
+            db.commit()
+        if state.evaluated_version >= state.data_version:
+            if state.evaluated_at is not None and datetime.now() - state.evaluated_at < AlertStore.ALERT_TTL:
+                return None
+        return state.data_version
+
+    @staticmethod
+    def mark_stale(db: Session, universe: Optional[str] = None):
+        """Incrémente la version des données (toutes les portées, ou celles d'un univers)"""
+        query = db.query(AlertEvaluation)
+        if universe:
+            query = query.filter(
+                (AlertEvaluation.universe_key == universe)
+                | AlertEvaluation.universe_key.like(f"{universe}_session_%")
+            )
+        query.update(
+            {AlertEvaluation.data_version: AlertEvaluation.data_version + 1},
+            synchronize_session=False
+        )
+        db.commit()
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def store_evaluation(
+        db: Session,
+        universe_key: str,
+        alerts: List[Dict[str, Any]],
+        version: Optional[int],
+        sources: Optional[List[str]] = None
+    ) -> int:
+        """
+        Enregistre le résultat d'une évaluation d'une portée
+
+        Les alertes identiques sont fusionnées (priorité maximale conservée),
+        celles déjà connues sont rafraîchies, et les alertes actives des sources
+        évaluées absentes de ce résultat sont désactivées (sources=None : toutes).
+        Si version est None, l'état d'évaluation de la portée n'est pas modifié
+        (résultat tardif d'une seule source). Les écritures concurrentes sont
+        sérialisées : chacune relit les alertes existantes après le commit de
+        la précédente. Retourne le nombre d'alertes enregistrées.
+        """
+        with AlertStore._write_lock:
+            return AlertStore._store_evaluation(db, universe_key, alerts, version, sources)
+
+    @staticmethod
+    def _store_evaluation(
+        db: Session,
+        universe_key: str,
+        alerts: List[Dict[str, Any]],
+        version: Optional[int],
+        sources: Optional[List[str]]
+    ) -> int:
+        """Écriture d'une évaluation (appelée sous _write_lock)"""
+        now = datetime.now()
+        expires_at = now + AlertStore.ALERT_TTL
+
+        # Déduplication au sein de l'évaluation
+        unique = {}
+        for alert in alerts:
+            alert_id = AlertStore.alert_id(universe_key, alert)
+            if alert_id not in unique or alert.get("priority", 0) > unique[alert_id].get("priority", 0):
+                unique[alert_id] = alert
+
+        existing = {}
+        if unique:
+            existing = {
+                row.id: row for row in
+                db.query(Alert).filter(Alert.id.in_(list(unique.keys()))).populate_existing().all()
+            }
+
+        for alert_id, alert in unique.items():
+            payload = {k: v for k, v in alert.items() if k not in AlertStore.COLUMN_FIELDS}
+            row = existing.get(alert_id)
+            if row is None:
+                row = Alert(id=alert_id, universe_key=universe_key, first_seen=now)
+                db.add(row)
+            elif not row.is_active or row.expires_at < now:
+                row.first_seen = now
+            row.source = alert.get("source", "alert")
+            row.alert_type = alert.get("type", "unknown")
+            row.urgency = alert.get("urgency", "low")
+            row.actionable = bool(alert.get("actionable", False))
+            row.priority = float(alert.get("priority", 0))
+            row.payload = payload
+            row.last_seen = now
+            row.expires_at = expires_at
+            row.is_active = True
+
+        # Écrire les alertes reconfirmées avant la purge (pas d'autoflush) :
+        # une alerte expirée en base mais reconfirmée ne doit pas être supprimée
+        db.flush()
+
+        # Les conditions qui ne se déclenchent plus sont résolues
+        resolved = db.query(Alert).filter(
+            Alert.universe_key == universe_key,
+            Alert.is_active == True
+        )
+        if sources is not None:
+            resolved = resolved.filter(Alert.source.in_(list(sources)))
+        if unique:
+            resolved = resolved.filter(~Alert.id.in_(list(unique.keys())))
+        resolved.update({Alert.is_active: False}, synchronize_session=False)
+
+        # Purge des alertes expirées de cette portée
+        db.query(Alert).filter(
+            Alert.universe_key == universe_key,
+            Alert.expires_at < now
+        ).delete(synchronize_session=False)
+
+        if version is not None:
+            state = db.query(AlertEvaluation).filter(AlertEvaluation.universe_key == universe_key).first()
+            if state is None:
+                state = AlertEvaluation(universe_key=universe_key, data_version=version)
+                db.add(state)
+            state.evaluated_version = max(state.evaluated_version or 0, version)
+            state.evaluated_at = now
+
+        db.commit()
+        return len(unique)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def to_dict(row: Alert) -> Dict[str, Any]:
+        """Reconstitue l'alerte telle que servie par l'API"""
+        return {
+            **(row.payload or {}),
+            "id": row.id,
+            "type": row.alert_type,
+            "urgency": row.urgency,
+            "actionable": row.actionable,
+            "priority": row.priority,
+            "timestamp": row.last_seen.isoformat(),
+            "first_seen": row.first_seen.isoformat(),
+            "last_seen": row.last_seen.isoformat()
+        }
+
+    @staticmethod
+    def query_alerts(
+        db: Session,
+        universe_key: str,
+        alert_type: Optional[str] = None,
+        urgency: Optional[str] = None,
+        actionable_only: bool = False,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Alertes actives et non expirées d'une portée, par priorité décroissante"""
+        query = db.query(Alert).filter(
+            Alert.universe_key == universe_key,
+            Alert.is_active == True,
+            Alert.expires_at >= datetime.now()
+        )
+        if alert_type:
+            query = query.filter(Alert.alert_type == alert_type)
+        if urgency:
+            query = query.filter(Alert.urgency == urgency)
+        if actionable_only:
+            query = query.filter(Alert.actionable == True)
+        query = query.order_by(Alert.priority.desc(), Alert.id)
+        if limit:
+            query = query.limit(limit)
+        return [AlertStore.to_dict(row) for row in query.all()]
+
+    @staticmethod
+    def get_alert(db: Session, alert_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère une alerte par son identifiant"""
+        row = db.query(Alert).filter(Alert.id == alert_id).first()
+        return AlertStore.to_dict(row) if row else None
+
+    # ------------------------------------------------------------------
+    # Abonnements aux événements
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def on_draw_saved(db: Session = None, **payload):
+        """Un nouveau tirage rend toutes les portées obsolètes"""
+        if db is not None:
+            AlertStore.mark_stale(db)
+
+    @staticmethod
+    def on_model_retrained(db: Session = None, universe: Optional[str] = None, **payload):
+        """Un modèle réentraîné rend obsolètes les alertes de son univers"""
+        if db is not None:
+            AlertStore.mark_stale(db, universe)
+
+
+events.subscribe(events.DRAW_SAVED, AlertStore.on_draw_saved)
+events.subscribe(events.MODEL_RETRAINED, AlertStore.on_model_retrained)
@@ -0,0 +1,169 @@
+"""
+Instantanés d'analyse partagés
+
+Un instantané regroupe, pour une portée (univers, session), les données
+d'analyse lues par les stratégies de génération et les alertes : prédictions
+LSTM, table des écarts et table des fréquences. Chaque partie est chargée à
+la première demande, une seule fois même en cas d'appels concurrents, puis
+réutilisée par toutes les requêtes pendant SNAPSHOT_TTL secondes.
+
+Les instantanés sont invalidés dès qu'une donnée source change (tirage
+enregistré, modèle réentraîné, tables d'analyse recalculées).
+"""
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple, Callable
+from sqlalchemy.orm import Session
+from app.services import events
+from app.services.ml_service import MLService
+from app.services.gap_analysis_service import GapAnalysisService
+from app.services.frequency_service import FrequencyService
+
+
+class AnalysisSnapshot:
+    """Données d'analyse d'une portée, chargées paresseusement par partie"""
+
+    def __init__(self, universe: str, session_id: Optional[int], loaders: Dict[str, Callable]):
+        self.universe = universe
+        self.session_id = session_id
+        self.universe_key = f"{universe}_session_{session_id}" if session_id else universe
+        self.created_at = time.time()
+        self._loaders = loaders
+        self._parts: Dict[str, Any] = {}
+        self._locks = {part: threading.Lock() for part in loaders}
+
+    def get(self, db: Session, part: str) -> Any:
+        """Retourne une partie de l'instantané (chargée au premier appel)"""
+        if part in self._parts:
+            return self._parts[part]
+        with self._locks[part]:
+            if part not in self._parts:
+                self._parts[part] = self._loaders[part](db, self)
+            return self._parts[part]
+
+    def loaded_parts(self):
+        """Parties déjà chargées (diagnostic)"""
+        return sorted(self._parts)
+
+    # ------------------------------------------------------------------
+    # Vues dérivées
+    # ------------------------------------------------------------------
+
+    def lstm_predictions(self, db: Session) -> Dict[str, Any]:
+        """Prédictions LSTM complètes (format MLService.predict_all_lstm)"""
+        return self.get(db, "lstm")
+
+    def lstm_scores(self, db: Session) -> Dict[str, Dict[str, float]]:
+        """Confiance LSTM (%) de chaque valeur prédite, par type d'attribut"""
+        tables = {}
+        for attr_type, prediction in self.lstm_predictions(db).get("detailed_predictions", {}).items():
+            if "error" in prediction:
+                continue
+            for pred in prediction.get("predictions", []):
+                tables.setdefault(attr_type, {})[str(pred["predicted_value"])] = pred["confidence_percent"]
+        return tables
+
+    def gap_ratios(self, db: Session) -> Dict[str, Dict[str, float]]:
+        """Ratio écart actuel / écart moyen de chaque valeur, par type d'attribut"""
+        return {
+            attr_type: {row["value"]: row["delay_ratio"] for row in rows}
+            for attr_type, rows in self.get(db, "gaps").items()
+        }
+
+    def overdue(self, db: Session, threshold_multiplier: float = 1.5) -> Dict[str, list]:
+        """Attributs en retard (format GapAnalysisService.get_overdue_attributes)"""
+        overdue = {}
+        for attr_type, rows in self.get(db, "gaps").items():
+            late = [row for row in rows if row["delay_ratio"] > threshold_multiplier]
+            if late:
+                overdue[attr_type] = late
+        return overdue
+
+    def heat_scores(self, db: Session) -> Dict[str, Dict[str, float]]:
+        """Score de chaleur de chaque valeur, par type d'attribut"""
+        return {
+            attr_type: {row["value"]: row["heat_score"] for row in rows}
+            for attr_type, rows in self.get(db, "frequency").items()
+        }
+
+    def trending(self, db: Session, trend_type: str = "increasing") -> Dict[str, list]:
+        """Attributs d'une tendance donnée (format FrequencyService.get_trending_attributes)"""
+        trending = {}
+        for attr_type, rows in self.get(db, "frequency").items():
+            matching = [row for row in rows if row["trend"] == trend_type]
+            if matching:
+                trending[attr_type] = matching
+        return trending
+
+
+class AnalysisSnapshotService:
+    """
+    Cache des instantanés d'analyse par (univers, session)
+    """
+
+    # Durée de réutilisation d'un instantané entre requêtes (secondes)
+    SNAPSHOT_TTL = 60
+
+    # Chargement de chaque partie : (db, instantané) -> données
+    LOADERS = {
+        "lstm": lambda db, snapshot: MLService.predict_all_lstm(db, snapshot.universe),
+        "gaps": lambda db, snapshot: GapAnalysisService.get_gap_table(db, snapshot.universe_key),
+        "frequency": lambda db, snapshot: FrequencyService.get_frequency_table(db, snapshot.universe_key),
+    }
+
+    _snapshots: Dict[Tuple[str, Optional[int]], AnalysisSnapshot] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_snapshot(universe: str, session_id: Optional[int] = None) -> AnalysisSnapshot:
+        """Instantané courant d'une portée (créé vide s'il est absent ou expiré)"""
+        key = (universe, session_id)
+        with AnalysisSnapshotService._lock:
+            snapshot = AnalysisSnapshotService._snapshots.get(key)
+            if snapshot is None or time.time() - snapshot.created_at >= AnalysisSnapshotService.SNAPSHOT_TTL:
+                snapshot = AnalysisSnapshot(universe, session_id, AnalysisSnapshotService.LOADERS)
+                AnalysisSnapshotService._snapshots[key] = snapshot
+            return snapshot
+
+    @staticmethod
+    def invalidate(universe: Optional[str] = None, session_id: Optional[int] = None):
+        """
+        Oublie les instantanés : tous, ceux d'un univers, ou celui d'une session
+
+        Les appelants qui détiennent déjà un instantané le terminent sans
+        interruption ; les suivants en obtiennent un nouveau.
+        """
+        with AnalysisSnapshotService._lock:
+            if universe is None and session_id is None:
+                AnalysisSnapshotService._snapshots.clear()
+                return
+            for key in list(AnalysisSnapshotService._snapshots):
+                if universe is not None and key[0] != universe:
+                    continue
+                if session_id is not None and key[1] != session_id:
+                    continue
+                del AnalysisSnapshotService._snapshots[key]
+
+    # ------------------------------------------------------------------
+    # Abonnements aux événements
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def on_draw_saved(**payload):
+        """Un nouveau tirage rend tous les instantanés obsolètes"""
+        AnalysisSnapshotService.invalidate()
+
+    @staticmethod
+    def on_model_retrained(universe: Optional[str] = None, **payload):
+        """Un modèle réentraîné rend obsolètes les instantanés de son univers"""
+        AnalysisSnapshotService.invalidate(universe)
+
+    @staticmethod
+    def on_analysis_updated(universe: Optional[str] = None, session_id: Optional[int] = None, **payload):
+        """Des tables recalculées rendent obsolètes les instantanés de leur portée"""
+        AnalysisSnapshotService.invalidate(universe, session_id)
+
+
+events.subscribe(events.DRAW_SAVED, AnalysisSnapshotService.on_draw_saved)
+events.subscribe(events.MODEL_RETRAINED, AnalysisSnapshotService.on_model_retrained)
+events.subscribe(events.ANALYSIS_UPDATED, AnalysisSnapshotService.on_analysis_updated)
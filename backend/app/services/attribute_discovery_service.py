@@ -1,64 +1,204 @@
 """
 Service de Découverte Automatique des Attributs
 Détecte automatiquement les nouveaux attributs dans la base de données
+
+Les métadonnées de chaque univers (nombre de valeurs distinctes, listes de
+valeurs, type déduit, complétude) sont calculées en une requête d'agrégation
+pour les comptages, plus une requête DISTINCT ... ORDER BY ... LIMIT par
+attribut pour les valeurs, et conservées dans un registre en mémoire,
+invalidé par un changement de version des données.
 """
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text, inspect
 from datetime import datetime
+from app.database.universe_tables import CHIP_COLUMN
+from app.services import events
 
 class AttributeDiscoveryService:
     """
     Service pour découvrir automatiquement les attributs disponibles
     """
     
+    # Colonnes qui ne sont pas des attributs (identifiants, dates, numéros, colonnes dérivées)
+    EXCLUDED_COLUMNS = {
+        'combination_id', 'num1', 'num2', 'univers', 
+        'created_at', 'updated_at', 'id', 'date_tirage',
+        'parite_id', 'unidos_id', CHIP_COLUMN
+    }
+    
+    # Attributs portés par une table de référence du même nom : (colonne de clé, alias)
+    JOINED_ATTRIBUTES = {
+        'parite': ('parite_id', 'p'),
+        'unidos': ('unidos_id', 'u')
+    }
+    
+    FALLBACK_ATTRIBUTES = ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
+    
+    # Nombre maximal de valeurs conservées par attribut dans le registre
+    VALUES_LIMIT = 100
+    
+    _columns: Dict[str, List[str]] = {}
+    _registry: Dict[str, Dict[str, Any]] = {}
+    _data_version = 0
+    _lock = threading.Lock()
+    
     @staticmethod
     def discover_attributes(db: Session, table_name: str = "combinations") -> List[str]:
         """Découvre automatiquement tous les attributs disponibles dans la table"""
         
+        with AttributeDiscoveryService._lock:
+            cached = AttributeDiscoveryService._columns.get(table_name)
+        if cached is not None:
+            return list(cached)
+        
         try:
-            # Obtenir la structure de la table
+            # Obtenir la structure de la table (une fois par version des données)
             inspector = inspect(db.bind)
-            columns = inspector.get_columns(table_name)
+            columns = {column['name'] for column in inspector.get_columns(table_name)}
             
-            # Filtrer les colonnes qui sont des attributs (pas les IDs, dates, etc.)
-            excluded_columns = {
-                'combination_id', 'num1', 'num2', 'univers', 
-                'created_at', 'updated_at', 'id', 'date_tirage'
-            }
-            
-            attribute_columns = []
-            for column in columns:
-                column_name = column['name']
-                if column_name not in excluded_columns:
-                    attribute_columns.append(column_name)
+            attribute_columns = [
+                column for column in columns
+                if column not in AttributeDiscoveryService.EXCLUDED_COLUMNS
+            ]
+            if table_name == "combinations":
+                attribute_columns += [
+                    attribute for attribute, (key_column, _) in AttributeDiscoveryService.JOINED_ATTRIBUTES.items()
+                    if key_column in columns and attribute not in columns
+                ]
+            attribute_columns = sorted(attribute_columns)
             
             print(f"🔍 Attributs découverts: {attribute_columns}")
-            return sorted(attribute_columns)
+            with AttributeDiscoveryService._lock:
+                AttributeDiscoveryService._columns[table_name] = attribute_columns
+            return list(attribute_columns)
             
         except Exception as e:
             print(f"❌ Erreur découverte attributs: {e}")
             # Fallback vers la liste statique
-            return ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
+            return list(AttributeDiscoveryService.FALLBACK_ATTRIBUTES)
+    
+    @staticmethod
+    def _attribute_expression(attribute: str) -> str:
+        """Expression SQL d'un attribut dans la requête sur combinations"""
+        if attribute in AttributeDiscoveryService.JOINED_ATTRIBUTES:
+            return f"{AttributeDiscoveryService.JOINED_ATTRIBUTES[attribute][1]}.{attribute}"
+        return f"c.{attribute}"
+    
+    @staticmethod
+    def _joins(attributes: List[str]) -> str:
+        """Jointures vers les tables de référence des attributs demandés"""
+        return ''.join(
+            f"\n            LEFT JOIN {attribute} {alias} ON c.{key_column} = {alias}.{key_column}"
+            for attribute, (key_column, alias) in AttributeDiscoveryService.JOINED_ATTRIBUTES.items()
+            if attribute in attributes
+        )
+    
+    @staticmethod
+    def _fetch_values(db: Session, attribute: str, universe: str, limit: int) -> List[Any]:
+        """Valeurs distinctes d'un attribut, triées par la base (ordre typé), au plus limit"""
+        expression = AttributeDiscoveryService._attribute_expression(attribute)
+        result = db.execute(text(f"""
+            SELECT DISTINCT {expression} AS value
+            FROM combinations c{AttributeDiscoveryService._joins([attribute])}
+            WHERE c.univers = :universe
+            AND {expression} IS NOT NULL
+            ORDER BY {expression}
+            LIMIT :limit
+        """), {"universe": universe, "limit": limit})
+        return [row.value for row in result.fetchall()]
+    
+    @staticmethod
+    def _build_registry(db: Session, universe: str, version: int) -> Dict[str, Any]:
+        """Calcule les métadonnées de tous les attributs d'un univers"""
+        
+        attributes = AttributeDiscoveryService.discover_attributes(db)
+        
+        # Comptages de tous les attributs en une requête
+        select_parts = ["COUNT(*) AS total_combinations"]
+        for i, attribute in enumerate(attributes):
+            expression = AttributeDiscoveryService._attribute_expression(attribute)
+            select_parts.append(f"COUNT(DISTINCT {expression}) AS unique_{i}")
+            select_parts.append(f"COUNT({expression}) AS total_{i}")
+        
+        joins = AttributeDiscoveryService._joins(attributes)
+        
+        row = db.execute(text(f"""
+            SELECT {', '.join(select_parts)}
+            FROM combinations c{joins}
+            WHERE c.univers = :universe
+        """), {"universe": universe}).fetchone()
+        
+        total_combinations = row[0] if row else 0
+        metadata = {}
+        for i, attribute in enumerate(attributes):
+            unique_count, total_count = row[1 + 2 * i: 3 + 2 * i] if row else (0, 0)
+            values = AttributeDiscoveryService._fetch_values(
+                db, attribute, universe, AttributeDiscoveryService.VALUES_LIMIT
+            ) if unique_count else []
+            metadata[attribute] = {
+                "unique_values": unique_count or 0,
+                "total_entries": total_count or 0,
+                "values": values,
+                "sample_values": values[:5],
+                "data_type": AttributeDiscoveryService._detect_data_type(values),
+                "completeness": (total_count / total_combinations) if total_combinations else 0
+            }
+        
+        return {
+            "universe": universe,
+            "version": version,
+            "attributes": attributes,
+            "metadata": metadata,
+            "total_combinations": total_combinations,
+            "computed_at": datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def get_registry(db: Session, universe: str = "mundo") -> Dict[str, Any]:
+        """Métadonnées des attributs d'un univers (recalculées après un changement de version)"""
+        
+        with AttributeDiscoveryService._lock:
+            version = AttributeDiscoveryService._data_version
+            registry = AttributeDiscoveryService._registry.get(universe)
+        if registry is not None and registry["version"] == version:
+            return registry
+        
+        registry = AttributeDiscoveryService._build_registry(db, universe, version)
+        with AttributeDiscoveryService._lock:
+            AttributeDiscoveryService._registry[universe] = registry
+        return registry
+    
+    @staticmethod
+    def bump_data_version():
+        """Invalide le registre et la structure des tables mis en cache"""
+        with AttributeDiscoveryService._lock:
+            AttributeDiscoveryService._data_version += 1
+            AttributeDiscoveryService._columns.clear()
+    
+    @staticmethod
+    def on_draw_saved(**payload):
+        """Nouvelles données : le registre sera recalculé à la prochaine lecture"""
+        AttributeDiscoveryService.bump_data_version()
+    
+    @staticmethod
+    def get_attribute_metadata(db: Session, attribute: str, universe: str = "mundo") -> Optional[Dict[str, Any]]:
+        """Métadonnées d'un attribut (None si inconnu)"""
+        return AttributeDiscoveryService.get_registry(db, universe)["metadata"].get(attribute)
     
     @staticmethod
     def get_attribute_values(db: Session, attribute: str, universe: str = "mundo", limit: int = 100) -> List[str]:
         """Récupère les valeurs possibles pour un attribut donné"""
         
         try:
-            query = f"""
-                SELECT DISTINCT {attribute} as value
-                FROM combinations 
-                WHERE univers = :universe 
-                AND {attribute} IS NOT NULL
-                ORDER BY {attribute}
-                LIMIT :limit
-            """
-            
-            result = db.execute(text(query), {"universe": universe, "limit": limit})
-            values = [row.value for row in result.fetchall()]
-            
-            return values
+            metadata = AttributeDiscoveryService.get_attribute_metadata(db, attribute, universe)
+            if not metadata:
+                return []
+            # Le registre ne garde que VALUES_LIMIT valeurs par attribut
+            if limit > AttributeDiscoveryService.VALUES_LIMIT and metadata["unique_values"] > AttributeDiscoveryService.VALUES_LIMIT:
+                return AttributeDiscoveryService._fetch_values(db, attribute, universe, limit)
+            return metadata["values"][:limit]
             
         except Exception as e:
             print(f"❌ Erreur récupération valeurs {attribute}: {e}")
@@ -68,48 +208,31 @@ class AttributeDiscoveryService:
     def analyze_attribute_types(db: Session, universe: str = "mundo") -> Dict[str, Any]:
         """Analyse les types et caractéristiques de chaque attribut"""
         
-        attributes = AttributeDiscoveryService.discover_attributes(db)
-        analysis = {}
+        try:
+            registry = AttributeDiscoveryService.get_registry(db, universe)
+        except Exception as e:
+            print(f"❌ Erreur analyse attributs: {e}")
+            return {
+                "universe": universe,
+                "error": str(e),
+                "discovered_attributes": [],
+                "attribute_analysis": {},
+                "total_attributes": 0,
+                "analysis_timestamp": datetime.now().isoformat()
+            }
         
-        for attribute in attributes:
-            try:
-                # Compter les valeurs uniques
-                query_count = f"""
-                    SELECT COUNT(DISTINCT {attribute}) as unique_count,
-                           COUNT({attribute}) as total_count
-                    FROM combinations 
-                    WHERE univers = :universe 
-                    AND {attribute} IS NOT NULL
-                """
-                
-                result = db.execute(text(query_count), {"universe": universe})
-                row = result.fetchone()
-                
-                # Récupérer quelques exemples de valeurs
-                values = AttributeDiscoveryService.get_attribute_values(db, attribute, universe, 10)
-                
-                analysis[attribute] = {
-                    "unique_values": row.unique_count if row else 0,
-                    "total_entries": row.total_count if row else 0,
-                    "sample_values": values[:5],  # 5 premiers exemples
-                    "data_type": AttributeDiscoveryService._detect_data_type(values),
-                    "completeness": (row.total_count / AttributeDiscoveryService._get_total_combinations(db, universe)) if row and row.total_count else 0
-                }
-                
-            except Exception as e:
-                print(f"❌ Erreur analyse {attribute}: {e}")
-                analysis[attribute] = {
-                    "error": str(e),
-                    "unique_values": 0,
-                    "total_entries": 0
-                }
+        analysis = {
+            attribute: {key: value for key, value in metadata.items() if key != "values"}
+            for attribute, metadata in registry["metadata"].items()
+        }
         
         return {
             "universe": universe,
-            "discovered_attributes": attributes,
+            "discovered_attributes": registry["attributes"],
             "attribute_analysis": analysis,
-            "total_attributes": len(attributes),
-            "analysis_timestamp": datetime.now().isoformat()
+            "total_attributes": len(registry["attributes"]),
+            "data_version": registry["version"],
+            "analysis_timestamp": registry["computed_at"]
         }
     
     @staticmethod
@@ -140,10 +263,7 @@ class AttributeDiscoveryService:
         """Récupère le nombre total de combinaisons pour un univers"""
         
         try:
-            query = "SELECT COUNT(*) as total FROM combinations WHERE univers = :universe"
-            result = db.execute(text(query), {"universe": universe})
-            row = result.fetchone()
-            return row.total if row else 0
+            return AttributeDiscoveryService.get_registry(db, universe)["total_combinations"]
         except:
             return 0
     
@@ -170,4 +290,7 @@ class AttributeDiscoveryService:
                 "error": str(e),
                 "discovered_attributes": [],
                 "update_needed": False
-            }
\ No newline at end of file
+            }
+
+
+events.subscribe(events.DRAW_SAVED, AttributeDiscoveryService.on_draw_saved)
@@ -2,14 +2,15 @@
 Service de Génération de Combinaisons Optimales
 Générateur intelligent basé sur l'IA, les patterns et les analyses statistiques
 """
-import random
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from sqlalchemy.orm import Session
 from datetime import datetime
-from app.services.ml_service import MLService
-from app.services.gap_analysis_service import GapAnalysisService
-# from app.services.pattern_detection_service import PatternDetectionService
-from app.services.frequency_service import FrequencyService
+import numpy as np
+from app.services.pattern_detection_service import PatternDetectionService
+from app.services.analysis_snapshot_service import AnalysisSnapshotService
+from app.services.combination_search_service import CombinationSearchService
+from app.services.number_generator_service import NumberGeneratorService
+from app.services.attribute_discovery_service import AttributeDiscoveryService
 
 class CombinationGeneratorService:
     """
@@ -26,6 +27,24 @@ class CombinationGeneratorService:
         'RANDOM_OPTIMIZED': 'Aléatoire optimisé'
     }
     
+    # Score global de chaque stratégie (pertinence pour la sélection diversifiée)
+    SCORE_KEYS = {
+        'LSTM_BASED': 'total_confidence',
+        'GAP_BASED': 'total_delay_score',
+        'PATTERN_BASED': 'total_pattern_score',
+        'FREQUENCY_BASED': 'total_frequency_score',
+        'HYBRID_SMART': 'total_hybrid_score',
+        'RANDOM_OPTIMIZED': 'randomness_score'
+    }
+    
+    # Taille du vivier de candidats : max(minimum, facteur x nombre demandé), bornée
+    CANDIDATE_POOL_MIN = 200
+    CANDIDATE_POOL_FACTOR = 10
+    CANDIDATE_POOL_MAX = 2000
+    
+    # Nombre maximal de combinaisons par requête
+    MAX_COMBINATIONS = 100
+    
     @staticmethod
     def generate_combinations(
         db: Session, 
@@ -45,47 +64,56 @@ class CombinationGeneratorService:
                 "avoid_duplicates": True,
                 "min_diversity": 0.7,
                 "max_consecutive": 2,
-                "balance_attributes": True
+                "balance_attributes": True,
+                "relevance_weight": 0.7
             }
         
         combinations = []
+        num_combinations = min(num_combinations, CombinationGeneratorService.MAX_COMBINATIONS)
+        pool_size = min(
+            CombinationGeneratorService.CANDIDATE_POOL_MAX,
+            max(
+                CombinationGeneratorService.CANDIDATE_POOL_MIN,
+                CombinationGeneratorService.CANDIDATE_POOL_FACTOR * num_combinations
+            )
+        )
         
         try:
             if strategy == "LSTM_BASED":
                 combinations = CombinationGeneratorService._generate_lstm_combinations(
-                    db, universe, num_combinations, constraints
+                    db, universe, pool_size, constraints
                 )
             elif strategy == "GAP_BASED":
                 combinations = CombinationGeneratorService._generate_gap_combinations(
-                    db, universe, num_combinations, session_id, constraints
+                    db, universe, pool_size, session_id, constraints
                 )
             elif strategy == "PATTERN_BASED":
                 combinations = CombinationGeneratorService._generate_pattern_combinations(
-                    db, universe, num_combinations, constraints
+                    db, universe, pool_size, constraints
                 )
             elif strategy == "FREQUENCY_BASED":
                 combinations = CombinationGeneratorService._generate_frequency_combinations(
-                    db, universe, num_combinations, session_id, constraints
+                    db, universe, pool_size, session_id, constraints
                 )
             elif strategy == "HYBRID_SMART":
                 combinations = CombinationGeneratorService._generate_hybrid_combinations(
-                    db, universe, num_combinations, session_id, constraints
+                    db, universe, pool_size, session_id, constraints
                 )
             elif strategy == "RANDOM_OPTIMIZED":
                 combinations = CombinationGeneratorService._generate_random_optimized_combinations(
-                    db, universe, num_combinations, constraints
+                    db, universe, pool_size, constraints
                 )
             else:
                 raise ValueError(f"Stratégie inconnue: {strategy}")
             
-            # Post-traitement et optimisation
+            # Sélection diversifiée parmi les candidats
             combinations = CombinationGeneratorService._optimize_combinations(
-                combinations, constraints
+                combinations, constraints, strategy, num_combinations
             )
             
             # Calculer les scores et statistiques
             result = CombinationGeneratorService._analyze_generated_combinations(
-                combinations, strategy, universe, session_id
+                combinations, strategy, universe, session_id, db
             )
             
             print(f"✅ {len(combinations)} combinaisons générées avec succès")
@@ -102,6 +130,114 @@ class CombinationGeneratorService:
                 "timestamp": datetime.now().isoformat()
             }
     
+    @staticmethod
+    def stream_with_numbers(
+        db: Session,
+        universe: str = "mundo",
+        strategy: str = "HYBRID_SMART",
+        num_combinations: int = 10,
+        session_id: Optional[int] = None,
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Génère des combinaisons et les convertit en paires de numéros, au fil de l'eau
+        
+        Les accès à la base (génération, chargement de l'index des attributs)
+        sont faits avant de renvoyer l'itérateur : la conversion elle-même se
+        fait en mémoire, combinaison par combinaison. L'itérateur produit un
+        résumé, puis une entrée par combinaison, puis une entrée de fin.
+        """
+        
+        result = CombinationGeneratorService.generate_combinations(
+            db, universe, strategy, num_combinations, session_id, constraints
+        )
+        combinations = result.pop("combinations", [])
+        index = NumberGeneratorService.get_index(db, universe) if combinations else None
+        
+        def entries():
+            yield {"type": "summary", **result}
+            
+            methods: Dict[str, int] = {}
+            for i, combo in enumerate(combinations):
+                numbers = NumberGeneratorService.convert_attributes_to_numbers(
+                    db, combo.get("attributes", {}), universe, index=index
+                )
+                method = numbers.get("method", "unknown")
+                methods[method] = methods.get(method, 0) + 1
+                yield {"type": "combination", "index": i, **combo, "number_generation": numbers}
+            
+            yield {
+                "type": "end",
+                "total_combinations": len(combinations),
+                "conversion_methods": methods,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        return entries()
+    
+    @staticmethod
+    def generate_with_numbers(
+        db: Session,
+        universe: str = "mundo",
+        strategy: str = "HYBRID_SMART",
+        num_combinations: int = 10,
+        session_id: Optional[int] = None,
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Génère des combinaisons avec leurs paires de numéros, en une seule réponse"""
+        
+        result: Dict[str, Any] = {}
+        combinations = []
+        for entry in CombinationGeneratorService.stream_with_numbers(
+            db, universe, strategy, num_combinations, session_id, constraints
+        ):
+            entry_type = entry.pop("type")
+            if entry_type == "summary":
+                result = entry
+            elif entry_type == "combination":
+                entry.pop("index")
+                combinations.append(entry)
+            else:
+                result["conversion_methods"] = entry["conversion_methods"]
+        
+        result["combinations"] = combinations
+        return result
+    
+    # Pondération des sources dans la stratégie hybride
+    HYBRID_WEIGHTS = {
+        "lstm": 0.4,
+        "gap": 0.3,
+        "frequency": 0.3
+    }
+    
+    @staticmethod
+    def _pattern_score_tables(db: Session, universe: str) -> Dict[str, Dict[str, float]]:
+        """z-score de fréquence récente (détecteur de patterns), par type d'attribut"""
+        return PatternDetectionService.get_value_scores(db, universe)
+    
+    @staticmethod
+    def _build_combinations(
+        results: List[Dict[str, Any]],
+        prefix: str,
+        strategy: str,
+        scores_key: str,
+        total_key: str,
+        generation_method: str
+    ) -> List[Dict[str, Any]]:
+        """Met en forme les résultats du moteur de recherche pour une stratégie"""
+        combinations = []
+        for i, result in enumerate(results):
+            combinations.append({
+                "id": f"{prefix}_{i+1}",
+                "strategy": strategy,
+                "attributes": result["attributes"],
+                scores_key: result.get("scores", {}),
+                total_key: round(result["total"], 3),
+                "catalog_matches": result["catalog_matches"],
+                "generation_method": generation_method
+            })
+        return combinations
+    
     @staticmethod
     def _generate_lstm_combinations(
         db: Session, 
@@ -113,59 +249,15 @@ class CombinationGeneratorService:
         
         print("🧠 Génération basée sur LSTM...")
         
-        combinations = []
-        
         try:
-            # Obtenir les prédictions LSTM
-            lstm_predictions = MLService.predict_all_lstm(db, universe)
-            
-            if "top_predictions" not in lstm_predictions:
-                return []
-            
-            # Organiser les prédictions par type d'attribut
-            predictions_by_type = {}
-            for pred in lstm_predictions["top_predictions"]:
-                attr_type = pred["attribute_type"]
-                if attr_type not in predictions_by_type:
-                    predictions_by_type[attr_type] = []
-                predictions_by_type[attr_type].append(pred)
-            
-            # Générer les combinaisons
-            for i in range(num_combinations):
-                combination = {
-                    "id": f"lstm_{i+1}",
-                    "strategy": "LSTM_BASED",
-                    "attributes": {},
-                    "confidence_scores": {},
-                    "total_confidence": 0,
-                    "generation_method": "AI Neural Network"
-                }
-                
-                total_confidence = 0
-                attribute_count = 0
-                
-                # Sélectionner les meilleurs attributs de chaque type
-                for attr_type, preds in predictions_by_type.items():
-                    if preds:
-                        # Prendre le meilleur ou varier selon l'index
-                        pred_index = min(i % len(preds), len(preds) - 1)
-                        selected_pred = preds[pred_index]
-                        
-                        combination["attributes"][attr_type] = selected_pred["predicted_value"]
-                        combination["confidence_scores"][attr_type] = selected_pred["confidence_percent"]
-                        total_confidence += selected_pred["confidence_percent"]
-                        attribute_count += 1
-                
-                # Calculer la confiance moyenne
-                if attribute_count > 0:
-                    combination["total_confidence"] = total_confidence / attribute_count
-                
-                combinations.append(combination)
-            
+            tables = AnalysisSnapshotService.get_snapshot(universe).lstm_scores(db)
+            results = CombinationSearchService.search(db, universe, tables, num_combinations)
+            return CombinationGeneratorService._build_combinations(
+                results, "lstm", "LSTM_BASED", "confidence_scores", "total_confidence", "AI Neural Network"
+            )
         except Exception as e:
             print(f"❌ Erreur génération LSTM: {e}")
-        
-        return combinations
+            return []
     
     @staticmethod
     def _generate_gap_combinations(
@@ -179,60 +271,15 @@ class CombinationGeneratorService:
         
         print("⏰ Génération basée sur les écarts...")
         
-        combinations = []
-        
         try:
-            # Adapter l'univers pour les requêtes selon la session
-            universe_key = f"{universe}_session_{session_id}" if session_id else universe
-            
-            # Obtenir les attributs en retard
-            overdue_data = GapAnalysisService.get_overdue_attributes(db, universe_key, threshold=1.5)
-            
-            # Organiser par type d'attribut
-            overdue_by_type = {}
-            for attr_type, attributes in overdue_data.items():
-                overdue_by_type[attr_type] = sorted(
-                    attributes, 
-                    key=lambda x: x.get("delay_ratio", 0), 
-                    reverse=True
-                )
-            
-            # Générer les combinaisons
-            for i in range(num_combinations):
-                combination = {
-                    "id": f"gap_{i+1}",
-                    "strategy": "GAP_BASED",
-                    "attributes": {},
-                    "delay_scores": {},
-                    "total_delay_score": 0,
-                    "generation_method": "Statistical Gap Analysis"
-                }
-                
-                total_delay = 0
-                attribute_count = 0
-                
-                # Sélectionner les attributs les plus en retard
-                for attr_type, attrs in overdue_by_type.items():
-                    if attrs:
-                        # Varier la sélection selon l'index
-                        attr_index = min(i % len(attrs), len(attrs) - 1)
-                        selected_attr = attrs[attr_index]
-                        
-                        combination["attributes"][attr_type] = selected_attr["value"]
-                        combination["delay_scores"][attr_type] = selected_attr.get("delay_ratio", 0)
-                        total_delay += selected_attr.get("delay_ratio", 0)
-                        attribute_count += 1
-                
-                # Calculer le score de retard moyen
-                if attribute_count > 0:
-                    combination["total_delay_score"] = total_delay / attribute_count
-                
-                combinations.append(combination)
-            
+            tables = AnalysisSnapshotService.get_snapshot(universe, session_id).gap_ratios(db)
+            results = CombinationSearchService.search(db, universe, tables, num_combinations)
+            return CombinationGeneratorService._build_combinations(
+                results, "gap", "GAP_BASED", "delay_scores", "total_delay_score", "Statistical Gap Analysis"
+            )
         except Exception as e:
             print(f"❌ Erreur génération écarts: {e}")
-        
-        return combinations
+            return []
     
     @staticmethod
     def _generate_pattern_combinations(
@@ -245,39 +292,15 @@ class CombinationGeneratorService:
         
         print("🔍 Génération basée sur les patterns...")
         
-        combinations = []
-        
         try:
-            # Détecter les cycles (temporairement désactivé)
-            # cycles_data = PatternDetectionService.detect_cycles(db, universe)
-            
-            # Génération simple basée sur les patterns
-            for i in range(num_combinations):
-                combination = {
-                    "id": f"pattern_{i+1}",
-                    "strategy": "PATTERN_BASED",
-                    "attributes": {},
-                    "pattern_scores": {},
-                    "total_pattern_score": 0,
-                    "generation_method": "Pattern Recognition"
-                }
-                
-                # Génération basique pour les patterns
-                # (à améliorer avec des patterns réels détectés)
-                attribute_types = ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
-                
-                for attr_type in attribute_types:
-                    # Simulation d'un pattern détecté
-                    combination["attributes"][attr_type] = f"pattern_value_{i}_{attr_type}"
-                    combination["pattern_scores"][attr_type] = random.uniform(0.5, 0.9)
-                
-                combination["total_pattern_score"] = sum(combination["pattern_scores"].values()) / len(combination["pattern_scores"])
-                combinations.append(combination)
-            
+            tables = CombinationGeneratorService._pattern_score_tables(db, universe)
+            results = CombinationSearchService.search(db, universe, tables, num_combinations)
+            return CombinationGeneratorService._build_combinations(
+                results, "pattern", "PATTERN_BASED", "pattern_scores", "total_pattern_score", "Pattern Recognition"
+            )
         except Exception as e:
             print(f"❌ Erreur génération patterns: {e}")
-        
-        return combinations
+            return []
     
     @staticmethod
     def _generate_frequency_combinations(
@@ -291,57 +314,25 @@ class CombinationGeneratorService:
         
         print("📈 Génération basée sur les fréquences...")
         
-        combinations = []
-        
         try:
-            # Adapter l'univers pour les requêtes selon la session
-            universe_key = f"{universe}_session_{session_id}" if session_id else universe
-            
-            # Obtenir les prédictions basées sur les fréquences
-            freq_predictions = FrequencyService.predict_next_likely(db, universe_key, top_n=10)
-            
-            # Organiser par type d'attribut
-            freq_by_type = {}
-            for pred in freq_predictions.get("predictions", []):
-                attr_type = pred.get("attribute_type")
-                if attr_type not in freq_by_type:
-                    freq_by_type[attr_type] = []
-                freq_by_type[attr_type].append(pred)
-            
-            # Générer les combinaisons
-            for i in range(num_combinations):
-                combination = {
-                    "id": f"freq_{i+1}",
-                    "strategy": "FREQUENCY_BASED",
-                    "attributes": {},
-                    "frequency_scores": {},
-                    "total_frequency_score": 0,
-                    "generation_method": "Frequency Analysis"
-                }
-                
-                total_freq_score = 0
-                attribute_count = 0
-                
-                # Sélectionner selon les fréquences
-                for attr_type, preds in freq_by_type.items():
-                    if preds:
-                        pred_index = min(i % len(preds), len(preds) - 1)
-                        selected_pred = preds[pred_index]
-                        
-                        combination["attributes"][attr_type] = selected_pred.get("value")
-                        combination["frequency_scores"][attr_type] = selected_pred.get("frequency_score", 0)
-                        total_freq_score += selected_pred.get("frequency_score", 0)
-                        attribute_count += 1
-                
-                if attribute_count > 0:
-                    combination["total_frequency_score"] = total_freq_score / attribute_count
-                
-                combinations.append(combination)
-            
+            tables = AnalysisSnapshotService.get_snapshot(universe, session_id).heat_scores(db)
+            results = CombinationSearchService.search(db, universe, tables, num_combinations)
+            return CombinationGeneratorService._build_combinations(
+                results, "freq", "FREQUENCY_BASED", "frequency_scores", "total_frequency_score", "Frequency Analysis"
+            )
         except Exception as e:
             print(f"❌ Erreur génération fréquences: {e}")
-        
-        return combinations
+            return []
+    
+    @staticmethod
+    def _normalize_tables(tables: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        """Ramène chaque table d'attribut dans [-1, 1] (division par le max absolu)"""
+        normalized = {}
+        for attr_type, scores in tables.items():
+            scale = max((abs(v) for v in scores.values()), default=0)
+            if scale > 0:
+                normalized[attr_type] = {value: score / scale for value, score in scores.items()}
+        return normalized
     
     @staticmethod
     def _generate_hybrid_combinations(
@@ -351,61 +342,56 @@ class CombinationGeneratorService:
         session_id: Optional[int],
         constraints: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """Génère des combinaisons hybrides utilisant toutes les méthodes"""
+        """
+        Génère des combinaisons hybrides utilisant toutes les méthodes
         
-        print("🔄 Génération hybride intelligente...")
+        Chaque combinaison du catalogue est notée par toutes les sources à la
+        fois ; les scores sont normalisés par attribut avant pondération. Les
+        trois sources sont lues dans un même instantané d'analyse.
+        """
         
-        combinations = []
+        print("🔄 Génération hybride intelligente...")
         
         try:
-            # Générer des combinaisons avec chaque méthode
-            lstm_combos = CombinationGeneratorService._generate_lstm_combinations(
-                db, universe, max(2, num_combinations // 4), constraints
-            )
-            gap_combos = CombinationGeneratorService._generate_gap_combinations(
-                db, universe, max(2, num_combinations // 4), session_id, constraints
-            )
-            freq_combos = CombinationGeneratorService._generate_frequency_combinations(
-                db, universe, max(2, num_combinations // 4), session_id, constraints
-            )
+            snapshot = AnalysisSnapshotService.get_snapshot(universe, session_id)
+            raw_tables = {
+                "lstm": snapshot.lstm_scores(db),
+                "gap": snapshot.gap_ratios(db),
+                "frequency": snapshot.heat_scores(db)
+            }
             
-            # Combiner et mélanger
-            all_combos = lstm_combos + gap_combos + freq_combos
+            catalog = CombinationSearchService.get_catalog(db, universe)
+            raw = {
+                source: CombinationSearchService.score_catalog(catalog, tables)["total"]
+                for source, tables in raw_tables.items()
+            }
+            hybrid = sum(
+                weight * CombinationSearchService.score_catalog(
+                    catalog, CombinationGeneratorService._normalize_tables(raw_tables[source])
+                )["total"]
+                for source, weight in CombinationGeneratorService.HYBRID_WEIGHTS.items()
+            )
             
-            # Sélectionner les meilleures combinaisons
-            for i, combo in enumerate(all_combos[:num_combinations]):
-                hybrid_combo = {
+            combinations = []
+            for i, row in enumerate(CombinationSearchService.top_k(hybrid, num_combinations)):
+                combinations.append({
                     "id": f"hybrid_{i+1}",
                     "strategy": "HYBRID_SMART",
-                    "attributes": combo.get("attributes", {}),
+                    "attributes": catalog.attributes(row),
                     "hybrid_scores": {
-                        "lstm_confidence": combo.get("total_confidence", 0),
-                        "gap_score": combo.get("total_delay_score", 0),
-                        "frequency_score": combo.get("total_frequency_score", 0)
+                        "lstm_confidence": round(float(raw["lstm"][row]), 3),
+                        "gap_score": round(float(raw["gap"][row]), 3),
+                        "frequency_score": round(float(raw["frequency"][row]), 3)
                     },
-                    "total_hybrid_score": 0,
-                    "generation_method": "Hybrid AI + Statistics",
-                    "source_strategy": combo.get("strategy", "unknown")
-                }
-                
-                # Calculer le score hybride
-                scores = hybrid_combo["hybrid_scores"]
-                hybrid_score = (
-                    scores["lstm_confidence"] * 0.4 +
-                    scores["gap_score"] * 0.3 +
-                    scores["frequency_score"] * 0.3
-                )
-                hybrid_combo["total_hybrid_score"] = hybrid_score
-                
-                combinations.append(hybrid_combo)
-            
-            # Trier par score hybride décroissant
-            combinations.sort(key=lambda x: x["total_hybrid_score"], reverse=True)
+                    "total_hybrid_score": round(float(hybrid[row]), 4),
+                    "catalog_matches": int(catalog.counts[row]),
+                    "generation_method": "Hybrid AI + Statistics"
+                })
+            return combinations
             
         except Exception as e:
             print(f"❌ Erreur génération hybride: {e}")
-        
-        return combinations[:num_combinations]
+            return []
     
     @staticmethod
     def _generate_random_optimized_combinations(
@@ -414,66 +400,82 @@ class CombinationGeneratorService:
         num_combinations: int, 
         constraints: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """Génère des combinaisons aléatoires optimisées"""
+        """Génère des combinaisons aléatoires parmi les combinaisons réelles du catalogue"""
         
         print("🎲 Génération aléatoire optimisée...")
         
-        combinations = []
-        
         try:
-            attribute_types = ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
-            
-            for i in range(num_combinations):
-                combination = {
+            combinations = []
+            for i, result in enumerate(CombinationSearchService.sample(db, universe, num_combinations)):
+                combinations.append({
                     "id": f"random_{i+1}",
                     "strategy": "RANDOM_OPTIMIZED",
-                    "attributes": {},
-                    "randomness_score": random.uniform(0.7, 1.0),
+                    "attributes": result["attributes"],
+                    "randomness_score": round(result["total"], 3),
+                    "catalog_matches": result["catalog_matches"],
                     "generation_method": "Optimized Random"
-                }
-                
-                # Génération aléatoire mais optimisée
-                for attr_type in attribute_types:
-                    # Simulation de valeurs aléatoires optimisées
-                    combination["attributes"][attr_type] = f"random_{attr_type}_{random.randint(1, 100)}"
-                
-                combinations.append(combination)
-            
+                })
+            return combinations
         except Exception as e:
             print(f"❌ Erreur génération aléatoire: {e}")
-        
-        return combinations
+            return []
     
     @staticmethod
     def _optimize_combinations(
         combinations: List[Dict[str, Any]], 
-        constraints: Dict[str, Any]
+        constraints: Dict[str, Any],
+        strategy: str,
+        num_combinations: int
     ) -> List[Dict[str, Any]]:
-        """Optimise les combinaisons selon les contraintes"""
+        """
+        Retient num_combinations candidats selon les contraintes
         
-        if not constraints.get("avoid_duplicates", True):
-            return combinations
+        Sélection par pertinence marginale maximale : le score de la stratégie
+        est mis en balance avec la similarité aux combinaisons déjà retenues,
+        sous contrainte de distance minimale (min_diversity, part d'attributs
+        différents) et de répétition (max_consecutive, nombre maximal de
+        combinaisons successives partageant une même valeur d'attribut).
+        """
         
-        # Supprimer les doublons
-        unique_combinations = []
-        seen_combinations = set()
+        if not combinations:
+            return []
         
-        for combo in combinations:
-            # Créer une signature de la combinaison
-            signature = tuple(sorted(combo.get("attributes", {}).items()))
+        if constraints.get("avoid_duplicates", True):
+            score_key = CombinationGeneratorService.SCORE_KEYS.get(strategy)
+            relevance = np.array([c.get(score_key, 0) for c in combinations], dtype=np.float64)
+            codes = CombinationSearchService.encode_attributes(
+                [c.get("attributes", {}) for c in combinations]
+            )
+            
+            selected, relaxed = CombinationSearchService.select_diverse(
+                relevance,
+                codes,
+                num_combinations,
+                min_distance=constraints.get("min_diversity", 0.0),
+                max_consecutive=constraints.get("max_consecutive"),
+                relevance_weight=constraints.get("relevance_weight", 0.7)
+            )
+            if relaxed:
+                print("⚠️ Contraintes de diversité relâchées (vivier de candidats insuffisant)")
             
-            if signature not in seen_combinations:
-                seen_combinations.add(signature)
-                unique_combinations.append(combo)
+            combinations = [combinations[i] for i in selected]
+        else:
+            combinations = combinations[:num_combinations]
+        
+        # Renumérotation dans l'ordre de sélection
+        for i, combo in enumerate(combinations):
+            prefix = combo.get("id", "combo").rsplit("_", 1)[0]
+            combo["id"] = f"{prefix}_{i+1}"
         
-        return unique_combinations
+        return combinations
     
     @staticmethod
     def _analyze_generated_combinations(
         combinations: List[Dict[str, Any]], 
         strategy: str, 
         universe: str, 
-        session_id: Optional[int]
+        session_id: Optional[int],
+        db: Optional[Session] = None
     ) -> Dict[str, Any]:
         """Analyse les combinaisons générées et calcule les statistiques"""
         
@@ -495,24 +497,32 @@ class CombinationGeneratorService:
         total_combinations = len(combinations)
         
         # Score moyen selon la stratégie
-        if strategy == "LSTM_BASED":
-            scores = [c.get("total_confidence", 0) for c in combinations]
-        elif strategy == "GAP_BASED":
-            scores = [c.get("total_delay_score", 0) for c in combinations]
-        elif strategy == "HYBRID_SMART":
-            scores = [c.get("total_hybrid_score", 0) for c in combinations]
-        else:
-            scores = [0.5 for c in combinations]  # Score par défaut
+        score_key = CombinationGeneratorService.SCORE_KEYS.get(strategy)
+        scores = [c.get(score_key, 0) for c in combinations]
         
         average_score = sum(scores) / len(scores) if scores else 0
         
-        # Index de diversité (simple)
-        unique_attributes = set()
-        for combo in combinations:
-            for attr_value in combo.get("attributes", {}).values():
-                unique_attributes.add(str(attr_value))
-        
-        diversity_index = len(unique_attributes) / (total_combinations * 7) if total_combinations > 0 else 0
+        # Index de diversité : distance de Hamming moyenne entre les paires
+        codes = CombinationSearchService.encode_attributes(
+            [c.get("attributes", {}) for c in combinations]
+        )
+        distances = CombinationSearchService.mean_pairwise_distance(codes)
+        
+        # Couverture : part des valeurs connues de chaque attribut (registre) présentes dans la sélection
+        coverage = {}
+        if db is not None:
+            try:
+                metadata = AttributeDiscoveryService.get_registry(db, universe)["metadata"]
+                for attr_type in CombinationSearchService.ATTRIBUTE_TYPES:
+                    known = metadata.get(attr_type, {}).get("unique_values", 0)
+                    if known:
+                        covered = {
+                            str(c["attributes"][attr_type]) for c in combinations
+                            if c.get("attributes", {}).get(attr_type) is not None
+                        }
+                        coverage[attr_type] = round(len(covered) / known, 3)
+            except Exception as e:
+                print(f"⚠️ Couverture des attributs indisponible: {e}")
         
         return {
             "universe": universe,
@@ -525,7 +535,9 @@ class CombinationGeneratorService:
                 "average_score": round(average_score, 3),
                 "max_score": round(max(scores) if scores else 0, 3),
                 "min_score": round(min(scores) if scores else 0, 3),
-                "diversity_index": round(diversity_index, 3),
+                "diversity_index": round(distances["mean"], 3),
+                "min_pairwise_distance": round(distances["min"], 3),
+                "attribute_coverage": coverage,
                 "unique_combinations": total_combinations
             },
             "generation_timestamp": datetime.now().isoformat(),
@@ -0,0 +1,342 @@
+"""
+Moteur de recherche de combinaisons d'attributs
+Recherche exhaustive et exacte du top-K sur le catalogue réel des combinaisons
+"""
+import random
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import numpy as np
+
+
+class _Catalog:
+    """
+    Catalogue des combinaisons d'attributs distinctes d'un univers
+
+    Chaque ligne est un tuple (forme, engine, ...) réellement présent dans la
+    table combinations, encodé en entiers : codes[i, j] est l'indice de la
+    valeur de l'attribut j dans son vocabulaire, ou len(vocabulaire) si la
+    valeur est absente (case de score toujours nulle).
+    """
+
+    def __init__(self, attribute_types: List[str], rows: List[Any]):
+        self.attribute_types = list(attribute_types)
+        self.vocab: Dict[str, List[str]] = {}
+        self.index: Dict[str, Dict[str, int]] = {}
+
+        n = len(rows)
+        self.codes = np.empty((n, len(attribute_types)), dtype=np.int32)
+        self.counts = np.fromiter((row[-1] for row in rows), dtype=np.int64, count=n)
+
+        for j, attr in enumerate(attribute_types):
+            values = sorted({str(row[j]) for row in rows if row[j] is not None})
+            index = {value: i for i, value in enumerate(values)}
+            missing = len(values)
+            self.vocab[attr] = values
+            self.index[attr] = index
+            self.codes[:, j] = np.fromiter(
+                (index[str(row[j])] if row[j] is not None else missing for row in rows),
+                dtype=np.int32, count=n
+            )
+
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def score_vector(self, attr: str, scores: Dict[Any, float]) -> np.ndarray:
+        """Vecteur de scores aligné sur le vocabulaire (+ case nulle pour les valeurs absentes)"""
+        index = self.index[attr]
+        vector = np.zeros(len(index) + 1, dtype=np.float64)
+        for value, score in scores.items():
+            position = index.get(str(value))
+            if position is not None:
+                vector[position] = score
+        return vector
+
+    def attributes(self, row: int) -> Dict[str, str]:
+        """Valeurs d'attributs d'une ligne du catalogue"""
+        result = {}
+        for j, attr in enumerate(self.attribute_types):
+            code = self.codes[row, j]
+            if code < len(self.vocab[attr]):
+                result[attr] = self.vocab[attr][code]
+        return result
+
+
+class CombinationSearchService:
+    """
+    Classement des combinaisons du catalogue à partir de scores par attribut
+
+    Les scores d'une stratégie sont fournis sous forme de tables
+    {type d'attribut: {valeur: score}} ; le score d'une combinaison est la
+    moyenne des scores de ses valeurs sur les attributs notés. Le catalogue
+    étant borné, le classement est exhaustif et le top-K exact.
+    """
+
+    ATTRIBUTE_TYPES = ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
+
+    # Durée de validité du catalogue en mémoire (secondes)
+    CATALOG_TTL = 600
+
+    _catalogs: Dict[str, _Catalog] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_catalog(db: Session, universe: str) -> _Catalog:
+        """Catalogue encodé d'un univers (chargé une fois puis mis en cache)"""
+        with CombinationSearchService._lock:
+            catalog = CombinationSearchService._catalogs.get(universe)
+            if catalog is not None and time.time() - catalog.loaded_at < CombinationSearchService.CATALOG_TTL:
+                return catalog
+
+        result = db.execute(text("""
+            SELECT
+                c.forme, c.engine, c.beastie, c.tome,
+                p.parite, u.unidos, c.chip,
+                COUNT(*) as combination_count
+            FROM combinations c
+            LEFT JOIN parite p ON c.parite_id = p.parite_id
+            LEFT JOIN unidos u ON c.unidos_id = u.unidos_id
+            WHERE c.univers = :universe
+            GROUP BY c.forme, c.engine, c.beastie, c.tome, p.parite, u.unidos, c.chip
+        """), {"universe": universe})
+
+        catalog = _Catalog(CombinationSearchService.ATTRIBUTE_TYPES, result.fetchall())
+
+        with CombinationSearchService._lock:
+            CombinationSearchService._catalogs[universe] = catalog
+        return catalog
+
+    @staticmethod
+    def invalidate(universe: Optional[str] = None):
+        """Oublie le catalogue d'un univers (ou tous)"""
+        with CombinationSearchService._lock:
+            if universe is None:
+                CombinationSearchService._catalogs.clear()
+            else:
+                CombinationSearchService._catalogs.pop(universe, None)
+
+    @staticmethod
+    def score_catalog(catalog: _Catalog, score_tables: Dict[str, Dict[Any, float]]) -> Dict[str, np.ndarray]:
+        """
+        Scores par attribut et score moyen de chaque ligne du catalogue
+
+        Retourne {"per_attribute": (n, a), "total": (n,), "attributes": [...]}
+        où a est le nombre d'attributs notés.
+        """
+        scored = [attr for attr in catalog.attribute_types if score_tables.get(attr)]
+        per_attribute = np.zeros((len(catalog), len(scored)), dtype=np.float64)
+
+        for k, attr in enumerate(scored):
+            j = catalog.attribute_types.index(attr)
+            vector = catalog.score_vector(attr, score_tables[attr])
+            per_attribute[:, k] = vector[catalog.codes[:, j]]
+
+        total = per_attribute.mean(axis=1) if scored else np.zeros(len(catalog))
+        return {"per_attribute": per_attribute, "total": total, "attributes": scored}
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices des k meilleurs scores, par score décroissant (sélection exacte O(n))"""
+        n = len(scores)
+        if n == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64)
+        k = min(k, n)
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    @staticmethod
+    def search(
+        db: Session,
+        universe: str,
+        score_tables: Dict[str, Dict[Any, float]],
+        k: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-K des combinaisons du catalogue pour des tables de scores
+
+        Chaque résultat contient les attributs, les scores par attribut, le
+        score moyen et le nombre de combinaisons du catalogue partageant ce tuple.
+        """
+        catalog = CombinationSearchService.get_catalog(db, universe)
+        scored = CombinationSearchService.score_catalog(catalog, score_tables)
+        if not scored["attributes"]:
+            return []
+
+        results = []
+        for row in CombinationSearchService.top_k(scored["total"], k):
+            results.append({
+                "attributes": catalog.attributes(row),
+                "scores": {
+                    attr: round(float(scored["per_attribute"][row, j]), 3)
+                    for j, attr in enumerate(scored["attributes"])
+                },
+                "total": float(scored["total"][row]),
+                "catalog_matches": int(catalog.counts[row])
+            })
+        return results
+
+    @staticmethod
+    def sample(db: Session, universe: str, k: int) -> List[Dict[str, Any]]:
+        """
+        Tirage aléatoire de k combinaisons distinctes du catalogue
+
+        Le score de rareté d'une combinaison est la moyenne, sur ses attributs,
+        de 1 - part de la valeur dans le catalogue.
+        """
+        catalog = CombinationSearchService.get_catalog(db, universe)
+        n = len(catalog)
+        if n == 0:
+            return []
+
+        rows = random.sample(range(n), min(k, n))
+
+        rarity = np.zeros(n, dtype=np.float64)
+        for j, attr in enumerate(catalog.attribute_types):
+            shares = np.bincount(catalog.codes[:, j], minlength=len(catalog.vocab[attr]) + 1) / n
+            rarity += 1.0 - shares[catalog.codes[:, j]]
+        rarity /= len(catalog.attribute_types)
+
+        return [{
+            "attributes": catalog.attributes(row),
+            "total": float(rarity[row]),
+            "catalog_matches": int(catalog.counts[row])
+        } for row in rows]
+
+    # ------------------------------------------------------------------
+    # Sélection diversifiée
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def encode_attributes(
+        attribute_rows: List[Dict[str, Any]],
+        attribute_types: Optional[List[str]] = None
+    ) -> np.ndarray:
+        """
+        Encode des combinaisons {attribut: valeur} en matrice d'entiers (m, a)
+
+        Les codes sont locaux à l'appel ; une valeur absente vaut -1.
+        """
+        attribute_types = attribute_types or CombinationSearchService.ATTRIBUTE_TYPES
+        codes = np.full((len(attribute_rows), len(attribute_types)), -1, dtype=np.int32)
+        for j, attr in enumerate(attribute_types):
+            index: Dict[str, int] = {}
+            for i, attributes in enumerate(attribute_rows):
+                value = attributes.get(attr)
+                if value is not None:
+                    codes[i, j] = index.setdefault(str(value), len(index))
+        return codes
+
+    @staticmethod
+    def similarity_matrix(codes: np.ndarray) -> np.ndarray:
+        """
+        Part d'attributs communs entre chaque paire de combinaisons (m, m)
+
+        Calculée en une multiplication matricielle X·Xᵀ / a sur l'encodage
+        one-hot X ; la distance de Hamming normalisée vaut 1 - similarité.
+        """
+        m, a = codes.shape
+        if m == 0 or a == 0:
+            return np.zeros((m, m), dtype=np.float32)
+
+        widths = codes.max(axis=0) + 1
+        offsets = np.concatenate(([0], np.cumsum(widths)[:-1]))
+        one_hot = np.zeros((m, int(widths.sum())), dtype=np.float32)
+        rows, cols = np.nonzero(codes >= 0)
+        one_hot[rows, offsets[cols] + codes[rows, cols]] = 1.0
+
+        # Le facteur 1/a est appliqué au petit opérande plutôt qu'au résultat (m, m)
+        return (one_hot * (1.0 / a)) @ one_hot.T
+
+    @staticmethod
+    def mean_pairwise_distance(codes: np.ndarray) -> Dict[str, float]:
+        """Distance de Hamming normalisée moyenne et minimale entre toutes les paires"""
+        m = codes.shape[0]
+        if m < 2:
+            return {"mean": 0.0, "min": 0.0}
+        distances = 1.0 - CombinationSearchService.similarity_matrix(codes)[np.triu_indices(m, k=1)]
+        return {"mean": float(distances.mean()), "min": float(distances.min())}
+
+    @staticmethod
+    def select_diverse(
+        relevance: np.ndarray,
+        codes: np.ndarray,
+        k: int,
+        min_distance: float = 0.0,
+        max_consecutive: Optional[int] = None,
+        relevance_weight: float = 0.7
+    ) -> Tuple[np.ndarray, bool]:
+        """
+        Sélection gloutonne de k candidats par pertinence marginale maximale (MMR)
+
+        À chaque étape, le candidat retenu maximise
+        λ·pertinence - (1-λ)·similarité maximale aux candidats déjà retenus,
+        parmi ceux situés à une distance de Hamming >= min_distance de tous
+        les retenus et ne prolongeant pas au-delà de max_consecutive une suite
+        de valeurs identiques sur un attribut. Si plus aucun candidat ne
+        satisfait les contraintes, la distance minimale est abaissée d'un
+        attribut à la fois, puis la contrainte de répétition est levée ; les
+        doublons exacts restent toujours exclus.
+
+        La similarité aux candidats retenus est calculée au fil de la sélection,
+        une ligne (m,) par candidat retenu : mémoire O(m·a) et calcul O(m·k·a),
+        sans matrice (m, m).
+
+        Retourne (indices retenus dans l'ordre de sélection, contraintes relâchées).
+        """
+        m = len(relevance)
+        k = min(k, m)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), False
+
+        num_attributes = codes.shape[1]
+        step = 1.0 / num_attributes
+
+        spread = float(relevance.max() - relevance.min())
+        normalized = (relevance - relevance.min()) / spread if spread > 0 else np.ones(m)
+        gain = relevance_weight * normalized
+
+        max_similarity = np.zeros(m, dtype=np.float64)
+        available = np.ones(m, dtype=bool)
+        # Similarité maximale tolérée (au plus a-1 attributs communs)
+        max_allowed = min(1.0 - min_distance, 1.0 - step) + 1e-9
+
+        last = np.full(num_attributes, -1, dtype=np.int32)
+        runs = np.zeros(num_attributes, dtype=np.int32)
+
+        selected = []
+        relaxed = False
+        while len(selected) < k:
+            eligible = available & (max_similarity <= max_allowed)
+            if max_consecutive:
+                blocked = (runs >= max_consecutive) & (last >= 0)
+                if blocked.any():
+                    eligible &= ~np.any(codes[:, blocked] == last[blocked], axis=1)
+
+            if not eligible.any():
+                if max_allowed < 1.0 - step:
+                    max_allowed += step
+                elif max_consecutive:
+                    max_consecutive = None
+                else:
+                    break
+                relaxed = True
+                continue
+
+            mmr = gain - (1.0 - relevance_weight) * max_similarity
+            choice = int(np.argmax(np.where(eligible, mmr, -np.inf)))
+
+            selected.append(choice)
+            available[choice] = False
+            row = codes[choice]
+            # Part d'attributs communs avec le candidat retenu (comme similarity_matrix)
+            similarity = np.count_nonzero((codes == row) & (row >= 0), axis=1) * step
+            np.maximum(max_similarity, similarity, out=max_similarity)
+
+            runs = np.where((row == last) & (row >= 0), runs + 1, 1)
+            last = row.copy()
+
+        return np.array(selected, dtype=np.int64), relaxed
@@ -88,6 +88,28 @@ class CombinationService:
         
         return universes
     
+    @staticmethod
+    def get_pair_universes(db: Session) -> Dict[tuple, str]:
+        """
+        Univers de chaque paire (num1 <= num2) en une seule requête
+
+        Sert à classer d'un coup toutes les paires d'un lot de tirages au
+        lieu d'interroger la base paire par paire.
+        """
+        rows = db.query(
+            Combination.num1, Combination.num2, Combination.univers
+        ).filter(
+            Combination.num1.isnot(None),
+            Combination.num2.isnot(None),
+            Combination.num1 <= Combination.num2
+        ).order_by(Combination.combination_id).all()
+
+        pair_universes = {}
+        for num1, num2, univers in rows:
+            # Même règle que get_combination_info : une ligne par paire
+            pair_universes.setdefault((num1, num2), univers)
+        return pair_universes
+
     @staticmethod
     def get_combinations_by_denomination(db: Session, denomination: str, universe: str = None) -> List[Dict[str, Any]]:
         """Récupère toutes les combinaisons ayant une dénomination spécifique - GÈRE LES DÉNOMINATIONS MULTIPLES"""
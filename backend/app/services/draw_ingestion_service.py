@@ -0,0 +1,313 @@
+"""
+Import en masse de tirages historiques
+
+Les tirages sont lus depuis un fichier CSV ou JSON-lines, validés avec les
+mêmes règles que POST /api/lottery/draws, puis insérés par lots
+(INSERT ... RETURNING sous PostgreSQL). Toutes les paires du lot sont
+classées en une seule passe sur la table des combinaisons, et les
+statistiques dérivées (analyses par tirage, caches, alertes) ne sont mises
+à jour qu'une fois, à la fin de l'import.
+"""
+import csv
+import io
+import json
+import re
+import time
+from datetime import datetime
+from itertools import combinations
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.draw import Draw, DrawAnalysis
+from app.services.combination_service import CombinationService
+from app.services import events
+
+
+class DrawIngestionService:
+    """
+    Service d'import en masse des tirages
+    """
+
+    # Nombre de lignes par instruction INSERT (executemany)
+    BATCH_SIZE = 1000
+
+    # Nombre minimal de numéros par tirage (comme POST /draws)
+    MIN_NUMBERS = 5
+
+    # Formats de date acceptés (le premier est celui de l'API)
+    DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+
+    # Erreurs détaillées renvoyées au maximum dans le résumé
+    MAX_REPORTED_ERRORS = 50
+
+    # Colonnes CSV d'un numéro isolé : num1, n2, numero3, boule4...
+    NUMBER_COLUMN = re.compile(r"^(num|n|numero|boule|ball)_?\d+$", re.IGNORECASE)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def detect_format(filename: Optional[str], content: str) -> str:
+        """Déduit le format ('csv' ou 'jsonl') de l'extension ou du contenu"""
+        name = (filename or "").lower()
+        if name.endswith((".jsonl", ".ndjson", ".json")):
+            return "jsonl"
+        if name.endswith((".csv", ".txt")):
+            return "csv"
+        return "jsonl" if content.lstrip().startswith("{") else "csv"
+
+    @staticmethod
+    def parse_numbers(value: Any) -> List[int]:
+        """Numéros d'un champ : liste JSON ou texte séparé par espaces, ; - | ,"""
+        if isinstance(value, list):
+            return [int(n) for n in value]
+        text = str(value or "").strip().strip("[]")
+        return [int(n) for n in re.split(r"[\s;,|\-]+", text) if n]
+
+    @staticmethod
+    def parse_csv(content: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Lit un CSV avec en-tête
+
+        Colonnes : draw_date, winning_numbers (ou num1..numN), et en option
+        lottery_name, number_range_min, number_range_max.
+        """
+        sample = content[:4096]
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+
+        number_columns = [
+            column for column in (reader.fieldnames or [])
+            if DrawIngestionService.NUMBER_COLUMN.match(column.strip())
+        ]
+
+        records = []
+        for line, row in enumerate(reader, start=2):
+            record = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items() if k}
+            if number_columns and not record.get("winning_numbers"):
+                record["winning_numbers"] = [row[column] for column in number_columns if row.get(column)]
+            records.append((line, record))
+        return records
+
+    @staticmethod
+    def parse_jsonl(content: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lit un fichier JSON-lines (un objet tirage par ligne)"""
+        records = []
+        for line, raw in enumerate(content.splitlines(), start=1):
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError as e:
+                record = {"_error": f"JSON invalide: {e.msg}"}
+            records.append((line, record if isinstance(record, dict) else {"_error": "Objet JSON attendu"}))
+        return records
+
+    @staticmethod
+    def parse(content: str, fmt: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lit le contenu selon son format"""
+        if fmt == "csv":
+            return DrawIngestionService.parse_csv(content)
+        if fmt == "jsonl":
+            return DrawIngestionService.parse_jsonl(content)
+        raise ValueError(f"Format non supporté: {fmt} (csv ou jsonl)")
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def parse_date(value: str) -> datetime:
+        """Date d'un tirage (DD/MM/YYYY ou YYYY-MM-DD)"""
+        for fmt in DrawIngestionService.DATE_FORMATS:
+            try:
+                return datetime.strptime(str(value).strip(), fmt)
+            except ValueError:
+                continue
+        raise ValueError(f"Format de date invalide: {value} (DD/MM/YYYY)")
+
+    @staticmethod
+    def validate_record(record: Dict[str, Any], default_lottery_name: Optional[str] = None) -> Dict[str, Any]:
+        """Valide un tirage et retourne la ligne à insérer (ValueError sinon)"""
+        if "_error" in record:
+            raise ValueError(record["_error"])
+
+        lottery_name = record.get("lottery_name") or default_lottery_name
+        if not lottery_name:
+            raise ValueError("lottery_name manquant")
+
+        if not record.get("draw_date"):
+            raise ValueError("draw_date manquant")
+        draw_date = DrawIngestionService.parse_date(record["draw_date"])
+
+        try:
+            numbers = DrawIngestionService.parse_numbers(record.get("winning_numbers"))
+            range_min = int(record.get("number_range_min") or 1)
+            range_max = int(record.get("number_range_max") or 90)
+        except (TypeError, ValueError):
+            raise ValueError("Numéros non entiers")
+
+        if len(numbers) < DrawIngestionService.MIN_NUMBERS:
+            raise ValueError(f"Au moins {DrawIngestionService.MIN_NUMBERS} numéros sont requis")
+        if len(set(numbers)) != len(numbers):
+            raise ValueError("Numéros en double")
+        for num in numbers:
+            if num < range_min or num > range_max:
+                raise ValueError(f"Le numéro {num} n'est pas dans la plage [{range_min}-{range_max}]")
+
+        return {
+            "lottery_name": str(lottery_name),
+            "draw_date": draw_date,
+            "winning_numbers": numbers,
+            "number_range_min": range_min,
+            "number_range_max": range_max
+        }
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _existing_keys(db: Session, rows: List[Dict[str, Any]]) -> Dict[Tuple[str, datetime], int]:
+        """(loterie, date) -> id des tirages déjà en base sur la période du lot"""
+        if not rows:
+            return {}
+        dates = [row["draw_date"] for row in rows]
+        names = {row["lottery_name"] for row in rows}
+        existing = db.query(Draw.id, Draw.lottery_name, Draw.draw_date).filter(
+            Draw.draw_date >= min(dates),
+            Draw.draw_date <= max(dates),
+            Draw.lottery_name.in_(names)
+        ).all()
+        return {(name, draw_date): draw_id for draw_id, name, draw_date in existing}
+
+    @staticmethod
+    def _insert_draws(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insère les tirages et retourne leurs identifiants, dans l'ordre des lignes
+
+        PostgreSQL : un INSERT multi-lignes ... RETURNING id par lot. Autres
+        bases : une insertion par ligne (identifiant renvoyé par le curseur).
+        Les identifiants ne sont jamais relus par (loterie, date), qui n'est
+        pas unique quand skip_existing est désactivé.
+        """
+        table = Draw.__table__
+        draw_ids = []
+        if db.bind.dialect.name == "postgresql":
+            batch_size = DrawIngestionService.BATCH_SIZE
+            for i in range(0, len(rows), batch_size):
+                result = db.execute(table.insert().values(rows[i:i + batch_size]).returning(table.c.id))
+                draw_ids.extend(draw_id for (draw_id,) in result)
+        else:
+            for row in rows:
+                draw_ids.append(db.execute(table.insert(), row).inserted_primary_key[0])
+        return draw_ids
+
+    @staticmethod
+    def classify_draws(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, int]]:
+        """Nombre de paires par univers pour chaque tirage (une seule requête)"""
+        pair_universes = CombinationService.get_pair_universes(db)
+        counts = []
+        for row in rows:
+            per_universe = {}
+            for pair in combinations(sorted(row["winning_numbers"]), 2):
+                universe = pair_universes.get(pair)
+                if universe:
+                    per_universe[universe] = per_universe.get(universe, 0) + 1
+            counts.append(per_universe)
+        return counts
+
+    @staticmethod
+    def ingest_records(
+        db: Session,
+        records: List[Tuple[int, Dict[str, Any]]],
+        default_lottery_name: Optional[str] = None,
+        skip_existing: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Valide et insère des tirages par lots
+
+        Les lignes invalides sont rejetées sans bloquer l'import ; les tirages
+        déjà présents (même loterie, même date) sont ignorés si skip_existing.
+        Un seul événement DRAW_SAVED est publié à la fin.
+        """
+        start = time.perf_counter()
+        rows, errors = [], []
+
+        for line, record in records:
+            try:
+                rows.append(DrawIngestionService.validate_record(record, default_lottery_name))
+            except ValueError as e:
+                errors.append({"line": line, "error": str(e)})
+
+        skipped = 0
+        if skip_existing:
+            seen = set(DrawIngestionService._existing_keys(db, rows))
+            unique_rows = []
+            for row in rows:
+                key = (row["lottery_name"], row["draw_date"])
+                if key in seen:
+                    skipped += 1
+                    continue
+                seen.add(key)
+                unique_rows.append(row)
+            rows = unique_rows
+
+        universes = {}
+        if rows:
+            try:
+                batch_size = DrawIngestionService.BATCH_SIZE
+                draw_ids = DrawIngestionService._insert_draws(db, rows)
+
+                analyses = []
+                classified = DrawIngestionService.classify_draws(db, rows)
+                for draw_id, row, per_universe in zip(draw_ids, rows, classified):
+                    total = len(row["winning_numbers"]) * (len(row["winning_numbers"]) - 1) // 2
+                    analyses.append({
+                        "draw_id": draw_id,
+                        "universe": "all",
+                        "total_combinations": total,
+                        "analysis_results": {"universes_preview": per_universe}
+                    })
+                    for universe, count in per_universe.items():
+                        universes[universe] = universes.get(universe, 0) + count
+
+                for i in range(0, len(analyses), batch_size):
+                    db.execute(DrawAnalysis.__table__.insert(), analyses[i:i + batch_size])
+
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+            events.publish(events.DRAW_SAVED, db=db, draw_count=len(rows))
+
+        return {
+            "total_records": len(records),
+            "inserted": len(rows),
+            "skipped_existing": skipped,
+            "rejected": len(errors),
+            "errors": errors[:DrawIngestionService.MAX_REPORTED_ERRORS],
+            "universes_preview": universes,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    @staticmethod
+    def ingest_content(
+        db: Session,
+        content: str,
+        fmt: Optional[str] = None,
+        filename: Optional[str] = None,
+        default_lottery_name: Optional[str] = None,
+        skip_existing: bool = True
+    ) -> Dict[str, Any]:
+        """Lit puis importe le contenu d'un fichier CSV ou JSON-lines"""
+        fmt = fmt or DrawIngestionService.detect_format(filename, content)
+        records = DrawIngestionService.parse(content, fmt)
+        result = DrawIngestionService.ingest_records(db, records, default_lottery_name, skip_existing)
+        result["format"] = fmt
+        return result
@@ -0,0 +1,42 @@
+"""
+Bus d'événements interne (synchrone, en mémoire)
+
+Les services publient un événement lorsqu'une donnée source change ; les
+abonnés (alertes, caches, ...) réagissent sans que l'émetteur les connaisse.
+"""
+from typing import Callable, Dict, List
+
+# Événements disponibles
+DRAW_SAVED = "draw_saved"            # Un ou plusieurs tirages ont été enregistrés
+MODEL_RETRAINED = "model_retrained"  # Un ou plusieurs modèles ML ont été réentraînés
+ANALYSIS_UPDATED = "analysis_updated"  # Tables d'écarts ou de fréquences recalculées
+
+_subscribers: Dict[str, List[Callable]] = {}
+
+
+def subscribe(event: str, handler: Callable):
+    """Abonne un handler à un événement (un même handler n'est enregistré qu'une fois)"""
+    handlers = _subscribers.setdefault(event, [])
+    if handler not in handlers:
+        handlers.append(handler)
+
+
+def unsubscribe(event: str, handler: Callable):
+    """Désabonne un handler"""
+    handlers = _subscribers.get(event, [])
+    if handler in handlers:
+        handlers.remove(handler)
+
+
+def publish(event: str, **payload):
+    """
+    Notifie les abonnés d'un événement
+
+    Une erreur dans un abonné est journalisée mais n'interrompt ni les autres
+    abonnés ni l'opération qui a publié l'événement.
+    """
+    for handler in list(_subscribers.get(event, [])):
+        try:
+            handler(**payload)
+        except Exception as e:
+            print(f"❌ Erreur abonné {getattr(handler, '__qualname__', handler)} ({event}): {e}")
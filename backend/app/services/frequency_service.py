@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from collections import Counter
 import statistics
+from app.services import events
 from datetime import datetime
 
 class FrequencyService:
@@ -109,6 +110,8 @@ class FrequencyService:
                     # Mettre à jour la table frequency_analysis
                     FrequencyService._update_frequency_table(db, attr_type, attr_frequencies, universe)
         
+        events.publish(events.ANALYSIS_UPDATED, universe=universe, session_id=session_id)
+        
         return frequencies
     
     @staticmethod
@@ -307,6 +310,37 @@ class FrequencyService:
         
         return summary
     
+    @staticmethod
+    def get_frequency_table(db: Session, universe: str = "mundo") -> Dict[str, List]:
+        """Table complète des fréquences d'un univers, par type d'attribut (score de chaleur décroissant)"""
+        
+        result = db.execute(text("""
+            SELECT 
+                attribute_type,
+                attribute_value,
+                period_5,
+                period_10,
+                period_20,
+                heat_score,
+                trend
+            FROM frequency_analysis 
+            WHERE universe = :universe
+            ORDER BY heat_score DESC
+        """), {"universe": universe})
+        
+        table = {}
+        for row in result:
+            table.setdefault(row[0], []).append({
+                "value": row[1],
+                "period_5": row[2],
+                "period_10": row[3],
+                "period_20": row[4],
+                "heat_score": float(row[5] or 0),
+                "trend": row[6]
+            })
+        
+        return table
+    
     @staticmethod
     def predict_next_likely(db: Session, universe: str = "mundo", top_n: int = 5) -> Dict[str, List]:
         """Prédit les attributs les plus susceptibles de sortir prochainement"""
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text, func
 from datetime import datetime, timedelta
 import statistics
+from app.services import events
 
 class GapAnalysisService:
     
@@ -148,6 +149,8 @@ class GapAnalysisService:
                 results['unidos'] = attribute_gaps
                 GapAnalysisService._update_gaps_table(db, 'unidos', attribute_gaps, universe)
         
+        events.publish(events.ANALYSIS_UPDATED, universe=universe, session_id=session_id)
+        
         return results
     
     @staticmethod
@@ -307,6 +310,36 @@ class GapAnalysisService:
         
         return overdue
     
+    @staticmethod
+    def get_gap_table(db: Session, universe: str = "mundo") -> Dict[str, List]:
+        """Table complète des écarts d'un univers, par type d'attribut (ratio de retard décroissant)"""
+        
+        result = db.execute(text("""
+            SELECT 
+                attribute_type,
+                attribute_value,
+                current_gap,
+                average_gap,
+                CAST(current_gap AS FLOAT) / NULLIF(average_gap, 0) as delay_ratio,
+                total_appearances
+            FROM attribute_gaps 
+            WHERE universe = :universe 
+            AND average_gap > 0
+            ORDER BY delay_ratio DESC
+        """), {"universe": universe})
+        
+        table = {}
+        for row in result:
+            table.setdefault(row[0], []).append({
+                "value": row[1],
+                "current_gap": row[2],
+                "average_gap": float(row[3]),
+                "delay_ratio": float(row[4] or 0),
+                "total_appearances": row[5]
+            })
+        
+        return table
+    
     @staticmethod
     def get_hot_attributes(db: Session, universe: str = "mundo", threshold_multiplier: float = 0.8) -> Dict[str, List]:
         """Récupère les attributs 'chauds' (écart actuel proche de la moyenne)"""
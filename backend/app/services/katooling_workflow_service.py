@@ -538,7 +538,8 @@ class KatoolingWorkflowService:
         """Préparation des données pour l'IA"""
         return {
             "input_numbers": input_numbers,
-            "historical_context": {},
+            # Prédicteurs rapides entraînés une fois pour les trois modèles
+            "historical_context": {"fast_models": MLService.fit_fast_models(db)},
             "temporal_features": {},
             "universe_features": {}
         }
@@ -549,8 +550,14 @@ class KatoolingWorkflowService:
         confidence_scores = {}
         
         for model, prediction in predictions.items():
-            # Score de confiance simulé basé sur la cohérence des prédictions
-            confidence_scores[model] = 0.75 + (np.random.random() * 0.2)
+            # Précision moyenne des prédicteurs sur la fin de l'historique
+            accuracies = [
+                entry["validation_accuracy"]
+                for attributes in prediction.get("universes", {}).values()
+                for entry in attributes.values()
+                if entry.get("validation_accuracy") is not None
+            ]
+            confidence_scores[model] = round(float(np.mean(accuracies)), 4) if accuracies else 0.0
         
         return confidence_scores
     
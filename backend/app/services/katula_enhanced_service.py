@@ -6,7 +6,7 @@ from typing import List, Dict, Any, Tuple, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime
-from app.services.katula_table_service import KatulaTableService
+from app.services.katula_table_service import KatulaTableService, CHIP_NUMBER
 
 class KatulaEnhancedService:
     """
@@ -46,7 +46,7 @@ class KatulaEnhancedService:
         """Récupère toutes les combinaisons d'un chip avec leurs formes"""
         
         try:
-            query = """
+            query = f"""
                 SELECT 
                     combination_id,
                     num1, 
@@ -54,10 +54,11 @@ class KatulaEnhancedService:
                     forme,
                     chip,
                     chip_id,
+                    {CHIP_NUMBER} AS chip_number,
                     created_at
                 FROM combinations 
                 WHERE univers = :universe 
-                AND chip_id = :chip_number
+                AND {CHIP_NUMBER} = :chip_number
                 ORDER BY combination_id DESC
                 LIMIT 20
             """
@@ -7,6 +7,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime
 import json
+from app.database.universe_tables import chip_number_sql, normalize_chip_number
+
+# Chip normalisé 1-48, y compris pour les lignes sans chip_number
+CHIP_NUMBER = chip_number_sql()
 
 class KatulaTableService:
     """
@@ -186,8 +190,8 @@ class KatulaTableService:
         
         try:
             # Récupérer la combinaison
-            query = """
-                SELECT combination_id, num1, num2, chip, chip_id, univers
+            query = f"""
+                SELECT combination_id, num1, num2, chip, chip_id, {CHIP_NUMBER} AS chip_number, univers
                 FROM combinations 
                 WHERE combination_id = :combination_id 
                 AND univers = :universe
@@ -206,12 +210,8 @@ class KatulaTableService:
             # Créer la table de Katula
             katula_table = KatulaTableService.create_katula_table(universe)
             
-            # Mapper le chip sur la matrice
-            chip_number = combination.chip_id if combination.chip_id else 1
-            
-            # S'assurer que le chip est dans la plage 1-48
-            if chip_number < 1 or chip_number > 48:
-                chip_number = ((chip_number - 1) % 48) + 1
+            # Mapper le chip sur la matrice (chip_number, sinon chip_id ou chip normalisé)
+            chip_number = combination.chip_number or normalize_chip_number(combination.chip) or 1
             
             chip_id = f"chip{chip_number}"
             
@@ -251,8 +251,8 @@ class KatulaTableService:
         
         try:
             # Récupérer les combinaisons récentes
-            query = """
-                SELECT combination_id, num1, num2, chip, chip_id, created_at
+            query = f"""
+                SELECT combination_id, num1, num2, chip, chip_id, {CHIP_NUMBER} AS chip_number, created_at
                 FROM combinations 
                 WHERE univers = :universe 
                 ORDER BY combination_id DESC
@@ -276,9 +276,7 @@ class KatulaTableService:
             position_history = []
             
             for combo in combinations:
-                chip_number = combo.chip_id if combo.chip_id else 1
-                if chip_number < 1 or chip_number > 48:
-                    chip_number = ((chip_number - 1) % 48) + 1
+                chip_number = combo.chip_number or normalize_chip_number(combo.chip) or 1
                 
                 chip_id = f"chip{chip_number}"
                 
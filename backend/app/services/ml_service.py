@@ -1,36 +1,227 @@
 import os
-from typing import List, Dict, Any
+import json
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 import asyncio
+import threading
 import concurrent.futures
-from app.ml.models.lstm_predictor import LSTMPredictor
+from sqlalchemy import text
+from app.database.connection import SessionLocal
+from app import metrics
+from app.ml import registry
+from app.ml.sequence_dataset import SequenceDataset
+from app.services import events
+from app.services.prediction_cache import PredictionCache
+from app.services.attribute_discovery_service import AttributeDiscoveryService
 
 class MLService:
     """
     Service principal pour la gestion des modèles ML
     """
     
+    # Attributs pris en charge par les modèles LSTM
+    ML_ATTRIBUTES = ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
+    
+    # Univers couverts par les prédicteurs rapides
+    UNIVERSES = ["mundo", "fruity", "trigga", "roaster", "sunshine"]
+    
+    # Modèles évalués en parallèle par evaluate_all_models
+    EVALUATION_WORKERS = 4
+    
+    # Longueur du contexte des prédicteurs rapides (ordre Markov / nombre de lags)
+    FAST_MODEL_ORDER = 3
+    
+    # Modèle rapide servi par chaque méthode de prédiction du workflow
+    FAST_MODEL_TYPES = {
+        "markov": "Markov_NGram",
+        "regression": "Multinomial_Logistic_Regression",
+        "ensemble": "Weighted_Ensemble"
+    }
+    
+    # Réchauffage du cache des prédictions : un seul worker, univers en attente
+    # et état (dernier id, versions des modèles) du dernier réchauffage par univers
+    _warmup_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction-cache-warmup")
+    _warmup_lock = threading.Lock()
+    _warmup_pending = set()
+    _warmed_states: Dict[str, Tuple[Optional[int], Tuple[Optional[str], ...]]] = {}
+    
+    @staticmethod
+    def lstm_predictor(attribute: str, universe: str = "mundo"):
+        """Prédicteur LSTM (TensorFlow importé au premier appel)"""
+        return registry.get_backend("lstm")(attribute, universe)
+    
+    @staticmethod
+    def lstm_inference_predictor(attribute: str, universe: str = "mundo"):
+        """
+        Prédicteur LSTM pour la prédiction seule
+        
+        Utilise le modèle exporté en .npz (NumPy, sans TensorFlow) s'il
+        existe, sinon le modèle Keras.
+        """
+        runtime = registry.get_backend("numpy_lstm")
+        if os.path.exists(runtime.path_for(attribute, universe)):
+            return runtime(attribute, universe)
+        return MLService.lstm_predictor(attribute, universe)
+    
     @staticmethod
-    def get_available_attributes() -> List[str]:
-        """Retourne la liste des attributs disponibles pour ML"""
-        return ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
+    def model_version(attribute: str, universe: str = "mundo") -> Optional[str]:
+        """
+        Version du fichier modèle servi pour un attribut (None sans modèle)
+        
+        Le .npz exporté est prioritaire, comme dans lstm_inference_predictor.
+        """
+        for path in (
+            registry.get_backend("numpy_lstm").path_for(attribute, universe),
+            f"backend/app/ml/models/saved/{universe}_{attribute}_lstm.h5"
+        ):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            return f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        return None
     
     @staticmethod
-    def train_all_lstm_models(db: Session, universe: str = "mundo", epochs: int = 50) -> Dict[str, Any]:
-        """Entraîne tous les modèles LSTM pour un univers"""
+    def last_combination_id(db: Session, universe: str = "mundo") -> Optional[int]:
+        """Dernier combination_id de l'univers (fin de l'historique des séquences)"""
+        return db.execute(
+            text("SELECT MAX(combination_id) FROM combinations WHERE univers = :universe"),
+            {"universe": universe}
+        ).scalar()
+    
+    @staticmethod
+    def _warmup_state(db: Session, universe: str) -> Optional[Tuple[Optional[int], Tuple[Optional[str], ...]]]:
+        """Dernier combination_id et versions des modèles (None sans aucun modèle)"""
+        versions = tuple(MLService.model_version(attribute, universe) for attribute in MLService.ML_ATTRIBUTES)
+        if not any(versions):
+            return None
+        return MLService.last_combination_id(db, universe), versions
+    
+    @staticmethod
+    def warm_prediction_cache(universes: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Recalcule les prédictions des univers ayant au moins un modèle
+        
+        Appelé en arrière-plan après un import de tirages ou un
+        réentraînement : les appels suivants ne font plus qu'une lecture du cache.
+        Un univers dont le dernier combination_id et les versions des modèles
+        n'ont pas changé depuis le dernier réchauffage est ignoré.
+        """
+        db = SessionLocal()
+        warmed = []
+        unchanged = []
+        try:
+            for universe in universes or MLService.UNIVERSES:
+                state = MLService._warmup_state(db, universe)
+                if state is None:
+                    continue
+                if MLService._warmed_states.get(universe) == state:
+                    unchanged.append(universe)
+                    continue
+                MLService.predict_all_lstm(db, universe)
+                MLService._warmed_states[universe] = state
+                warmed.append(universe)
+        finally:
+            db.close()
+        
+        print(f"🔥 Cache des prédictions réchauffé: {warmed or 'aucun modèle'}"
+              + (f" (inchangés: {unchanged})" if unchanged else ""))
+        return {"warmed_universes": warmed, "unchanged_universes": unchanged, "cache": PredictionCache.stats()}
+    
+    @staticmethod
+    def warm_prediction_cache_async(universes: Optional[List[str]] = None) -> Optional[concurrent.futures.Future]:
+        """
+        Planifie warm_prediction_cache sur le worker unique de réchauffage
+        
+        Les univers déjà en attente ne sont pas replanifiés : une rafale de
+        tirages enregistrés donne un seul réchauffage par univers, exécuté
+        après celui en cours. Retourne None si tout était déjà planifié.
+        """
+        with MLService._warmup_lock:
+            queued = [u for u in universes or MLService.UNIVERSES if u not in MLService._warmup_pending]
+            MLService._warmup_pending.update(queued)
+        if not queued:
+            return None
+        
+        def run():
+            # Retirés avant le calcul : un tirage pendant le réchauffage en planifie un nouveau
+            with MLService._warmup_lock:
+                MLService._warmup_pending.difference_update(queued)
+            try:
+                return MLService.warm_prediction_cache(queued)
+            except Exception as e:
+                print(f"❌ Erreur réchauffage du cache des prédictions: {e}")
+        
+        return MLService._warmup_executor.submit(run)
+    
+    @staticmethod
+    def on_draw_saved(**payload):
+        """Nouveaux tirages : prédictions recalculées avant les prochaines requêtes"""
+        MLService.warm_prediction_cache_async()
+    
+    @staticmethod
+    def on_model_retrained(universe: Optional[str] = None, **payload):
+        """Modèle réentraîné : prédictions de son univers recalculées"""
+        MLService.warm_prediction_cache_async([universe] if universe else None)
+    
+    @staticmethod
+    def get_available_attributes(db: Optional[Session] = None, universe: str = "mundo") -> List[str]:
+        """
+        Retourne la liste des attributs disponibles pour ML
+        
+        Avec une session, seuls les attributs ayant au moins deux valeurs
+        distinctes dans l'univers (d'après le registre des attributs) sont retenus.
+        """
+        if db is None:
+            return list(MLService.ML_ATTRIBUTES)
+        
+        try:
+            metadata = AttributeDiscoveryService.get_registry(db, universe)["metadata"]
+        except Exception as e:
+            print(f"⚠️ Registre des attributs indisponible: {e}")
+            return list(MLService.ML_ATTRIBUTES)
+        
+        return [
+            attribute for attribute in MLService.ML_ATTRIBUTES
+            if metadata.get(attribute, {}).get("unique_values", 0) >= 2
+        ]
+    
+    @staticmethod
+    def train_all_lstm_models(
+        db: Session,
+        universe: str = "mundo",
+        epochs: int = 50,
+        max_rows: Optional[int] = None,
+        warm_start: bool = False,
+        fine_tune_epochs: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Entraîne tous les modèles LSTM pour un univers
+        
+        warm_start affine les modèles existants sur les seules lignes ajoutées
+        depuis leur dernier entraînement (quelques secondes après un tirage) ;
+        max_rows limite un entraînement complet aux lignes les plus récentes.
+        """
         
         print(f"🚀 Début de l'entraînement de tous les modèles LSTM pour {universe}...")
         
-        attributes = MLService.get_available_attributes()
+        attributes = MLService.get_available_attributes(db, universe)
         training_results = {}
         
         for attribute in attributes:
             print(f"\n🧠 Entraînement LSTM pour {attribute}...")
             
             try:
-                predictor = LSTMPredictor(attribute, universe)
-                result = predictor.train(db, epochs=epochs)
+                predictor = MLService.lstm_predictor(attribute, universe)
+                result = predictor.train(
+                    db,
+                    epochs=epochs,
+                    max_rows=max_rows,
+                    warm_start=warm_start,
+                    fine_tune_epochs=fine_tune_epochs
+                )
                 training_results[attribute] = result
                 
             except Exception as e:
@@ -57,6 +248,14 @@ class MLService:
         
         print(f"\n✅ Entraînement terminé: {successful_trainings}/{total_trainings} modèles réussis")
         
+        # Les modèles déjà à jour ne changent pas les prédictions
+        updated_models = [
+            r for r in training_results.values()
+            if "error" not in r and r.get("training_mode") != "up_to_date"
+        ]
+        if updated_models:
+            events.publish(events.MODEL_RETRAINED, db=db, universe=universe)
+        
         return summary
     
     @staticmethod
@@ -65,13 +264,22 @@ class MLService:
         
         print(f"🔮 Génération des prédictions LSTM pour {universe}...")
         
-        attributes = MLService.get_available_attributes()
+        attributes = MLService.get_available_attributes(db, universe)
         predictions = {}
+        last_id = MLService.last_combination_id(db, universe)
         
         for attribute in attributes:
             try:
-                predictor = LSTMPredictor(attribute, universe)
-                prediction = predictor.predict_next(db)
+                # Prédiction inchangée tant que le modèle et l'historique le sont
+                version = MLService.model_version(attribute, universe)
+                if version is None:
+                    raise FileNotFoundError(f"Modèle non trouvé pour {attribute}")
+                prediction = PredictionCache.get(universe, attribute, version, last_id)
+                if prediction is None:
+                    predictor = MLService.lstm_inference_predictor(attribute, universe)
+                    with metrics.timer("model_inference_seconds", model=type(predictor).__name__, attribute=attribute):
+                        prediction = predictor.predict_next(db)
+                    PredictionCache.put(universe, attribute, version, last_id, prediction)
                 predictions[attribute] = prediction
                 
             except Exception as e:
@@ -119,28 +327,70 @@ class MLService:
         return result
     
     @staticmethod
-    def evaluate_all_models(db: Session, universe: str = "mundo") -> Dict[str, Any]:
-        """Évalue tous les modèles LSTM"""
+    def _evaluate_attribute(
+        attribute: str,
+        universe: str,
+        dataset: Tuple[Any, List[str], Optional[int]]
+    ) -> Dict[str, Any]:
+        """Évalue le modèle d'un attribut sur ses codes déjà lus (exécuté dans le pool)"""
+        
+        started = time.perf_counter()
+        try:
+            codes, classes, _ = dataset
+            predictor = MLService.lstm_inference_predictor(attribute, universe)
+            model_codes = SequenceDataset.reencode(codes, classes, predictor.vocabulary())
+            evaluation = predictor.evaluate_codes(model_codes)
+        except Exception as e:
+            print(f"❌ Erreur évaluation {attribute}: {e}")
+            evaluation = {
+                "error": str(e),
+                "attribute_type": attribute,
+                "universe": universe
+            }
+        evaluation["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return evaluation
+    
+    @staticmethod
+    def evaluate_all_models(db: Session, universe: str = "mundo", max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Évalue tous les modèles LSTM d'un univers
+        
+        Les séquences de tous les attributs sont construites à partir d'une
+        seule lecture de combinations, puis les modèles sont évalués en
+        parallèle (TensorFlow et NumPy libèrent le GIL pendant le calcul).
+        """
         
         print(f"📊 Évaluation de tous les modèles LSTM pour {universe}...")
+        started = time.perf_counter()
         
-        attributes = MLService.get_available_attributes()
+        attributes = MLService.get_available_attributes(db, universe)
         evaluations = {}
         
+        # Seuls les attributs ayant un modèle sont lus et évalués
+        with_model = [attribute for attribute in attributes if MLService.model_version(attribute, universe)]
         for attribute in attributes:
-            try:
-                predictor = LSTMPredictor(attribute, universe)
-                evaluation = predictor.evaluate_model(db)
-                evaluations[attribute] = evaluation
-                
-            except Exception as e:
-                print(f"❌ Erreur évaluation {attribute}: {e}")
+            if attribute not in with_model:
                 evaluations[attribute] = {
-                    "error": str(e),
+                    "error": f"Modèle non trouvé pour {attribute}",
                     "attribute_type": attribute,
                     "universe": universe
                 }
         
+        fetch_started = time.perf_counter()
+        datasets = SequenceDataset.fetch_attributes(db, with_model, universe) if with_model else {}
+        fetch_ms = round((time.perf_counter() - fetch_started) * 1000, 1)
+        
+        evaluation_started = time.perf_counter()
+        workers = max(1, min(max_workers or MLService.EVALUATION_WORKERS, len(with_model) or 1))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evaluation") as pool:
+            futures = {
+                attribute: pool.submit(MLService._evaluate_attribute, attribute, universe, datasets[attribute])
+                for attribute in with_model
+            }
+            for attribute, future in futures.items():
+                evaluations[attribute] = future.result()
+        evaluation_ms = round((time.perf_counter() - evaluation_started) * 1000, 1)
+        
         # Calculer les métriques moyennes
         successful_evals = [e for e in evaluations.values() if "error" not in e]
         
@@ -157,11 +407,21 @@ class MLService:
             "evaluated_models": len(successful_evals),
             "average_accuracy": round(avg_accuracy, 3),
             "average_loss": round(avg_loss, 3),
-            "model_evaluations": evaluations,
+            "model_evaluations": {attribute: evaluations[attribute] for attribute in attributes},
+            "timings": {
+                "fetch_ms": fetch_ms,
+                "evaluation_ms": evaluation_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                "workers": workers,
+                "per_attribute_ms": {
+                    attribute: evaluations[attribute].get("elapsed_ms") for attribute in with_model
+                }
+            },
             "timestamp": datetime.now().isoformat()
         }
         
-        print(f"✅ Évaluation terminée - Précision moyenne: {avg_accuracy:.3f}")
+        print(f"✅ Évaluation terminée - Précision moyenne: {avg_accuracy:.3f} "
+              f"(lecture {fetch_ms} ms, évaluation {evaluation_ms} ms, {workers} workers)")
         
         return summary
     
@@ -172,26 +432,41 @@ class MLService:
         attributes = MLService.get_available_attributes()
         model_status = {}
         
+        lstm_available = registry.is_available("lstm")
+        export_runtime = registry.get_backend("numpy_lstm")
+        
         for attribute in attributes:
             try:
-                predictor = LSTMPredictor(attribute, universe)
-                
-                # Vérifier si les fichiers de modèle existent
+                # Vérifier si les fichiers de modèle existent (sans charger TensorFlow)
                 model_path = f"backend/app/ml/models/saved/{universe}_{attribute}_lstm.h5"
                 encoder_path = f"backend/app/ml/models/saved/{universe}_{attribute}_encoder.pkl"
+                meta_path = f"backend/app/ml/models/saved/{universe}_{attribute}_lstm_meta.json"
+                export_path = export_runtime.path_for(attribute, universe)
                 
                 model_file_exists = os.path.exists(model_path)
                 encoder_file_exists = os.path.exists(encoder_path)
+                export_file_exists = os.path.exists(export_path)
                 
                 model_exists = model_file_exists and encoder_file_exists
                 
+                metadata = {}
+                if os.path.exists(meta_path):
+                    with open(meta_path, encoding="utf-8") as f:
+                        metadata = json.load(f)
+                
                 model_status[attribute] = {
                     "model_exists": model_exists,
                     "model_file_exists": model_file_exists,
                     "encoder_file_exists": encoder_file_exists,
                     "model_path": model_path,
                     "encoder_path": encoder_path,
-                    "ready_for_prediction": model_exists
+                    "export_path": export_path,
+                    "export_file_exists": export_file_exists,
+                    # Le .npz suffit pour prédire ; le .h5 demande TensorFlow
+                    "ready_for_prediction": export_file_exists or (model_exists and lstm_available),
+                    "last_row_id": metadata.get("last_row_id"),
+                    "trained_at": metadata.get("trained_at"),
+                    "training_mode": metadata.get("training_mode")
                 }
                 
             except Exception as e:
@@ -213,6 +488,7 @@ class MLService:
             "ready_models": ready_models,
             "models_to_train": total_models - ready_models,
             "model_details": model_status,
+            "backends": registry.status(),
             "timestamp": datetime.now().isoformat()
         }
     
@@ -279,4 +555,122 @@ class MLService:
         
         print(f"✅ Combinaison terminée - {len(combined_predictions)} prédictions combinées")
         
-        return result
\ No newline at end of file
+        return result
+    
+    @staticmethod
+    def fit_fast_models(db: Session, universes: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Entraîne les prédicteurs rapides (NumPy) pour tous les univers et attributs
+        
+        Un seul passage sur l'historique de chaque attribut ; le résultat est
+        partagé par generate_lstm/regression/ensemble_predictions.
+        """
+        start = datetime.now()
+        order = MLService.FAST_MODEL_ORDER
+        fitted = {}
+        
+        for universe in universes or MLService.UNIVERSES:
+            fitted[universe] = {}
+            for attribute in MLService.get_available_attributes(db, universe):
+                try:
+                    codes, classes, _ = SequenceDataset.fetch_codes(db, attribute, universe)
+                    if len(classes) < 2 or len(codes) <= order:
+                        continue
+                    fitted[universe][attribute] = {
+                        "classes": classes,
+                        "history": codes[-order:],
+                        "training_rows": len(codes),
+                        "models": registry.get_backend("fast").fit_models(codes, len(classes), order=order)
+                    }
+                except Exception as e:
+                    print(f"❌ Erreur modèle rapide {universe}/{attribute}: {e}")
+        
+        elapsed = (datetime.now() - start).total_seconds()
+        trained = sum(len(attributes) for attributes in fitted.values())
+        print(f"⚡ {trained} prédicteurs rapides entraînés en {elapsed:.2f}s")
+        
+        return fitted
+    
+    @staticmethod
+    def _fast_predictions(
+        model_name: str,
+        ai_input_data: Dict[str, Any],
+        prediction_horizon: int,
+        db: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        """Prédictions d'un modèle rapide pour tous les univers et attributs"""
+        
+        fitted = ai_input_data.get("historical_context", {}).get("fast_models")
+        if fitted is None:
+            if db is None:
+                raise ValueError("Session de base de données ou modèles entraînés requis")
+            fitted = MLService.fit_fast_models(db)
+        
+        universes = {}
+        top_predictions = []
+        
+        for universe, attributes in fitted.items():
+            universes[universe] = {}
+            for attribute, entry in attributes.items():
+                model = entry["models"][model_name]
+                with metrics.timer("model_inference_seconds", model=model_name, attribute=attribute):
+                    probabilities = model["model"].predict_proba(entry["history"])
+                predictions = registry.get_backend("fast").top_predictions(
+                    probabilities, entry["classes"], prediction_horizon
+                )
+                universes[universe][attribute] = {
+                    "predictions": predictions,
+                    "validation_accuracy": model["validation_accuracy"],
+                    "training_rows": entry["training_rows"]
+                }
+                top_predictions.append({
+                    "universe": universe,
+                    "attribute_type": attribute,
+                    **predictions[0]
+                })
+        
+        top_predictions.sort(key=lambda x: x["confidence"], reverse=True)
+        
+        return {
+            "model_type": MLService.FAST_MODEL_TYPES[model_name],
+            "prediction_horizon": prediction_horizon,
+            "universes": universes,
+            "top_predictions": top_predictions[:10],
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def generate_lstm_predictions(
+        ai_input_data: Dict[str, Any],
+        prediction_horizon: int = 5,
+        db: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        """
+        Prédictions séquentielles du workflow KATOOLING
+        
+        Servies par le n-gramme de Markov, remplaçant rapide du LSTM qui ne
+        demande ni TensorFlow ni modèle entraîné au préalable.
+        """
+        return MLService._fast_predictions("markov", ai_input_data, prediction_horizon, db)
+    
+    @staticmethod
+    def generate_regression_predictions(
+        ai_input_data: Dict[str, Any],
+        prediction_horizon: int = 5,
+        db: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        """Prédictions par régression logistique sur les valeurs précédentes"""
+        return MLService._fast_predictions("regression", ai_input_data, prediction_horizon, db)
+    
+    @staticmethod
+    def generate_ensemble_predictions(
+        ai_input_data: Dict[str, Any],
+        prediction_horizon: int = 5,
+        db: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        """Prédictions de l'ensemble Markov + régression, pondéré par la précision"""
+        return MLService._fast_predictions("ensemble", ai_input_data, prediction_horizon, db)
+
+
+events.subscribe(events.DRAW_SAVED, MLService.on_draw_saved)
+events.subscribe(events.MODEL_RETRAINED, MLService.on_model_retrained)
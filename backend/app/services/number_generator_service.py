@@ -7,58 +7,246 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime
 import random
+import threading
+import time
+import numpy as np
+from app.models.combination import Combination
+
+
+class _AttributeIndex:
+    """
+    Index inversé (attribut, valeur) -> positions des combinaisons d'un univers
+
+    Les combinaisons sont rangées par combination_id décroissant : la position
+    0 est la plus récente. Chaque liste de positions est un tableau trié, si
+    bien qu'une intersection conserve l'ordre « plus récentes d'abord ».
+    """
+
+    def __init__(self, attribute_types: List[str], rows: List[Any]):
+        n = len(rows)
+        self.combination_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=n)
+        self.num1 = np.fromiter((row[1] for row in rows), dtype=np.int64, count=n)
+        self.num2 = np.fromiter((row[2] for row in rows), dtype=np.int64, count=n)
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+
+        for j, attr in enumerate(attribute_types, start=3):
+            values = np.array(["" if row[j] is None else str(row[j]) for row in rows], dtype=object)
+            present = np.nonzero(values != "")[0]
+            if len(present) == 0:
+                self.postings[attr] = {}
+                continue
+            uniques, inverse = np.unique(values[present].astype(str), return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            groups = np.split(present[order].astype(np.int32), np.cumsum(np.bincount(inverse))[:-1])
+            self.postings[attr] = dict(zip(uniques.tolist(), groups))
+
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.combination_ids)
+
+    def positions_of(self, combination_ids) -> np.ndarray:
+        """Positions (triées) des combination_id donnés"""
+        ids = np.fromiter(combination_ids, dtype=np.int64)
+        return np.nonzero(np.isin(self.combination_ids, ids))[0].astype(np.int32)
+
+    def _lists(
+        self,
+        attributes: Dict[str, str],
+        extra: Optional[List[Tuple[str, str, np.ndarray]]] = None
+    ) -> List[Tuple[str, str, np.ndarray]]:
+        """
+        Listes de positions des attributs indexés renseignés
+
+        Les attributs hors index sont fournis par l'appelant dans extra
+        (positions calculées en SQL), jamais ignorés.
+        """
+        lists = []
+        for attr_name, attr_value in attributes.items():
+            if not attr_value or attr_value == "N/A" or attr_name not in self.postings:
+                continue
+            positions = self.postings[attr_name].get(str(attr_value), np.empty(0, dtype=np.int32))
+            lists.append((attr_name, str(attr_value), positions))
+        return lists + list(extra or [])
+
+    def match(
+        self,
+        attributes: Dict[str, str],
+        extra: Optional[List[Tuple[str, str, np.ndarray]]] = None
+    ) -> Optional[np.ndarray]:
+        """Positions correspondant à tous les attributs (None si aucun attribut exploitable)"""
+        lists = self._lists(attributes, extra)
+        if not lists:
+            return None
+        # Intersection pilotée par la liste la plus courte : chaque position
+        # restante est cherchée par dichotomie dans les listes suivantes
+        lists.sort(key=lambda item: len(item[2]))
+        positions = lists[0][2]
+        for _, _, other in lists[1:]:
+            if len(positions) == 0 or len(other) == 0:
+                return positions[:0]
+            found = np.searchsorted(other, positions).clip(max=len(other) - 1)
+            positions = positions[other[found] == positions]
+        return positions
+
+    def similar(
+        self,
+        attributes: Dict[str, str],
+        limit: int,
+        extra: Optional[List[Tuple[str, str, np.ndarray]]] = None
+    ) -> List[Tuple[int, List[str]]]:
+        """
+        Combinaisons partageant le plus d'attributs avec la demande
+
+        Retourne [(position, attributs communs)] par nombre d'attributs communs
+        décroissant, puis des plus récentes aux plus anciennes.
+        """
+        lists = self._lists(attributes, extra)
+        if not lists or len(self) == 0:
+            return []
+        counts = np.bincount(
+            np.concatenate([positions for _, _, positions in lists]), minlength=len(self)
+        )
+        candidates = np.nonzero(counts)[0]
+        ranked = candidates[np.lexsort((candidates, -counts[candidates]))][:limit]
+
+        results = []
+        for position in ranked:
+            matching = [
+                attr_name for attr_name, _, positions in lists
+                if _AttributeIndex._contains(positions, position)
+            ]
+            results.append((int(position), matching))
+        return results
+
+    @staticmethod
+    def _contains(positions: np.ndarray, position: int) -> bool:
+        """Recherche dichotomique dans une liste de positions triée"""
+        i = np.searchsorted(positions, position)
+        return i < len(positions) and positions[i] == position
+
+    def pair(self, position: int) -> Dict[str, Any]:
+        """Paire de numéros d'une position"""
+        num1 = int(self.num1[position])
+        num2 = int(self.num2[position])
+        return {
+            "num1": num1,
+            "num2": num2,
+            "pair": f"{num1}-{num2}",
+            "combination_id": int(self.combination_ids[position])
+        }
+
 
 class NumberGeneratorService:
     """
     Service pour générer des paires de numéros basées sur les attributs
     """
     
+    ATTRIBUTE_TYPES = ['forme', 'engine', 'beastie', 'tome', 'parite', 'unidos', 'chip']
+    
+    # Colonnes de combinations interrogeables en SQL hors index
+    COMBINATION_COLUMNS = frozenset(column.name for column in Combination.__table__.columns)
+    
+    # Nombre maximal de paires renvoyées par correspondance exacte / similaire
+    MAX_MATCHES = 10
+    MAX_SIMILAR = 5
+    
+    # Durée de validité de l'index en mémoire (secondes)
+    INDEX_TTL = 600
+    
+    _indexes: Dict[str, _AttributeIndex] = {}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def get_index(db: Session, universe: str) -> _AttributeIndex:
+        """Index inversé d'un univers (une requête au chargement, puis mis en cache)"""
+        with NumberGeneratorService._lock:
+            index = NumberGeneratorService._indexes.get(universe)
+            if index is not None and time.time() - index.loaded_at < NumberGeneratorService.INDEX_TTL:
+                return index
+        
+        result = db.execute(text("""
+            SELECT
+                c.combination_id, c.num1, c.num2,
+                c.forme, c.engine, c.beastie, c.tome,
+                p.parite, u.unidos, c.chip
+            FROM combinations c
+            LEFT JOIN parite p ON c.parite_id = p.parite_id
+            LEFT JOIN unidos u ON c.unidos_id = u.unidos_id
+            WHERE c.univers = :universe
+            AND c.num1 IS NOT NULL AND c.num2 IS NOT NULL
+            ORDER BY c.combination_id DESC
+        """), {"universe": universe})
+        
+        index = _AttributeIndex(NumberGeneratorService.ATTRIBUTE_TYPES, result.fetchall())
+        
+        with NumberGeneratorService._lock:
+            NumberGeneratorService._indexes[universe] = index
+        return index
+    
+    @staticmethod
+    def invalidate(universe: Optional[str] = None):
+        """Oublie l'index d'un univers (ou tous)"""
+        with NumberGeneratorService._lock:
+            if universe is None:
+                NumberGeneratorService._indexes.clear()
+            else:
+                NumberGeneratorService._indexes.pop(universe, None)
+    
+    @staticmethod
+    def _unindexed_lists(
+        db: Session,
+        index: _AttributeIndex,
+        attributes: Dict[str, str],
+        universe: str
+    ) -> Tuple[List[Tuple[str, str, np.ndarray]], List[str]]:
+        """
+        Positions des attributs absents de l'index, et attributs inconnus
+        
+        Une colonne de combinations est filtrée en SQL ; un attribut qui n'est
+        pas une colonne ne correspond à aucune combinaison (liste vide), ce qui
+        écarte la correspondance exacte au lieu de l'élargir.
+        """
+        lists, unknown = [], []
+        for attr_name, attr_value in attributes.items():
+            if not attr_value or attr_value == "N/A" or attr_name in index.postings:
+                continue
+            if attr_name in NumberGeneratorService.COMBINATION_COLUMNS:
+                result = db.execute(text(f"""
+                    SELECT combination_id FROM combinations
+                    WHERE univers = :universe AND {attr_name} = :value
+                """), {"universe": universe, "value": attr_value})
+                positions = index.positions_of(row[0] for row in result.fetchall())
+            else:
+                unknown.append(attr_name)
+                positions = np.empty(0, dtype=np.int32)
+            lists.append((attr_name, str(attr_value), positions))
+        return lists, unknown
+    
     @staticmethod
     def convert_attributes_to_numbers(
         db: Session, 
         attributes: Dict[str, str], 
-        universe: str = "mundo"
+        universe: str = "mundo",
+        index: Optional[_AttributeIndex] = None
     ) -> Dict[str, Any]:
         """Convertit les attributs en paires de numéros réels"""
         
         try:
-            # Construire la requête pour trouver les combinaisons correspondantes
-            conditions = []
-            params = {"universe": universe}
-            
-            for attr_name, attr_value in attributes.items():
-                if attr_value and attr_value != "N/A":
-                    conditions.append(f"{attr_name} = :{attr_name}")
-                    params[attr_name] = attr_value
+            if index is None:
+                index = NumberGeneratorService.get_index(db, universe)
             
-            if not conditions:
+            # Intersection des listes de positions de chaque attribut
+            extra, unknown = NumberGeneratorService._unindexed_lists(db, index, attributes, universe)
+            positions = index.match(attributes, extra)
+            if positions is None:
                 return NumberGeneratorService._generate_random_numbers()
             
-            # Requête pour trouver les combinaisons correspondantes
-            where_clause = " AND ".join(conditions)
-            query = f"""
-                SELECT num1, num2, combination_id
-                FROM combinations 
-                WHERE univers = :universe 
-                AND {where_clause}
-                ORDER BY combination_id DESC
-                LIMIT 10
-            """
-            
-            result = db.execute(text(query), params)
-            combinations = result.fetchall()
-            
-            if combinations:
+            if len(positions):
                 # Retourner les vraies combinaisons trouvées
                 number_pairs = []
-                for combo in combinations:
-                    number_pairs.append({
-                        "num1": combo.num1,
-                        "num2": combo.num2,
-                        "pair": f"{combo.num1}-{combo.num2}",
-                        "combination_id": combo.combination_id,
-                        "source": "historical_match"
-                    })
+                for position in positions[:NumberGeneratorService.MAX_MATCHES]:
+                    number_pairs.append({**index.pair(position), "source": "historical_match"})
                 
                 return {
                     "success": True,
@@ -69,7 +257,11 @@ class NumberGeneratorService:
                 }
             else:
                 # Générer des numéros basés sur les attributs similaires
-                return NumberGeneratorService._generate_similar_numbers(db, attributes, universe)
+                result = NumberGeneratorService._generate_similar_numbers(index, attributes, extra)
+                if unknown:
+                    # Attributs qui ne sont pas des colonnes : jamais satisfaits
+                    result["unknown_attributes"] = unknown
+                return result
                 
         except Exception as e:
             print(f"❌ Erreur conversion attributs->numéros: {e}")
@@ -77,58 +269,35 @@ class NumberGeneratorService:
     
     @staticmethod
     def _generate_similar_numbers(
-        db: Session, 
-        attributes: Dict[str, str], 
-        universe: str
+        index: _AttributeIndex, 
+        attributes: Dict[str, str],
+        extra: Optional[List[Tuple[str, str, np.ndarray]]] = None
     ) -> Dict[str, Any]:
-        """Génère des numéros basés sur des attributs similaires"""
+        """Génère des numéros à partir des combinaisons partageant le plus d'attributs"""
         
         try:
-            # Chercher des combinaisons avec au moins quelques attributs similaires
-            similar_pairs = []
+            unique_pairs = []
+            seen_pairs = set()
             
-            for attr_name, attr_value in attributes.items():
-                if attr_value and attr_value != "N/A":
-                    query = f"""
-                        SELECT num1, num2, {attr_name}
-                        FROM combinations 
-                        WHERE univers = :universe 
-                        AND {attr_name} = :attr_value
-                        ORDER BY combination_id DESC
-                        LIMIT 5
-                    """
-                    
-                    result = db.execute(text(query), {
-                        "universe": universe, 
-                        "attr_value": attr_value
-                    })
-                    
-                    for row in result.fetchall():
-                        similar_pairs.append({
-                            "num1": row.num1,
-                            "num2": row.num2,
-                            "pair": f"{row.num1}-{row.num2}",
-                            "matching_attribute": attr_name,
-                            "matching_value": attr_value,
-                            "source": "similar_attribute"
-                        })
+            # Classement par nombre d'attributs communs (sur un vivier élargi pour dédupliquer)
+            for position, matching in index.similar(attributes, NumberGeneratorService.MAX_SIMILAR * 4, extra):
+                pair = index.pair(position)
+                if pair["pair"] in seen_pairs:
+                    continue
+                seen_pairs.add(pair["pair"])
+                unique_pairs.append({
+                    **pair,
+                    "matching_attributes": matching,
+                    "match_count": len(matching),
+                    "source": "similar_attribute"
+                })
             
-            if similar_pairs:
-                # Supprimer les doublons
-                unique_pairs = []
-                seen_pairs = set()
-                
-                for pair in similar_pairs:
-                    pair_key = f"{pair['num1']}-{pair['num2']}"
-                    if pair_key not in seen_pairs:
-                        seen_pairs.add(pair_key)
-                        unique_pairs.append(pair)
-                
+            if unique_pairs:
                 return {
                     "success": True,
                     "method": "similar_attributes",
                     "attributes_used": attributes,
-                    "number_pairs": unique_pairs[:5],  # Top 5
+                    "number_pairs": unique_pairs[:NumberGeneratorService.MAX_SIMILAR],
                     "total_found": len(unique_pairs)
                 }
             else:
@@ -175,7 +344,8 @@ class NumberGeneratorService:
     def generate_numbers_from_combination(
         db: Session,
         combination_data: Dict[str, Any],
-        universe: str = "mundo"
+        universe: str = "mundo",
+        index: Optional[_AttributeIndex] = None
     ) -> Dict[str, Any]:
         """Génère des numéros à partir d'une combinaison complète"""
         
@@ -185,7 +355,7 @@ class NumberGeneratorService:
             
             # Convertir les attributs en numéros
             number_result = NumberGeneratorService.convert_attributes_to_numbers(
-                db, attributes, universe
+                db, attributes, universe, index=index
             )
             
             # Ajouter les informations de la combinaison originale
@@ -211,14 +381,15 @@ class NumberGeneratorService:
         combinations: List[Dict[str, Any]],
         universe: str = "mundo"
     ) -> Dict[str, Any]:
-        """Génère des numéros pour plusieurs combinaisons"""
+        """Génère des numéros pour plusieurs combinaisons (index chargé une seule fois)"""
         
         results = []
+        index = NumberGeneratorService.get_index(db, universe)
         
         for i, combination in enumerate(combinations):
             try:
                 number_result = NumberGeneratorService.generate_numbers_from_combination(
-                    db, combination, universe
+                    db, combination, universe, index=index
                 )
                 
                 results.append({
@@ -0,0 +1,335 @@
+"""
+Service de Détection d'Anomalies de Patterns
+Détecteur incrémental (z-score glissant + CUSUM) sur les séries de fréquences d'attributs
+"""
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from datetime import datetime
+import numpy as np
+
+
+class _AttributeStream:
+    """
+    État incrémental d'une série (univers, attribut)
+
+    Pour chaque valeur observée on conserve :
+    - le nombre d'apparitions depuis le début (taux historique p),
+    - le nombre d'apparitions dans la fenêtre glissante des W derniers tirages,
+    - deux statistiques CUSUM (hausse / baisse) sur l'indicateur standardisé.
+
+    La moyenne et la variance de l'indicateur d'apparition d'une valeur sont
+    celles d'une loi de Bernoulli (p, p(1-p)) : elles se déduisent des
+    compteurs, sans relire l'historique.
+    """
+
+    def __init__(self, window: int, drift: float):
+        self.window = window
+        self.drift = drift
+
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.window_counts = np.zeros(0, dtype=np.int64)
+        self.cusum_up = np.zeros(0, dtype=np.float64)
+        self.cusum_down = np.zeros(0, dtype=np.float64)
+
+        # Tampon circulaire des codes de la fenêtre
+        self.ring = np.full(window, -1, dtype=np.int64)
+        self.ring_pos = 0
+
+        self.total = 0
+        self.last_combination_id = 0
+
+    def _code(self, value: str) -> int:
+        """Code entier d'une valeur (agrandit les tableaux pour une nouvelle valeur)"""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+            for name in ('counts', 'window_counts'):
+                setattr(self, name, np.append(getattr(self, name), 0))
+            for name in ('cusum_up', 'cusum_down'):
+                setattr(self, name, np.append(getattr(self, name), 0.0))
+        return code
+
+    def _standardize(self, indicator: np.ndarray, p: np.ndarray) -> np.ndarray:
+        """(indicateur - p) / sqrt(p(1-p)), nul quand la variance est nulle"""
+        variance = p * (1.0 - p)
+        safe = np.where(variance > 0, variance, 1.0)
+        return np.where(variance > 0, (indicator - p) / np.sqrt(safe), 0.0)
+
+    def observe(self, value: str, combination_id: int = 0):
+        """Intègre un nouveau tirage en temps constant par valeur suivie"""
+        code = self._code(value)
+
+        if self.total > 0:
+            p = self.counts / self.total
+            indicator = np.zeros(len(self.values))
+            indicator[code] = 1.0
+            x = self._standardize(indicator, p)
+            self.cusum_up = np.maximum(0.0, self.cusum_up + x - self.drift)
+            self.cusum_down = np.maximum(0.0, self.cusum_down - x - self.drift)
+
+        # Fenêtre glissante : la valeur la plus ancienne sort, la nouvelle entre
+        expired = self.ring[self.ring_pos]
+        if expired >= 0:
+            self.window_counts[expired] -= 1
+        self.ring[self.ring_pos] = code
+        self.ring_pos = (self.ring_pos + 1) % self.window
+        self.window_counts[code] += 1
+
+        self.counts[code] += 1
+        self.total += 1
+        self.last_combination_id = max(self.last_combination_id, combination_id)
+
+    def extend(self, values: List[str], combination_ids: Optional[List[int]] = None):
+        """
+        Intègre un lot de tirages de manière vectorisée
+
+        Équivaut à appeler observe() sur chaque valeur : les taux p sont ceux
+        connus avant chaque tirage, et la récurrence CUSUM
+        S_t = max(0, S_{t-1} + z_t) est résolue sans boucle par
+        S_t = Y_t - min(-S_0, min_{s<=t} Y_s) avec Y la somme cumulée des z.
+        """
+        if not values:
+            return
+
+        codes = np.fromiter((self._code(v) for v in values), dtype=np.int64, count=len(values))
+        n = len(codes)
+        n_values = len(self.values)
+
+        one_hot = np.zeros((n, n_values), dtype=np.float64)
+        one_hot[np.arange(n), codes] = 1.0
+
+        # Compteurs et effectifs connus avant chaque tirage du lot
+        counts_before = self.counts + np.cumsum(one_hot, axis=0) - one_hot
+        totals_before = self.total + np.arange(n, dtype=np.float64)
+
+        valid = totals_before > 0
+        p = np.divide(
+            counts_before, totals_before[:, None],
+            out=np.zeros_like(counts_before), where=valid[:, None]
+        )
+        x = self._standardize(one_hot, p)
+        x[~valid] = 0.0
+        steps = valid[:, None].astype(np.float64)
+
+        self.cusum_up = self._cusum((x - self.drift) * steps, self.cusum_up)
+        self.cusum_down = self._cusum((-x - self.drift) * steps, self.cusum_down)
+
+        # Fenêtre : les W derniers codes (anciens du tampon + lot)
+        previous = self._window_codes()
+        tail = np.concatenate([previous, codes])[-self.window:]
+        self.window_counts = np.bincount(tail, minlength=n_values).astype(np.int64)
+        self.ring = np.full(self.window, -1, dtype=np.int64)
+        self.ring[:len(tail)] = tail
+        self.ring_pos = len(tail) % self.window
+
+        self.counts = self.counts + np.bincount(codes, minlength=n_values)
+        self.total += n
+        if combination_ids:
+            self.last_combination_id = max(self.last_combination_id, int(max(combination_ids)))
+
+    @staticmethod
+    def _cusum(increments: np.ndarray, start: np.ndarray) -> np.ndarray:
+        """Valeur finale de la CUSUM pour chaque colonne (forme fermée de Lindley)"""
+        y = np.cumsum(increments, axis=0)
+        floor = np.minimum(-start, np.minimum.accumulate(y, axis=0)[-1])
+        return y[-1] - floor
+
+    def _window_codes(self) -> np.ndarray:
+        """Codes de la fenêtre dans l'ordre chronologique"""
+        ordered = np.concatenate([self.ring[self.ring_pos:], self.ring[:self.ring_pos]])
+        return ordered[ordered >= 0]
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Taux récents, taux historiques et z-scores de la fenêtre courante"""
+        filled = min(self.total, self.window)
+        p = self.counts / self.total if self.total else np.zeros(len(self.values))
+        expected = filled * p
+        std = np.sqrt(filled * p * (1.0 - p))
+        z = np.divide(
+            self.window_counts - expected, std,
+            out=np.zeros(len(self.values)), where=std > 0
+        )
+        recent = self.window_counts / filled if filled else np.zeros(len(self.values))
+        return {"z": z, "recent_rate": recent, "historical_rate": p}
+
+
+class PatternDetectionService:
+    """
+    Détection d'anomalies sur les séries de fréquences d'attributs
+
+    L'état de chaque série (univers, attribut) est gardé en mémoire : un appel
+    ne lit que les combinaisons postérieures au dernier identifiant traité.
+    """
+
+    ATTRIBUTE_TYPES = ['forme', 'engine', 'beastie', 'tome', 'chip', 'parite', 'unidos']
+
+    WINDOW_SIZE = 50        # Taille de la fenêtre glissante (tirages)
+    CUSUM_DRIFT = 0.5       # Dérive tolérée k (en écarts-types)
+    CUSUM_THRESHOLD = 5.0   # Seuil de décision h de la CUSUM
+    MIN_HISTORY = 30        # Tirages minimum avant de signaler une anomalie
+
+    _streams: Dict[Tuple[str, str], _AttributeStream] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _fetch_new_rows(db: Session, universe: str, last_combination_id: int) -> List[Any]:
+        """Récupère les combinaisons non encore intégrées, dans l'ordre chronologique"""
+        query = """
+            SELECT
+                c.combination_id,
+                c.forme, c.engine, c.beastie, c.tome, c.chip,
+                p.parite,
+                u.unidos
+            FROM combinations c
+            LEFT JOIN parite p ON c.parite_id = p.parite_id
+            LEFT JOIN unidos u ON c.unidos_id = u.unidos_id
+            WHERE c.univers = :universe
+            AND c.combination_id > :last_combination_id
+            ORDER BY c.combination_id ASC
+        """
+        result = db.execute(text(query), {
+            "universe": universe,
+            "last_combination_id": last_combination_id
+        })
+        return result.fetchall()
+
+    @staticmethod
+    def update_streams(db: Session, universe: str = "mundo") -> int:
+        """Met à jour les séries d'un univers avec les nouveaux tirages, retourne leur nombre"""
+        with PatternDetectionService._lock:
+            streams = {
+                attr: PatternDetectionService._streams.setdefault(
+                    (universe, attr),
+                    _AttributeStream(PatternDetectionService.WINDOW_SIZE, PatternDetectionService.CUSUM_DRIFT)
+                )
+                for attr in PatternDetectionService.ATTRIBUTE_TYPES
+            }
+            last_seen = min(stream.last_combination_id for stream in streams.values())
+            rows = PatternDetectionService._fetch_new_rows(db, universe, last_seen)
+
+            for attr, stream in streams.items():
+                new_rows = [
+                    row for row in rows
+                    if row.combination_id > stream.last_combination_id and getattr(row, attr) is not None
+                ]
+                stream.extend(
+                    [str(getattr(row, attr)) for row in new_rows],
+                    [row.combination_id for row in new_rows]
+                )
+                if rows:
+                    stream.last_combination_id = max(stream.last_combination_id, rows[-1].combination_id)
+
+            return len(rows)
+
+    @staticmethod
+    def get_value_scores(db: Session, universe: str = "mundo") -> Dict[str, Dict[str, float]]:
+        """z-score de la fenêtre glissante de chaque valeur (positif = fréquence en hausse)"""
+        PatternDetectionService.update_streams(db, universe)
+
+        scores = {}
+        with PatternDetectionService._lock:
+            for attr in PatternDetectionService.ATTRIBUTE_TYPES:
+                stream = PatternDetectionService._streams.get((universe, attr))
+                if stream is None or stream.total < PatternDetectionService.MIN_HISTORY:
+                    continue
+                z = stream.snapshot()["z"]
+                scores[attr] = {value: float(z[code]) for value, code in stream.codes.items()}
+
+        return scores
+
+    @staticmethod
+    def reset(universe: Optional[str] = None):
+        """Oublie l'état des séries (toutes, ou celles d'un univers)"""
+        with PatternDetectionService._lock:
+            if universe is None:
+                PatternDetectionService._streams.clear()
+            else:
+                for key in [k for k in PatternDetectionService._streams if k[0] == universe]:
+                    del PatternDetectionService._streams[key]
+
+    @staticmethod
+    def detect_anomalies(db: Session, universe: str = "mundo", threshold: float = 2.5) -> Dict[str, Any]:
+        """
+        Détecte les valeurs d'attributs dont la fréquence récente dévie de l'historique
+
+        Une valeur est signalée si le z-score de la fenêtre glissante dépasse le
+        seuil en valeur absolue, ou si l'une des CUSUM dépasse CUSUM_THRESHOLD.
+        La sévérité ramène la CUSUM à l'échelle du seuil z pour être comparable.
+        """
+        try:
+            new_draws = PatternDetectionService.update_streams(db, universe)
+
+            anomalies = []
+            by_attribute = {}
+
+            for attr in PatternDetectionService.ATTRIBUTE_TYPES:
+                stream = PatternDetectionService._streams.get((universe, attr))
+                if stream is None or stream.total < PatternDetectionService.MIN_HISTORY:
+                    continue
+
+                stats = stream.snapshot()
+                cusum_h = PatternDetectionService.CUSUM_THRESHOLD
+                flagged = (
+                    (np.abs(stats["z"]) >= threshold)
+                    | (stream.cusum_up >= cusum_h)
+                    | (stream.cusum_down >= cusum_h)
+                )
+
+                attr_anomalies = []
+                for code in np.flatnonzero(flagged):
+                    z = float(stats["z"][code])
+                    up = float(stream.cusum_up[code])
+                    down = float(stream.cusum_down[code])
+                    recent_rate = float(stats["recent_rate"][code])
+                    historical_rate = float(stats["historical_rate"][code])
+
+                    rising = z > 0 if abs(z) >= threshold else up >= down
+                    anomaly_type = "frequency_spike" if rising else "frequency_drop"
+                    severity = max(abs(z), threshold * max(up, down) / cusum_h)
+                    change_ratio = recent_rate / historical_rate if historical_rate > 0 else 0
+
+                    value = stream.values[code]
+                    direction = "hausse" if rising else "baisse"
+                    attr_anomalies.append({
+                        "type": anomaly_type,
+                        "attribute_type": attr,
+                        "value": value,
+                        "anomaly_type": anomaly_type,
+                        "severity": round(severity, 2),
+                        "z_score": round(z, 2),
+                        "cusum": round(up if rising else down, 2),
+                        "recent_rate": round(recent_rate, 4),
+                        "historical_rate": round(historical_rate, 4),
+                        "change_ratio": round(change_ratio, 2),
+                        "description": f"{value} ({attr}) en {direction}: {recent_rate:.1%} sur les "
+                                       f"{min(stream.total, stream.window)} derniers tirages "
+                                       f"contre {historical_rate:.1%} historiquement"
+                    })
+
+                attr_anomalies.sort(key=lambda a: a["severity"], reverse=True)
+                if attr_anomalies:
+                    by_attribute[attr] = attr_anomalies
+                anomalies.extend(attr_anomalies)
+
+            anomalies.sort(key=lambda a: a["severity"], reverse=True)
+
+            return {
+                "universe": universe,
+                "threshold": threshold,
+                "new_draws_processed": new_draws,
+                "total_anomalies": len(anomalies),
+                "anomalies": anomalies,
+                "by_attribute": by_attribute,
+                "timestamp": datetime.now().isoformat()
+            }
+
+        except Exception as e:
+            print(f"❌ Erreur détection anomalies: {e}")
+            return {"universe": universe, "anomalies": [], "by_attribute": {}, "error": str(e)}
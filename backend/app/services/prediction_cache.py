@@ -0,0 +1,73 @@
+"""
+Cache des prédictions LSTM
+
+La prédiction d'un attribut ne dépend que du modèle et de l'historique des
+combinaisons : elle est mise en cache sous la clé (univers, attribut,
+version du fichier modèle, dernier combination_id). Réentraîner ou exporter
+un modèle change sa version, une nouvelle combinaison change le dernier id :
+la clé change et l'ancienne entrée est remplacée, sans invalidation
+explicite. Le cache est borné (LRU) et compte ses hits et misses.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+class PredictionCache:
+    """
+    Cache LRU des prédictions par (univers, attribut, version modèle, dernier id)
+    """
+
+    # Nombre maximal de prédictions conservées
+    MAX_ENTRIES = 256
+
+    _entries: "OrderedDict[Tuple[str, str, str, Optional[int]], Dict[str, Any]]" = OrderedDict()
+    _lock = threading.Lock()
+    _metrics = {"hits": 0, "misses": 0, "evictions": 0, "replacements": 0}
+
+    @staticmethod
+    def get(universe: str, attribute: str, model_version: str, last_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Prédiction en cache, ou None (compté comme miss)"""
+        key = (universe, attribute, model_version, last_id)
+        with PredictionCache._lock:
+            prediction = PredictionCache._entries.get(key)
+            if prediction is None:
+                PredictionCache._metrics["misses"] += 1
+                return None
+            PredictionCache._entries.move_to_end(key)
+            PredictionCache._metrics["hits"] += 1
+            return prediction
+
+    @staticmethod
+    def put(universe: str, attribute: str, model_version: str, last_id: Optional[int], prediction: Dict[str, Any]):
+        """Enregistre une prédiction et retire les versions antérieures du même attribut"""
+        key = (universe, attribute, model_version, last_id)
+        with PredictionCache._lock:
+            for stale in [k for k in PredictionCache._entries if k[:2] == key[:2] and k != key]:
+                del PredictionCache._entries[stale]
+                PredictionCache._metrics["replacements"] += 1
+            PredictionCache._entries[key] = prediction
+            PredictionCache._entries.move_to_end(key)
+            while len(PredictionCache._entries) > PredictionCache.MAX_ENTRIES:
+                PredictionCache._entries.popitem(last=False)
+                PredictionCache._metrics["evictions"] += 1
+
+    @staticmethod
+    def clear():
+        """Vide le cache (les compteurs sont conservés)"""
+        with PredictionCache._lock:
+            PredictionCache._entries.clear()
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Taille, hits, misses et taux de hit"""
+        with PredictionCache._lock:
+            metrics = dict(PredictionCache._metrics)
+            size = len(PredictionCache._entries)
+        lookups = metrics["hits"] + metrics["misses"]
+        return {
+            "size": size,
+            "max_entries": PredictionCache.MAX_ENTRIES,
+            **metrics,
+            "hit_rate": round(metrics["hits"] / lookups, 3) if lookups else None
+        }
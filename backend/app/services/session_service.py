@@ -9,11 +9,16 @@
 
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
 from app.models.session import WorkSession, SessionDraw
+from app.services import events
 
 class SessionService:
     
+    # Nombre de tirages par instruction INSERT lors de la création d'un planning
+    INSERT_BATCH_SIZE = 1000
+    
     @staticmethod
     def create_work_session(
         db: Session,
@@ -49,74 +54,157 @@ class SessionService:
         )
         
         db.add(session)
+        db.flush()  # Attribue session.id sans valider la transaction
+        
+        # Créer les tirages vides (planning cyclique, ou legacy sans planning)
+        if lottery_schedule:
+            SessionService.create_session_draws_with_schedule(
+                db, session.id, total_draws, lottery_schedule, start_date, commit=False
+            )
+        else:
+            SessionService.create_session_draws(db, session.id, total_draws, lottery_type, commit=False)
+        
+        # Session et tirages validés dans une seule transaction
         db.commit()
         db.refresh(session)
         
-        # Créer les tirages vides pour la session avec le planning cyclique
-        SessionService.create_session_draws_with_schedule(db, session.id, total_draws, lottery_schedule, start_date)
-        
         return session
     
+    @staticmethod
+    def schedule_draw_rows(
+        session_id: int,
+        lottery_schedule: List[Dict],
+        start_date: datetime,
+        first_index: int,
+        count: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Lignes session_draws des tirages first_index..first_index+count-1 (base 0)
+        
+        Le tirage i occupe la position i % len(planning) du cycle et tombe
+        (i // len(planning)) semaines après start_date, décalé du day_offset
+        de sa position : le planning se déroule sans rien relire en base.
+        """
+        cycle_length = len(lottery_schedule)
+        names = [item['name'] for item in lottery_schedule]
+        offsets = [timedelta(days=item['day_offset']) for item in lottery_schedule]
+        week = timedelta(days=7)
+        
+        rows = []
+        for i in range(first_index, first_index + count):
+            cycle, position = divmod(i, cycle_length)
+            rows.append({
+                "session_id": session_id,
+                "draw_number": i + 1,
+                "cycle_position": position,
+                "lottery_name": names[position],
+                "draw_date": start_date + cycle * week + offsets[position],
+                "winning_numbers": [],
+                "is_completed": False,
+                "is_no_draw": False
+            })
+        return rows
+    
+    @staticmethod
+    def legacy_draw_rows(session_id: int, lottery_type: str, first_index: int, count: int) -> List[Dict[str, Any]]:
+        """Lignes session_draws sans planning (méthode legacy)"""
+        now = datetime.now()  # Date par défaut, sera mise à jour lors de la saisie
+        return [
+            {
+                "session_id": session_id,
+                "draw_number": i + 1,
+                "cycle_position": 0,  # Position par défaut
+                "lottery_name": f"{lottery_type} - Tirage {i + 1}",
+                "draw_date": now,
+                "winning_numbers": [],
+                "is_completed": False,
+                "is_no_draw": False
+            }
+            for i in range(first_index, first_index + count)
+        ]
+    
+    @staticmethod
+    def insert_draw_rows(db: Session, rows: List[Dict[str, Any]]):
+        """Insère des lignes session_draws par lots (executemany, sans objets ORM)"""
+        batch_size = SessionService.INSERT_BATCH_SIZE
+        for i in range(0, len(rows), batch_size):
+            db.execute(SessionDraw.__table__.insert(), rows[i:i + batch_size])
+    
     @staticmethod
     def create_session_draws_with_schedule(
         db: Session, 
         session_id: int, 
         total_draws: int, 
         lottery_schedule: List[Dict], 
-        start_date: datetime
+        start_date: datetime,
+        commit: bool = True
     ):
         """Créer les tirages avec planning cyclique"""
-        from datetime import timedelta
-        
-        draws = []
-        cycle_length = len(lottery_schedule)
-        
-        for i in range(total_draws):
-            cycle_position = i % cycle_length
-            lottery_info = lottery_schedule[cycle_position]
-            
-            # Calculer la date du tirage
-            days_from_start = (i // cycle_length) * 7 + lottery_info['day_offset']
-            draw_date = start_date + timedelta(days=days_from_start)
-            
-            draw = SessionDraw(
-                session_id=session_id,
-                draw_number=i + 1,
-                cycle_position=cycle_position,
-                lottery_name=lottery_info['name'],
-                draw_date=draw_date,
-                winning_numbers=[],
-                is_completed=False
-            )
-            draws.append(draw)
-        
-        db.add_all(draws)
-        db.commit()
+        rows = SessionService.schedule_draw_rows(session_id, lottery_schedule, start_date, 0, total_draws)
+        SessionService.insert_draw_rows(db, rows)
+        if commit:
+            db.commit()
     
     @staticmethod
-    def create_session_draws(db: Session, session_id: int, total_draws: int, lottery_type: str):
+    def create_session_draws(db: Session, session_id: int, total_draws: int, lottery_type: str, commit: bool = True):
         """Créer les tirages vides pour une session (méthode legacy)"""
-        draws = []
-        for i in range(1, total_draws + 1):
-            draw = SessionDraw(
-                session_id=session_id,
-                draw_number=i,
-                cycle_position=0,  # Position par défaut
-                lottery_name=f"{lottery_type} - Tirage {i}",
-                draw_date=datetime.now(),  # Date par défaut, sera mise à jour lors de la saisie
-                winning_numbers=[],
-                is_completed=False
+        rows = SessionService.legacy_draw_rows(session_id, lottery_type, 0, total_draws)
+        SessionService.insert_draw_rows(db, rows)
+        if commit:
+            db.commit()
+    
+    @staticmethod
+    def append_cycles(db: Session, session_id: int, cycles: int) -> Optional[Dict[str, Any]]:
+        """
+        Prolonge une session de N cycles complets
+        
+        Un cycle compte autant de tirages que le planning (ou cycle_length
+        pour une session sans planning). Les tirages ajoutés suivent le
+        dernier tirage existant ; tout est inséré dans une seule transaction.
+        """
+        if cycles < 1:
+            raise ValueError("Le nombre de cycles doit être positif")
+        
+        session = db.query(WorkSession).filter(WorkSession.id == session_id).first()
+        if not session:
+            return None
+        
+        last_draw = db.query(func.max(SessionDraw.draw_number)).filter(
+            SessionDraw.session_id == session_id
+        ).scalar() or 0
+        
+        schedule = session.lottery_schedule or []
+        if schedule:
+            rows = SessionService.schedule_draw_rows(
+                session_id, schedule, session.start_date, last_draw, cycles * len(schedule)
+            )
+        else:
+            rows = SessionService.legacy_draw_rows(
+                session_id, session.lottery_type, last_draw, cycles * (session.cycle_length or 1)
             )
-            draws.append(draw)
         
-        db.add_all(draws)
+        SessionService.insert_draw_rows(db, rows)
+        SessionService._update_counters(db, session_id, total=len(rows))
         db.commit()
+        db.refresh(session)
+        
+        return {
+            "session_id": session_id,
+            "added_draws": len(rows),
+            "first_new_draw": last_draw + 1,
+            "total_draws": session.total_draws
+        }
     
     @staticmethod
     def get_active_session(db: Session) -> Optional[WorkSession]:
         """Récupérer la session active"""
         return db.query(WorkSession).filter(WorkSession.is_active == True).first()
     
+    @staticmethod
+    def get_session(db: Session, session_id: int) -> Optional[WorkSession]:
+        """Récupérer une session par son identifiant"""
+        return db.query(WorkSession).filter(WorkSession.id == session_id).first()
+    
     @staticmethod
     def get_all_sessions(db: Session) -> List[WorkSession]:
         """Récupérer toutes les sessions disponibles"""
@@ -156,6 +244,33 @@ class SessionService:
             SessionDraw.draw_number == session.current_draw
         ).first()
     
+    @staticmethod
+    def _update_counters(db: Session, session_id: int, completed: int = 0, no_draw: int = 0, total: int = 0):
+        """
+        Ajuste les compteurs d'une session dans la transaction en cours
+        
+        L'incrément est fait en SQL (col = col + n) pour rester exact même si
+        deux requêtes modifient la même session en parallèle.
+        """
+        values = {}
+        if completed:
+            values[WorkSession.completed_draws] = func.coalesce(WorkSession.completed_draws, 0) + completed
+        if no_draw:
+            values[WorkSession.no_draw_count] = func.coalesce(WorkSession.no_draw_count, 0) + no_draw
+        if total:
+            values[WorkSession.total_draws] = WorkSession.total_draws + total
+        if values:
+            db.query(WorkSession).filter(WorkSession.id == session_id).update(values, synchronize_session=False)
+    
+    @staticmethod
+    def _set_draw_state(db: Session, draw: SessionDraw, is_completed: bool, is_no_draw: bool):
+        """Change l'état d'un tirage et répercute la différence sur les compteurs"""
+        completed_delta = int(bool(is_completed)) - int(bool(draw.is_completed))
+        no_draw_delta = int(bool(is_no_draw)) - int(bool(draw.is_no_draw))
+        draw.is_completed = is_completed
+        draw.is_no_draw = is_no_draw
+        SessionService._update_counters(db, draw.session_id, completed_delta, no_draw_delta)
+    
     @staticmethod
     def save_draw_numbers(
         db: Session, 
@@ -173,38 +288,124 @@ class SessionService:
         if not draw:
             raise ValueError(f"Tirage {draw_number} non trouvé dans la session {session_id}")
         draw.winning_numbers = numbers if numbers else []
-        draw.is_completed = True
-        draw.is_no_draw = is_no_draw
+        SessionService._set_draw_state(db, draw, True, is_no_draw)
         if draw_date:
             draw.draw_date = draw_date
+        # Avancer le tirage actuel au tirage suivant existant (même transaction) :
+        # total_draws compte les tirages restants, pas le plus grand numéro
+        next_number = db.query(func.min(SessionDraw.draw_number)).filter(
+            SessionDraw.session_id == session_id,
+            SessionDraw.draw_number > draw_number
+        ).scalar()
+        if next_number is not None:
+            db.query(WorkSession).filter(
+                WorkSession.id == session_id,
+                WorkSession.current_draw == draw_number
+            ).update({WorkSession.current_draw: next_number}, synchronize_session=False)
         db.commit()
         db.refresh(draw)
-        # Mettre à jour le tirage actuel de la session
-        session = db.query(WorkSession).filter(WorkSession.id == session_id).first()
-        if session and draw_number == session.current_draw and draw_number < session.total_draws:
-            session.current_draw = draw_number + 1
-            db.commit()
+        events.publish(events.DRAW_SAVED, db=db, session_id=session_id, draw_number=draw_number)
         return draw
     
+    @staticmethod
+    def update_draw_numbers(
+        db: Session,
+        session_id: int,
+        draw_id: int,
+        numbers: List[int],
+        draw_date: datetime = None
+    ) -> Optional[SessionDraw]:
+        """Modifier les numéros d'un tirage existant (None si introuvable)"""
+        draw = db.query(SessionDraw).filter(
+            SessionDraw.session_id == session_id,
+            SessionDraw.id == draw_id
+        ).first()
+        if not draw:
+            return None
+        draw.winning_numbers = numbers
+        SessionService._set_draw_state(db, draw, True, draw.is_no_draw)
+        if draw_date:
+            draw.draw_date = draw_date
+        db.commit()
+        db.refresh(draw)
+        events.publish(events.DRAW_SAVED, db=db, session_id=session_id, draw_number=draw.draw_number)
+        return draw
+    
+    @staticmethod
+    def delete_draw(db: Session, session_id: int, draw_id: int) -> Optional[int]:
+        """Supprimer un tirage d'une session, retourne son numéro (None si introuvable)"""
+        draw = db.query(SessionDraw).filter(
+            SessionDraw.session_id == session_id,
+            SessionDraw.id == draw_id
+        ).first()
+        if not draw:
+            return None
+        draw_number = draw.draw_number
+        SessionService._update_counters(
+            db, session_id,
+            completed=-int(bool(draw.is_completed)),
+            no_draw=-int(bool(draw.is_no_draw)),
+            total=-1
+        )
+        db.delete(draw)
+        db.commit()
+        events.publish(events.DRAW_SAVED, db=db, session_id=session_id, draw_number=draw_number)
+        return draw_number
+    
+    @staticmethod
+    def recompute_counters(db: Session, session_id: Optional[int] = None) -> int:
+        """
+        Recalcule les compteurs depuis session_draws (une requête agrégée)
+        
+        Job de réparation : à lancer après une migration ou une modification
+        directe de la base. Retourne le nombre de sessions mises à jour.
+        """
+        query = db.query(
+            SessionDraw.session_id,
+            func.count(SessionDraw.id),
+            func.sum(case((SessionDraw.is_completed == True, 1), else_=0)),
+            func.sum(case((SessionDraw.is_no_draw == True, 1), else_=0))
+        )
+        if session_id is not None:
+            query = query.filter(SessionDraw.session_id == session_id)
+        counts = {row[0]: row[1:] for row in query.group_by(SessionDraw.session_id).all()}
+        
+        sessions = db.query(WorkSession)
+        if session_id is not None:
+            sessions = sessions.filter(WorkSession.id == session_id)
+        
+        updated = 0
+        for session in sessions.all():
+            total, completed, no_draw = counts.get(session.id, (0, 0, 0))
+            session.total_draws = total
+            session.completed_draws = int(completed or 0)
+            session.no_draw_count = int(no_draw or 0)
+            updated += 1
+        db.commit()
+        return updated
+    
     @staticmethod
     def get_session_progress(db: Session, session_id: int) -> Dict[str, Any]:
         """Obtenir le progrès d'une session"""
         session = db.query(WorkSession).filter(WorkSession.id == session_id).first()
         if not session:
             return {}
-        
-        completed_draws = db.query(SessionDraw).filter(
-            SessionDraw.session_id == session_id,
-            SessionDraw.is_completed == True
-        ).count()
+        return SessionService.session_progress(session)
+    
+    @staticmethod
+    def session_progress(session: WorkSession) -> Dict[str, Any]:
+        """Progrès d'une session déjà chargée, lu dans ses compteurs (aucune requête)"""
+        completed_draws = session.completed_draws or 0
+        total_draws = session.total_draws or 0
         
         return {
             "session_id": session.id,
             "session_name": session.name,
             "current_draw": session.current_draw,
-            "total_draws": session.total_draws,
+            "total_draws": total_draws,
             "completed_draws": completed_draws,
-            "progress_percentage": round((completed_draws / session.total_draws) * 100, 1),
+            "no_draw_count": session.no_draw_count or 0,
+            "progress_percentage": round((completed_draws / total_draws) * 100, 1) if total_draws else 0.0,
             "numbers_per_draw": session.numbers_per_draw,
             "number_range": f"{session.number_range_min}-{session.number_range_max}"
-        }
\ No newline at end of file
+        }
@@ -7,6 +7,7 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import json
 from collections import defaultdict, Counter
+from app.database import universe_tables
 
 class TemporalAnalysisService:
     
@@ -64,33 +65,13 @@ class TemporalAnalysisService:
     @staticmethod
     def _get_chip_data(db: Session, universe: str, date_start: str, date_end: str) -> Dict[str, Any]:
         """Récupère les données par chip"""
-        query = text(f"""
-            SELECT 
-                chip,
-                COUNT(*) as occurrence_count,
-                GROUP_CONCAT(DISTINCT denomination) as denominations,
-                GROUP_CONCAT(DISTINCT forme) as formes,
-                GROUP_CONCAT(DISTINCT tome) as tomes,
-                GROUP_CONCAT(DISTINCT granque_name) as granques,
-                MIN(date_tirage) as first_occurrence,
-                MAX(date_tirage) as last_occurrence
-            FROM {universe}
-            WHERE date_tirage BETWEEN :date_start AND :date_end
-            AND chip IS NOT NULL
-            GROUP BY chip
-            ORDER BY chip
-        """)
-        
-        result = db.execute(query, {
-            'date_start': date_start,
-            'date_end': date_end
-        })
+        rows = universe_tables.fetch_marking_aggregates(db, universe, 'chip', date_start, date_end)
         
         occurrences = {}
         total_draws = 0
         
-        for row in result:
-            chip_num = int(row.chip.replace('chip', '')) if row.chip and row.chip.startswith('chip') else None
+        for row in rows:
+            chip_num = row.chip_number
             if chip_num:
                 occurrences[chip_num] = {
                     'count': row.occurrence_count,
@@ -120,29 +101,13 @@ class TemporalAnalysisService:
     @staticmethod
     def _get_combination_data(db: Session, universe: str, date_start: str, date_end: str) -> Dict[str, Any]:
         """Récupère les données par combinaison"""
-        query = text(f"""
-            SELECT 
-                chip,
-                combination_id,
-                COUNT(*) as occurrence_count,
-                GROUP_CONCAT(DISTINCT denomination) as denominations
-            FROM {universe}
-            WHERE date_tirage BETWEEN :date_start AND :date_end
-            AND combination_id IS NOT NULL
-            GROUP BY chip, combination_id
-            ORDER BY chip, combination_id
-        """)
-        
-        result = db.execute(query, {
-            'date_start': date_start,
-            'date_end': date_end
-        })
+        rows = universe_tables.fetch_marking_aggregates(db, universe, 'combination', date_start, date_end)
         
         occurrences = {}
         total_draws = 0
         
-        for row in result:
-            chip_num = int(row.chip.replace('chip', '')) if row.chip and row.chip.startswith('chip') else None
+        for row in rows:
+            chip_num = row.chip_number
             if chip_num:
                 if chip_num not in occurrences:
                     occurrences[chip_num] = {'count': 0, 'attributes': [], 'details': []}
@@ -170,30 +135,13 @@ class TemporalAnalysisService:
     @staticmethod
     def _get_denomination_data(db: Session, universe: str, date_start: str, date_end: str) -> Dict[str, Any]:
         """Récupère les données par dénomination"""
-        query = text(f"""
-            SELECT 
-                chip,
-                denomination,
-                COUNT(*) as occurrence_count,
-                GROUP_CONCAT(DISTINCT forme) as formes,
-                GROUP_CONCAT(DISTINCT tome) as tomes
-            FROM {universe}
-            WHERE date_tirage BETWEEN :date_start AND :date_end
-            AND denomination IS NOT NULL
-            GROUP BY chip, denomination
-            ORDER BY chip, denomination
-        """)
-        
-        result = db.execute(query, {
-            'date_start': date_start,
-            'date_end': date_end
-        })
+        rows = universe_tables.fetch_marking_aggregates(db, universe, 'denomination', date_start, date_end)
         
         occurrences = {}
         total_draws = 0
         
-        for row in result:
-            chip_num = int(row.chip.replace('chip', '')) if row.chip and row.chip.startswith('chip') else None
+        for row in rows:
+            chip_num = row.chip_number
             if chip_num:
                 if chip_num not in occurrences:
                     occurrences[chip_num] = {'count': 0, 'attributes': [], 'details': []}
@@ -222,29 +170,13 @@ class TemporalAnalysisService:
     @staticmethod
     def _get_tome_data(db: Session, universe: str, date_start: str, date_end: str) -> Dict[str, Any]:
         """Récupère les données par tome"""
-        query = text(f"""
-            SELECT 
-                chip,
-                tome,
-                COUNT(*) as occurrence_count,
-                GROUP_CONCAT(DISTINCT denomination) as denominations
-            FROM {universe}
-            WHERE date_tirage BETWEEN :date_start AND :date_end
-            AND tome IS NOT NULL
-            GROUP BY chip, tome
-            ORDER BY chip, tome
-        """)
-        
-        result = db.execute(query, {
-            'date_start': date_start,
-            'date_end': date_end
-        })
+        rows = universe_tables.fetch_marking_aggregates(db, universe, 'tome', date_start, date_end)
         
         occurrences = {}
         total_draws = 0
         
-        for row in result:
-            chip_num = int(row.chip.replace('chip', '')) if row.chip and row.chip.startswith('chip') else None
+        for row in rows:
+            chip_num = row.chip_number
             if chip_num:
                 if chip_num not in occurrences:
                     occurrences[chip_num] = {'count': 0, 'attributes': [], 'details': []}
@@ -272,29 +204,13 @@ class TemporalAnalysisService:
     @staticmethod
     def _get_forme_data(db: Session, universe: str, date_start: str, date_end: str) -> Dict[str, Any]:
         """Récupère les données par forme"""
-        query = text(f"""
-            SELECT 
-                chip,
-                forme,
-                COUNT(*) as occurrence_count,
-                GROUP_CONCAT(DISTINCT denomination) as denominations
-            FROM {universe}
-            WHERE date_tirage BETWEEN :date_start AND :date_end
-            AND forme IS NOT NULL
-            GROUP BY chip, forme
-            ORDER BY chip, forme
-        """)
-        
-        result = db.execute(query, {
-            'date_start': date_start,
-            'date_end': date_end
-        })
+        rows = universe_tables.fetch_marking_aggregates(db, universe, 'forme', date_start, date_end)
         
         occurrences = {}
         total_draws = 0
         
-        for row in result:
-            chip_num = int(row.chip.replace('chip', '')) if row.chip and row.chip.startswith('chip') else None
+        for row in rows:
+            chip_num = row.chip_number
             if chip_num:
                 if chip_num not in occurrences:
                     occurrences[chip_num] = {'count': 0, 'attributes': [], 'details': []}
@@ -322,29 +238,13 @@ class TemporalAnalysisService:
     @staticmethod
     def _get_granque_data(db: Session, universe: str, date_start: str, date_end: str) -> Dict[str, Any]:
         """Récupère les données par granque"""
-        query = text(f"""
-            SELECT 
-                chip,
-                granque_name,
-                COUNT(*) as occurrence_count,
-                GROUP_CONCAT(DISTINCT denomination) as denominations
-            FROM {universe}
-            WHERE date_tirage BETWEEN :date_start AND :date_end
-            AND granque_name IS NOT NULL
-            GROUP BY chip, granque_name
-            ORDER BY chip, granque_name
-        """)
-        
-        result = db.execute(query, {
-            'date_start': date_start,
-            'date_end': date_end
-        })
+        rows = universe_tables.fetch_marking_aggregates(db, universe, 'granque', date_start, date_end)
         
         occurrences = {}
         total_draws = 0
         
-        for row in result:
-            chip_num = int(row.chip.replace('chip', '')) if row.chip and row.chip.startswith('chip') else None
+        for row in rows:
+            chip_num = row.chip_number
             if chip_num:
                 if chip_num not in occurrences:
                     occurrences[chip_num] = {'count': 0, 'attributes': [], 'details': []}
@@ -0,0 +1,81 @@
+"""
+Profil de démarrage d'un worker
+
+Mesure la durée et la mémoire résidente (RSS) de chaque étape du chargement
+de l'application (import des routers, création des tables...) et les
+affiche en fin de démarrage. Le rapport reste disponible dans /api/health
+pour comparer les workers entre eux.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+
+def rss_mb() -> Optional[float]:
+    """Mémoire résidente actuelle du processus, en Mo (None si inconnue)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # Pic de mémoire : Ko sous Linux, octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StartupProfiler:
+    """Chronomètre des étapes de démarrage"""
+
+    # Modules lourds dont la présence en mémoire est signalée
+    HEAVY_MODULES = ["tensorflow", "keras", "sklearn", "pandas"]
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.initial_rss_mb = rss_mb()
+        self.steps: List[Dict[str, Any]] = []
+        self.total_ms: Optional[float] = None
+
+    @contextmanager
+    def step(self, name: str):
+        """Mesure une étape (durée et variation de RSS), même si elle échoue"""
+        start, start_rss = time.perf_counter(), rss_mb()
+        try:
+            yield
+        finally:
+            end_rss = rss_mb()
+            self.steps.append({
+                "step": name,
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+                "rss_delta_mb": round(end_rss - start_rss, 1) if end_rss is not None and start_rss is not None else None
+            })
+
+    def finish(self) -> Dict[str, Any]:
+        """Clôt le démarrage et affiche le rapport"""
+        self.total_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        report = self.report()
+        print(f"[STARTUP] Worker {report['pid']} prêt en {self.total_ms} ms, RSS {report['rss_mb']} Mo")
+        for step in sorted(self.steps, key=lambda s: s["ms"], reverse=True):
+            print(f"[STARTUP]   {step['step']}: {step['ms']} ms, {step['rss_delta_mb']:+} Mo"
+                  if step["rss_delta_mb"] is not None else f"[STARTUP]   {step['step']}: {step['ms']} ms")
+        if report["heavy_modules_loaded"]:
+            print(f"[STARTUP] Modules lourds chargés: {', '.join(report['heavy_modules_loaded'])}")
+        return report
+
+    def report(self) -> Dict[str, Any]:
+        """Rapport de démarrage (durées, mémoire, modules lourds chargés)"""
+        return {
+            "pid": os.getpid(),
+            "startup_ms": self.total_ms,
+            "initial_rss_mb": self.initial_rss_mb,
+            "rss_mb": rss_mb(),
+            "steps": list(self.steps),
+            "heavy_modules_loaded": [name for name in self.HEAVY_MODULES if name in sys.modules]
+        }
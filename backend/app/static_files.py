@@ -0,0 +1,222 @@
+"""
+Service des fichiers statiques du frontend, précompressés et cachables
+
+Au démarrage (ou au build via precompress_static.py), chaque fichier texte
+du frontend est compressé une fois en gzip et, si le module brotli est
+installé, en brotli. Les variantes sont rangées dans un dossier de cache
+(STATIC_CACHE_DIR) et régénérées seulement quand la source change. À chaque
+requête, la variante la plus compacte acceptée par le client
+(Accept-Encoding) est servie, avec un ETag dérivé du contenu :
+
+- fichiers empreintés (app.3f9c2a1b.js) : Cache-Control immutable, un an ;
+- autres fichiers : revalidation systématique (no-cache), résolue en 304
+  sans corps tant que le contenu n'a pas changé.
+
+Les poids q de l'Accept-Encoding sont respectés : un codage à q=0 (ou
+exclu par *;q=0) n'est jamais servi.
+
+ApiGZipMiddleware compresse en plus les réponses JSON dynamiques (/api)
+au-delà d'une taille minimale.
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Any, Optional
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # gzip seul si brotli n'est pas installé
+    brotli = None
+
+# Extensions compressées (les images et polices le sont déjà)
+COMPRESSIBLE_EXTENSIONS = {".html", ".htm", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".xml", ".map", ".webmanifest"}
+
+# En dessous de cette taille (octets), la compression ne vaut pas l'en-tête
+MIN_COMPRESS_SIZE = 1024
+
+# Nom de fichier empreinté par un hash de contenu : nom.<hex 8+>.ext
+FINGERPRINT = re.compile(r"\.[0-9a-f]{8,}\.\w+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "STATIC_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".static_cache")
+)
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Poids q de chaque codage d'un en-tête Accept-Encoding (q=0 : refusé)"""
+    weights = {}
+    for part in header.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    return weights
+
+
+def encoding_weight(weights: Dict[str, float], encoding: str) -> float:
+    """Poids d'un codage, '*' s'appliquant aux codages non cités"""
+    return weights.get(encoding, weights.get("*", 0.0))
+
+
+def _compress_file(source: str, target: str, encoding: str, data: bytes):
+    """Écrit une variante compressée (écriture atomique)"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=11)
+    else:
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    tmp = f"{target}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp, target)
+    # Même date que la source : une source modifiée se détecte par comparaison
+    stat = os.stat(source)
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def precompress_file(directory: str, relative_path: str, cache_dir: str) -> Dict[str, Any]:
+    """ETag et variantes compressées d'un fichier (recompressé seulement s'il a changé)"""
+    source = os.path.join(directory, relative_path)
+    stat = os.stat(source)
+    with open(source, "rb") as f:
+        data = f.read()
+
+    entry = {
+        "etag": f'"{hashlib.sha1(data).hexdigest()[:20]}"',
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "variants": {}
+    }
+
+    extension = os.path.splitext(relative_path)[1].lower()
+    if extension not in COMPRESSIBLE_EXTENSIONS or stat.st_size < MIN_COMPRESS_SIZE:
+        return entry
+
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if encoding == "br" and brotli is None:
+            continue
+        target = os.path.join(cache_dir, relative_path + suffix)
+        try:
+            fresh = os.stat(target).st_mtime_ns == stat.st_mtime_ns
+        except OSError:
+            fresh = False
+        if not fresh:
+            _compress_file(source, target, encoding, data)
+        # Variante conservée seulement si elle est réellement plus petite
+        if os.path.getsize(target) < stat.st_size:
+            entry["variants"][encoding] = target
+    return entry
+
+
+def precompress_directory(directory: str, cache_dir: str = DEFAULT_CACHE_DIR) -> Dict[str, Dict[str, Any]]:
+    """Manifeste {chemin relatif: ETag et variantes} de tout un dossier"""
+    manifest = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            relative_path = os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+            try:
+                manifest[relative_path] = precompress_file(directory, relative_path, cache_dir)
+            except OSError as e:
+                print(f"⚠️ Précompression impossible pour {relative_path}: {e}")
+    return manifest
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles avec variantes gzip/brotli, ETag de contenu et Cache-Control
+    """
+
+    def __init__(self, *args, cache_dir: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, os.path.basename(os.path.normpath(str(self.directory))))
+        self._lock = threading.Lock()
+        self.manifest = precompress_directory(str(self.directory), self.cache_dir)
+        compressed = sum(1 for entry in self.manifest.values() if entry["variants"])
+        print(f"[OK] Statiques {self.directory}: {len(self.manifest)} fichiers, {compressed} précompressés"
+              + ("" if brotli else " (gzip seul, brotli non installé)"))
+
+    def _entry(self, full_path: str) -> Optional[Dict[str, Any]]:
+        """Entrée du manifeste, recalculée si le fichier a changé depuis le démarrage"""
+        relative_path = os.path.relpath(full_path, str(self.directory)).replace(os.sep, "/")
+        if relative_path.startswith(".."):
+            return None
+        entry = self.manifest.get(relative_path)
+        try:
+            mtime_ns = os.stat(full_path).st_mtime_ns
+        except OSError:
+            return None
+        if entry is None or entry["mtime_ns"] != mtime_ns:
+            with self._lock:
+                entry = precompress_file(str(self.directory), relative_path, self.cache_dir)
+                self.manifest[relative_path] = entry
+        return entry
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+
+        entry = self._entry(str(response.path))
+        if entry is None:
+            return response
+
+        headers = {
+            "ETag": entry["etag"],
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if FINGERPRINT.search(str(response.path)) else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+
+        request_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        if_none_match = request_headers.get("if-none-match", "")
+        if entry["etag"] in [tag.strip().replace("W/", "") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        # Variante de plus fort poids q (brotli à égalité), jamais un codage à q=0
+        weights = accepted_encodings(request_headers.get("accept-encoding", ""))
+        candidates = [
+            encoding for encoding in ("br", "gzip")
+            if entry["variants"].get(encoding) and encoding_weight(weights, encoding) > 0
+        ]
+        if candidates:
+            encoding = max(candidates, key=lambda name: encoding_weight(weights, name))
+            return FileResponse(
+                entry["variants"][encoding],
+                media_type=response.media_type,
+                headers={**headers, "Content-Encoding": encoding}
+            )
+
+        for key, value in headers.items():
+            response.headers[key] = value
+        return response
+
+
+class ApiGZipMiddleware:
+    """GZip des réponses dynamiques (/api) au-delà de minimum_size octets"""
+
+    def __init__(self, app, minimum_size: int = 1000, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.prefix):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
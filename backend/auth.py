@@ -3,6 +3,12 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, NamedTuple, Optional
+import asyncio
+import threading
+import time
 import os
 
 # Security configuration
@@ -10,15 +16,39 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified token cache: entries live at most TOKEN_CACHE_TTL seconds, never past token expiry
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+# bcrypt runs on a dedicated pool so that logins never block the event loop;
+# the pool size caps how many hashes run at once
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def _run_bcrypt(operation: str, func, *args):
+    """Run a bcrypt call on the dedicated pool and record its latency"""
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, func, *args)
+    finally:
+        auth_metrics.record(operation, started)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_bcrypt("bcrypt_verify", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_bcrypt("bcrypt_hash", get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -30,19 +60,119 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return decode_token(credentials.credentials)["sub"]
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Decode and validate a raw JWT, returning its payload (401 if invalid)"""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return user_id
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
+        payload = None
+    if not payload or payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+    return payload
+
+
+class UserPrincipal(NamedTuple):
+    """Authenticated user, detached from any database session"""
+    id: int
+    username: str
+    email: str
+    subscription_type: Optional[str] = None
+    is_active: bool = True
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(user.id, user.username, user.email, user.subscription_type, bool(user.is_active))
+
+
+class TokenCache:
+    """LRU cache of verified token -> user principal"""
+
+    def __init__(self, ttl: int = TOKEN_CACHE_TTL, max_entries: int = TOKEN_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[UserPrincipal]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, principal: UserPrincipal, token_expiry: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if token_expiry is not None:
+            expires_at = min(expires_at, token_expiry)
+        with self._lock:
+            self._entries[token] = (expires_at, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+
+class AuthMetrics:
+    """Latency and request rate of auth operations over a sliding window"""
+
+    WINDOW_SECONDS = 60
+    MAX_SAMPLES = 1000
+
+    def __init__(self):
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.MAX_SAMPLES)).append((time.time(), elapsed_ms))
+            self._counts[operation] = self._counts.get(operation, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        operations = {}
+        with self._lock:
+            for operation, samples in self._samples.items():
+                recent = sorted(ms for ts, ms in samples if now - ts <= self.WINDOW_SECONDS)
+                count = len(recent)
+                operations[operation] = {
+                    "total": self._counts[operation],
+                    "window_count": count,
+                    "rate_per_second": round(count / self.WINDOW_SECONDS, 3),
+                    "avg_ms": round(sum(recent) / count, 2) if count else None,
+                    "p50_ms": round(recent[count // 2], 2) if count else None,
+                    "p95_ms": round(recent[min(count - 1, int(count * 0.95))], 2) if count else None,
+                    "max_ms": round(recent[-1], 2) if count else None
+                }
+        return {"window_seconds": self.WINDOW_SECONDS, "operations": operations}
+
+
+token_cache = TokenCache()
+auth_metrics = AuthMetrics()
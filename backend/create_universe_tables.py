@@ -8,6 +8,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy import create_engine, text
 from app.database.connection import DATABASE_URL
+from app.database import universe_tables
 import random
 from datetime import datetime, timedelta
 
@@ -24,6 +25,7 @@ def create_universe_table(engine, universe_name):
         denomination VARCHAR(100),
         forme VARCHAR(50),
         chip VARCHAR(20),
+        chip_number INTEGER,
         tome VARCHAR(20),
         granque_name VARCHAR(10),
         parite VARCHAR(10),
@@ -37,6 +39,7 @@ def create_universe_table(engine, universe_name):
     
     with engine.connect() as conn:
         conn.execute(text(create_table_sql))
+        universe_tables.ensure_indexes(conn, [universe_name])
         conn.commit()
         print(f"✅ Table {universe_name} créée")
         
@@ -86,6 +89,7 @@ def generate_test_data(conn, universe_name):
             'denomination': denomination,
             'forme': random.choice(formes),
             'chip': f'chip{chip_num}',
+            'chip_number': chip_num,
             'tome': random.choice(tomes),
             'granque_name': random.choice(granques),
             'parite': random.choice(parites),
@@ -104,12 +108,12 @@ def generate_test_data(conn, universe_name):
         
         values_list = []
         for record in batch:
-            values = f"({record['combination_id']}, '{record['denomination']}', '{record['forme']}', '{record['chip']}', '{record['tome']}', '{record['granque_name']}', '{record['parite']}', '{record['unidos']}', '{record['engine']}', '{record['beastie']}', '{record['date_tirage']}')"
+            values = f"({record['combination_id']}, '{record['denomination']}', '{record['forme']}', '{record['chip']}', {record['chip_number']}, '{record['tome']}', '{record['granque_name']}', '{record['parite']}', '{record['unidos']}', '{record['engine']}', '{record['beastie']}', '{record['date_tirage']}')"
             values_list.append(values)
         
         insert_sql = f"""
         INSERT INTO {universe_name} 
-        (combination_id, denomination, forme, chip, tome, granque_name, parite, unidos, engine, beastie, date_tirage)
+        (combination_id, denomination, forme, chip, chip_number, tome, granque_name, parite, unidos, engine, beastie, date_tirage)
         VALUES {', '.join(values_list)}
         """
         
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Export des modèles LSTM entraînés (.h5) au format NumPy (.npz)
+
+Les nouveaux entraînements exportent automatiquement ; ce script convertit
+les modèles existants. Nécessite requirements-ml.txt (TensorFlow).
+
+Usage :
+    python export_lstm_models.py
+    python export_lstm_models.py --universe fruity
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+from app.ml import registry
+from app.services.ml_service import MLService
+
+def export_models(universes):
+    """Exporte tous les modèles trouvés pour les univers donnés"""
+
+    print("=== EXPORT DES MODÈLES LSTM (.npz) ===")
+    LSTMPredictor = registry.get_backend("lstm")
+    exported, failed = 0, 0
+
+    for universe in universes:
+        for attribute in MLService.get_available_attributes():
+            predictor = LSTMPredictor(attribute, universe)
+            if not os.path.exists(predictor.model_path):
+                continue
+            try:
+                predictor.export_npz()
+                exported += 1
+            except Exception as e:
+                print(f"❌ {universe}/{attribute}: {e}")
+                failed += 1
+
+    print(f"✅ {exported} modèles exportés, {failed} échecs")
+    return failed == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export des modèles LSTM au format NumPy")
+    parser.add_argument("--universe", action="append", help="Univers à exporter (tous par défaut)")
+    args = parser.parse_args()
+
+    ok = export_models(args.universe or MLService.UNIVERSES)
+    sys.exit(0 if ok else 1)
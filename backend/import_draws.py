@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Import en masse de tirages historiques (CSV ou JSON-lines)
+
+Usage :
+    python import_draws.py historique.csv --lottery "Loto Bonheur"
+    python import_draws.py tirages.jsonl
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+from app.database.connection import SessionLocal
+from app.services.draw_ingestion_service import DrawIngestionService
+# Abonnés à DRAW_SAVED dont l'effet est persistant (alertes marquées obsolètes)
+from app.services import alert_store  # noqa: F401
+
+def import_draws(path, fmt=None, lottery_name=None, skip_existing=True):
+    """Importe un fichier de tirages et affiche le résumé"""
+
+    print(f"=== IMPORT DES TIRAGES: {path} ===")
+    db = SessionLocal()
+
+    try:
+        with open(path, encoding="utf-8-sig") as f:
+            content = f.read()
+
+        result = DrawIngestionService.ingest_content(
+            db, content, fmt=fmt, filename=path,
+            default_lottery_name=lottery_name, skip_existing=skip_existing
+        )
+
+        print(f"✅ {result['inserted']}/{result['total_records']} tirages importés "
+              f"({result['format']}, {result['elapsed_ms']} ms)")
+        if result["skipped_existing"]:
+            print(f"⏭️ {result['skipped_existing']} tirages déjà présents ignorés")
+        if result["rejected"]:
+            print(f"⚠️ {result['rejected']} lignes rejetées")
+            for error in result["errors"]:
+                print(f"   - ligne {error['line']}: {error['error']}")
+        for universe, count in sorted(result["universes_preview"].items()):
+            print(f"   {universe}: {count} paires")
+
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import en masse de tirages historiques")
+    parser.add_argument("path", help="Fichier CSV ou JSON-lines")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Format (déduit de l'extension par défaut)")
+    parser.add_argument("--lottery", help="Nom de loterie pour les lignes qui n'en ont pas")
+    parser.add_argument("--allow-duplicates", action="store_true", help="Ne pas ignorer les tirages déjà présents")
+    args = parser.parse_args()
+
+    ok = import_draws(args.path, args.format, args.lottery, not args.allow_duplicates)
+    sys.exit(0 if ok else 1)
@@ -1,9 +1,17 @@
+# Profil de démarrage : créé avant tout autre import
+from app.startup_profiler import StartupProfiler
+startup_profiler = StartupProfiler()
+
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer
+from fastapi.responses import PlainTextResponse
+from app.static_files import PrecompressedStaticFiles, ApiGZipMiddleware
+from app import metrics
+from app.services.prediction_cache import PredictionCache
 from sqlalchemy.orm import Session
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -11,7 +19,10 @@ from dotenv import load_dotenv
 try:
     from database import get_db, init_db
     from models import User, LotteryDraw, UserSession
-    from auth import verify_password, get_password_hash, create_access_token, verify_token
+    from auth import (
+        verify_password_async, get_password_hash_async, create_access_token, decode_token,
+        UserPrincipal, token_cache, auth_metrics, BCRYPT_WORKERS
+    )
     AUTH_AVAILABLE = True
 except ImportError as e:
     print(f"[WARNING] Modules d'authentification non disponibles: {e}")
@@ -39,6 +50,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression des réponses JSON volumineuses (/api uniquement : les
+# statiques sont servis déjà compressés)
+app.add_middleware(ApiGZipMiddleware, minimum_size=1000)
+
+# Métriques de performance (ajouté en dernier : englobe tous les middlewares)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.install_db_hooks()
+metrics.register_cache("prediction", PredictionCache.stats)
+
 # Routes de base d'abord
 @app.get("/")
 async def root():
@@ -55,7 +75,22 @@ async def health_check():
         "status": "healthy", 
         "message": "Backend EazzyLotto opérationnel",
         "auth_available": AUTH_AVAILABLE,
-        "version": "2.0.0"
+        "version": "2.0.0",
+        "startup": startup_profiler.report(),
+        "ml_backends": ml_registry.status()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Métriques du worker au format Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/metrics/slow-requests")
+async def get_slow_requests():
+    """Dernières requêtes lentes avec leurs requêtes SQL"""
+    return {
+        "threshold_ms": metrics.SLOW_REQUEST_MS,
+        "requests": metrics.slow_requests()
     }
 
 # Routes d'authentification (si disponibles)
@@ -80,13 +115,14 @@ if AUTH_AVAILABLE:
     
     @app.post("/api/auth/register", response_model=Token)
     async def register(user: UserCreate, db: Session = Depends(get_db)):
+        started = time.perf_counter()
         # Vérifier si l'utilisateur existe
         db_user = db.query(User).filter(User.username == user.username).first()
         if db_user:
             raise HTTPException(status_code=400, detail="Nom d'utilisateur déjà pris")
         
-        # Créer nouvel utilisateur
-        hashed_password = get_password_hash(user.password)
+        # Créer nouvel utilisateur (bcrypt hors de la boucle d'événements)
+        hashed_password = await get_password_hash_async(user.password)
         db_user = User(
             username=user.username,
             email=user.email,
@@ -98,6 +134,7 @@ if AUTH_AVAILABLE:
         
         # Créer token
         access_token = create_access_token(data={"sub": str(db_user.id)})
+        auth_metrics.record("register", started)
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -106,9 +143,11 @@ if AUTH_AVAILABLE:
     
     @app.post("/api/auth/login", response_model=Token)
     async def login(user: UserLogin, db: Session = Depends(get_db)):
+        started = time.perf_counter()
         # Vérifier utilisateur
         db_user = db.query(User).filter(User.username == user.username).first()
-        if not db_user or not verify_password(user.password, db_user.password_hash):
+        if not db_user or not await verify_password_async(user.password, db_user.password_hash):
+            auth_metrics.record("login_failed", started)
             raise HTTPException(status_code=401, detail="Nom d'utilisateur ou mot de passe incorrect")
         
         # Mettre à jour dernière connexion
@@ -117,6 +156,7 @@ if AUTH_AVAILABLE:
         
         # Créer token
         access_token = create_access_token(data={"sub": str(db_user.id)})
+        auth_metrics.record("login", started)
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -125,20 +165,39 @@ if AUTH_AVAILABLE:
     
     # Middleware d'authentification
     async def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)):
+        started = time.perf_counter()
+        # Extraire le token du header Authorization
+        token_str = token.credentials if hasattr(token, 'credentials') else token
+        
+        # Token déjà vérifié récemment : ni décodage ni requête
+        principal = token_cache.get(token_str)
+        if principal is not None:
+            auth_metrics.record("token_cached", started)
+            return principal
+        
         try:
-            # Extraire le token du header Authorization
-            if hasattr(token, 'credentials'):
-                token_str = token.credentials
-            else:
-                token_str = token
-            
-            user_id = verify_token(token_str)
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
-            return user
-        except Exception as e:
+            payload = decode_token(token_str)
+            user = db.query(User).filter(User.id == int(payload["sub"])).first()
+        except Exception:
             raise HTTPException(status_code=401, detail="Token invalide")
+        if not user or user.is_active is False:
+            raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+        
+        principal = UserPrincipal.from_user(user)
+        token_cache.put(token_str, principal, token_expiry=payload.get("exp"))
+        auth_metrics.record("token_verified", started)
+        return principal
+    
+    @app.get("/api/auth/metrics")
+    async def get_auth_metrics():
+        """Latences, débits et cache des tokens de l'authentification"""
+        return {
+            **auth_metrics.snapshot(),
+            "token_cache": token_cache.stats(),
+            "bcrypt_workers": BCRYPT_WORKERS
+        }
+    
+    metrics.register_cache("auth_token", token_cache.stats)
     
     print("[OK] Routes d'authentification configurées")
 else:
@@ -154,9 +213,12 @@ if AUTH_AVAILABLE:
 
 # Essayer d'importer et monter les routes avec gestion d'erreurs
 try:
-    from app.database.connection import engine, Base
-    # Créer les tables
-    Base.metadata.create_all(bind=engine)
+    with startup_profiler.step("base de données principale"):
+        from app.database.connection import engine, Base
+        from app.models import alert  # noqa: F401 - tables des alertes persistées
+        from app.services import alert_store  # noqa: F401 - abonnements aux événements
+        # Créer les tables
+        Base.metadata.create_all(bind=engine)
     print("[OK] Base de données principale initialisée")
 except Exception as e:
     print(f"[WARNING] Erreur base de données principale: {e}")
@@ -164,7 +226,8 @@ except Exception as e:
 # Importer les routers avec gestion d'erreurs
 routers_loaded = 0
 try:
-    from app.routes.session import router as session_router
+    with startup_profiler.step("session router"):
+        from app.routes.session import router as session_router
     app.include_router(session_router, prefix="/api/session", tags=["session"])
     print("[OK] Session router monté")
     routers_loaded += 1
@@ -172,7 +235,8 @@ except Exception as e:
     print(f"[ERROR] Session router: {e}")
 
 try:
-    from app.routes.analytics import router as analytics_router
+    with startup_profiler.step("analytics router"):
+        from app.routes.analytics import router as analytics_router
     app.include_router(analytics_router)
     print("[OK] Analytics router monté")
     routers_loaded += 1
@@ -180,7 +244,8 @@ except Exception as e:
     print(f"[ERROR] Analytics router: {e}")
 
 try:
-    from app.routes.lottery import router as lottery_router
+    with startup_profiler.step("lottery router"):
+        from app.routes.lottery import router as lottery_router
     app.include_router(lottery_router, prefix="/api/lottery", tags=["lottery"])
     print("[OK] Lottery router monté")
     routers_loaded += 1
@@ -188,7 +253,8 @@ except Exception as e:
     print(f"[ERROR] Lottery router: {e}")
 
 try:
-    from app.routes.analysis import router as analysis_router
+    with startup_profiler.step("analysis router"):
+        from app.routes.analysis import router as analysis_router
     app.include_router(analysis_router, prefix="/api/analysis", tags=["analysis"])
     print("[OK] Analysis router monté")
     routers_loaded += 1
@@ -196,7 +262,8 @@ except Exception as e:
     print(f"[ERROR] Analysis router: {e}")
 
 try:
-    from app.routes.katooling_workflow import router as katooling_workflow_router
+    with startup_profiler.step("katooling router"):
+        from app.routes.katooling_workflow import router as katooling_workflow_router
     app.include_router(katooling_workflow_router, prefix="/api/katooling", tags=["katooling"])
     print("[OK] Katooling router monté")
     routers_loaded += 1
@@ -205,10 +272,15 @@ except Exception as e:
 
 print(f"[INFO] {routers_loaded}/5 routers chargés avec succès")
 
+# Backends ML : chargés à la première utilisation, sauf ceux de ML_PRELOAD
+from app.ml import registry as ml_registry
+with startup_profiler.step("préchargement ML"):
+    ml_registry.preload_from_env()
+
 # Routes supplémentaires pour le dashboard React
 if AUTH_AVAILABLE:
     @app.get("/api/auth/me")
-    async def get_current_user_info(current_user: User = Depends(get_current_user)):
+    async def get_current_user_info(current_user: UserPrincipal = Depends(get_current_user)):
         return {
             "id": current_user.id,
             "username": current_user.username,
@@ -216,7 +288,7 @@ if AUTH_AVAILABLE:
         }
     
     @app.get("/api/sessions")
-    async def get_sessions(current_user: User = Depends(get_current_user)):
+    async def get_sessions(current_user: UserPrincipal = Depends(get_current_user)):
         # Retourner des données de test pour l'instant
         return [
             {
@@ -236,7 +308,7 @@ if AUTH_AVAILABLE:
         ]
     
     @app.get("/api/analytics")
-    async def get_analytics(current_user: User = Depends(get_current_user)):
+    async def get_analytics(current_user: UserPrincipal = Depends(get_current_user)):
         return {
             "stats": {
                 "totalSessions": 45,
@@ -261,7 +333,7 @@ if AUTH_AVAILABLE:
         }
     
     @app.get("/api/ml/predictions")
-    async def get_ml_predictions(current_user: User = Depends(get_current_user)):
+    async def get_ml_predictions(current_user: UserPrincipal = Depends(get_current_user)):
         return {
             "predictions": [
                 {
@@ -285,7 +357,7 @@ if AUTH_AVAILABLE:
         }
     
     @app.post("/api/ml/generate")
-    async def generate_ml_prediction(current_user: User = Depends(get_current_user)):
+    async def generate_ml_prediction(current_user: UserPrincipal = Depends(get_current_user)):
         import random
         return {
             "id": random.randint(100, 999),
@@ -314,9 +386,13 @@ current_dir = Path(__file__).parent
 frontend_dir = current_dir.parent / "frontend"
 assets_dir = frontend_dir / "assets"
 
-# Servir les fichiers statiques du frontend (APRÈS les routes API)
-app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
-app.mount("/", StaticFiles(directory=str(frontend_dir), html=True), name="frontend")
+# Servir les fichiers statiques du frontend (APRÈS les routes API),
+# précompressés en gzip/brotli avec ETag et Cache-Control
+with startup_profiler.step("précompression statiques"):
+    app.mount("/assets", PrecompressedStaticFiles(directory=str(assets_dir)), name="assets")
+    app.mount("/", PrecompressedStaticFiles(directory=str(frontend_dir), html=True), name="frontend")
+
+startup_profiler.finish()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration des sessions : compteurs completed_draws / no_draw_count sur
+work_sessions, puis recalcul de tous les compteurs depuis session_draws
+
+Peut être relancé à tout moment comme job de réparation.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+from app.database.connection import engine, SessionLocal
+from app.services.session_service import SessionService
+
+COUNTER_COLUMNS = [
+    ("completed_draws", "INTEGER DEFAULT 0"),
+    ("no_draw_count", "INTEGER DEFAULT 0")
+]
+
+def migrate_session_counters():
+    """Ajoute les colonnes de compteurs manquantes et les recalcule"""
+
+    try:
+        print("=== MIGRATION DES COMPTEURS DE SESSION ===")
+
+        with engine.begin() as connection:
+            existing = {column["name"] for column in inspect(connection).get_columns("work_sessions")}
+            for column_name, column_def in COUNTER_COLUMNS:
+                if column_name in existing:
+                    print(f"ℹ️ Colonne {column_name} existe déjà")
+                    continue
+                connection.execute(text(f"ALTER TABLE work_sessions ADD COLUMN {column_name} {column_def}"))
+                print(f"✅ Colonne {column_name} ajoutée")
+
+        db = SessionLocal()
+        try:
+            updated = SessionService.recompute_counters(db)
+        finally:
+            db.close()
+
+        print(f"✅ Compteurs recalculés pour {updated} sessions")
+
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+if __name__ == "__main__":
+    ok = migrate_session_counters()
+    sys.exit(0 if ok else 1)
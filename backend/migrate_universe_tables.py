@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration des tables d'univers : colonne chip_number et index composites
+pour l'analyse temporelle
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect
+from app.database.connection import engine
+from app.database import universe_tables
+
+def migrate_universe_tables():
+    """Remplit chip_number et crée les index (date_tirage, chip_number, marquage)"""
+
+    try:
+        print("=== MIGRATION DES TABLES D'UNIVERS ===")
+
+        with engine.begin() as connection:
+            if 'combinations' in inspect(connection).get_table_names():
+                filled = universe_tables.ensure_chip_number_column(
+                    connection, 'combinations', source_columns=('chip_id', 'chip')
+                )
+                print(f"✅ combinations: chip_number renseigné sur {filled} lignes")
+
+            created = universe_tables.ensure_indexes(connection)
+
+        for table, indexes in created.items():
+            print(f"✅ {table}: {len(indexes)} index vérifiés")
+            for index_name in indexes:
+                print(f"   - {index_name}")
+
+        missing = [u for u in universe_tables.UNIVERSE_TABLES if u not in created]
+        if missing:
+            print(f"⚠️ Tables absentes (ignorées): {missing}")
+
+        print("✅ Migration terminée")
+
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+if __name__ == "__main__":
+    migrate_universe_tables()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Précompression des fichiers statiques du frontend (gzip, brotli si installé)
+
+Le serveur précompresse au démarrage les fichiers absents ou modifiés ; ce
+script le fait au build pour que les workers démarrent avec un cache prêt.
+
+Usage :
+    python precompress_static.py
+    python precompress_static.py --directory ../frontend --cache-dir .static_cache
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+from app.static_files import precompress_directory, DEFAULT_CACHE_DIR, brotli
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend")
+
+def precompress(directory, cache_dir):
+    """Précompresse un dossier et affiche le gain"""
+
+    print("=== PRÉCOMPRESSION DES STATIQUES ===")
+    # Même sous-dossier de cache que PrecompressedStaticFiles
+    cache_dir = os.path.join(cache_dir, os.path.basename(os.path.normpath(directory)))
+    manifest = precompress_directory(directory, cache_dir)
+
+    original, compressed = 0, 0
+    for entry in manifest.values():
+        if "gzip" in entry["variants"]:
+            original += entry["size"]
+            compressed += os.path.getsize(entry["variants"].get("br", entry["variants"]["gzip"]))
+
+    count = sum(1 for entry in manifest.values() if entry["variants"])
+    print(f"✅ {count}/{len(manifest)} fichiers précompressés ({'brotli + gzip' if brotli else 'gzip'})")
+    if original:
+        print(f"   {original / 1024:.0f} Ko -> {compressed / 1024:.0f} Ko ({100 * compressed / original:.0f}%)")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Précompression des fichiers statiques du frontend")
+    parser.add_argument("--directory", default=FRONTEND_DIR, help="Dossier à précompresser")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Dossier des variantes compressées")
+    args = parser.parse_args()
+
+    ok = precompress(args.directory, args.cache_dir)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le moteur d'alertes persistées
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+from datetime import datetime
+from app.database.connection import get_db, Base, engine, SessionLocal
+from app.models.alert import Alert, AlertEvaluation
+from app.services.alert_service import AlertService
+from app.services.alert_store import AlertStore
+from app.services.analysis_snapshot_service import AnalysisSnapshotService
+from app.services.ml_service import MLService
+from app.services import events
+
+def _fixed_sources(alerts_by_source):
+    """Générateur de sources renvoyant des alertes fixes (ou levant l'exception donnée)"""
+    def generator(source):
+        def generate(db, universe, session_id):
+            result = alerts_by_source.get(source, [])
+            if isinstance(result, Exception):
+                raise result
+            return [dict(alert) for alert in result]
+        return generate
+    return generator
+
+FIXED_ALERTS = {
+    "delay": [{"type": "CRITICAL_DELAY", "attribute_type": "forme", "attribute_value": "carre",
+               "priority": 80, "urgency": "high", "actionable": True}],
+    "pattern": [{"type": "PATTERN_ANOMALY", "pattern_type": "cycle", "priority": 60, "urgency": "medium"}],
+}
+
+def test_alert_engine():
+    """Test de l'évaluation événementielle et des identifiants stables"""
+
+    Base.metadata.create_all(bind=engine, tables=[Alert.__table__, AlertEvaluation.__table__])
+    db = next(get_db())
+
+    print("=== TEST MOTEUR D'ALERTES ===")
+
+    # Première lecture : évaluation forcée
+    first = AlertService.generate_all_alerts(db, "mundo", force=True)
+    print(f"🚨 {first['total_alerts']} alertes (évaluées: {first['evaluated']})")
+    assert first["evaluated"]
+
+    # Seconde lecture : servie depuis le stockage, sans réévaluation
+    second = AlertService.generate_all_alerts(db, "mundo")
+    print(f"📦 {second['total_alerts']} alertes (évaluées: {second['evaluated']})")
+    assert not second["evaluated"]
+
+    ids_first = {a["id"] for a in first["alerts"]}
+    ids_second = {a["id"] for a in second["alerts"]}
+    assert ids_first == ids_second
+    print("Identifiants stables: ✅")
+
+    # Un tirage enregistré rend les alertes obsolètes
+    events.publish(events.DRAW_SAVED, db=db)
+    third = AlertService.generate_all_alerts(db, "mundo")
+    print(f"🔄 Après tirage: réévaluées = {third['evaluated']}")
+    assert third["evaluated"]
+
+    # Lecture par identifiant et filtres
+    for alert_id in list(ids_first)[:3]:
+        alert = AlertService.get_alert_by_id(db, alert_id)
+        if alert:
+            print(f"  {alert_id}: {alert['type']} (vue depuis {alert['first_seen']})")
+
+    urgent = AlertService.filter_alerts(db, "mundo", urgency="high")
+    print(f"Alertes urgence haute: {urgent['total_alerts']}")
+
+    db.close()
+    print("\n✅ Test terminé avec succès!")
+    return True
+
+def test_alert_ttl_refresh():
+    """Sans événement, une évaluation plus ancienne que ALERT_TTL est refaite"""
+
+    Base.metadata.create_all(bind=engine, tables=[Alert.__table__, AlertEvaluation.__table__])
+    db = next(get_db())
+    universe = "test_ttl"
+    source_generator = AlertService._source_generator
+    AlertService._source_generator = staticmethod(_fixed_sources(FIXED_ALERTS))
+
+    print("=== TEST EXPIRATION DES ALERTES ===")
+    try:
+        fresh = AlertService.generate_all_alerts(db, universe, force=True)
+        assert fresh["total_alerts"] == 2
+
+        # Le temps passe au-delà de ALERT_TTL sans tirage ni réentraînement
+        past = datetime.now() - AlertStore.ALERT_TTL - AlertStore.ALERT_TTL / 24
+        db.query(AlertEvaluation).filter(AlertEvaluation.universe_key == universe).update(
+            {AlertEvaluation.evaluated_at: past}, synchronize_session=False
+        )
+        db.query(Alert).filter(Alert.universe_key == universe).update(
+            {Alert.expires_at: past + AlertStore.ALERT_TTL}, synchronize_session=False
+        )
+        db.commit()
+
+        later = AlertService.generate_all_alerts(db, universe)
+        print(f"⏳ Après ALERT_TTL: réévaluées = {later['evaluated']}, {later['total_alerts']} alertes")
+        assert later["evaluated"]
+        assert {a["id"] for a in later["alerts"]} == {a["id"] for a in fresh["alerts"]}
+
+        filtered = AlertService.filter_alerts(db, universe, urgency="high")
+        assert filtered["total_alerts"] == 1
+
+        # L'évaluation renouvelée est de nouveau servie depuis le stockage
+        assert not AlertService.generate_all_alerts(db, universe)["evaluated"]
+        print("  Alertes renouvelées sans événement: ✅")
+    finally:
+        AlertService._source_generator = source_generator
+        db.close()
+
+    return True
+
+def test_failed_source_keeps_alerts():
+    """Une source en erreur garde ses alertes stockées, signalées stale"""
+
+    Base.metadata.create_all(bind=engine, tables=[Alert.__table__, AlertEvaluation.__table__])
+    db = next(get_db())
+    universe = "test_failed_source"
+    source_generator = AlertService._source_generator
+
+    print("=== TEST SOURCE EN ERREUR ===")
+    try:
+        AlertService._source_generator = staticmethod(_fixed_sources(FIXED_ALERTS))
+        before = AlertService.generate_all_alerts(db, universe, force=True)
+        assert before["total_alerts"] == 2 and not before["stale_sources"]
+
+        # Erreur transitoire de la source pattern
+        AlertService._source_generator = staticmethod(_fixed_sources({
+            **FIXED_ALERTS, "pattern": RuntimeError("base indisponible")
+        }))
+        after = AlertService.generate_all_alerts(db, universe, force=True)
+        print(f"❌ Source pattern en erreur: {after['total_alerts']} alertes, stale = {after['stale_sources']}")
+        assert after["total_alerts"] == 2
+        assert after["stale_sources"] == ["pattern"]
+        assert [a["stale"] for a in after["alerts"] if a["source"] == "pattern"] == [True]
+        assert all(not a["stale"] for a in after["alerts"] if a["source"] != "pattern")
+        print("  Alertes de la source conservées: ✅")
+
+        # La source rétablie ne déclenche plus rien : ses alertes sont résolues
+        AlertService._source_generator = staticmethod(_fixed_sources({"delay": FIXED_ALERTS["delay"]}))
+        recovered = AlertService.generate_all_alerts(db, universe, force=True)
+        assert recovered["total_alerts"] == 1 and not recovered["stale_sources"]
+        print("  Source rétablie: alertes résolues: ✅")
+    finally:
+        AlertService._source_generator = source_generator
+        db.close()
+
+    return True
+
+def test_failed_generator_keeps_alerts():
+    """Une erreur dans la dépendance d'un vrai générateur atteint la branche d'erreur"""
+
+    Base.metadata.create_all(bind=engine, tables=[Alert.__table__, AlertEvaluation.__table__])
+    db = next(get_db())
+    universe = "test_failed_generator"
+    predict_all_lstm = MLService.predict_all_lstm
+
+    def confident_predictions(db, universe="mundo"):
+        return {"top_predictions": [
+            {"attribute_type": "forme", "predicted_value": "carre", "confidence_percent": 92}
+        ]}
+
+    def broken_predictions(db, universe="mundo"):
+        raise RuntimeError("modèle illisible")
+
+    print("=== TEST GÉNÉRATEUR EN ERREUR ===")
+    try:
+        MLService.predict_all_lstm = staticmethod(confident_predictions)
+        before = AlertService.generate_all_alerts(db, universe, force=True)
+        lstm_ids = {a["id"] for a in before["alerts"] if a["source"] == "lstm"}
+        assert len(lstm_ids) == 1
+
+        MLService.predict_all_lstm = staticmethod(broken_predictions)
+        AnalysisSnapshotService.invalidate(universe)
+        after = AlertService.generate_all_alerts(db, universe, force=True)
+        print(f"❌ Prédictions LSTM en erreur: stale = {after['stale_sources']}")
+        assert "lstm" in after["stale_sources"]
+        assert AlertService.get_source_metrics()["sources"]["lstm"]["errors"] >= 1
+        kept = [a for a in after["alerts"] if a["source"] == "lstm"]
+        assert {a["id"] for a in kept} == lstm_ids and all(a["stale"] for a in kept)
+        print("  Alertes LSTM stockées toujours actives: ✅")
+    finally:
+        MLService.predict_all_lstm = staticmethod(predict_all_lstm)
+        AnalysisSnapshotService.invalidate(universe)
+        db.close()
+
+    return True
+
+def test_concurrent_store_evaluation():
+    """Évaluation principale et résultat tardif écrivent la même alerte sans conflit"""
+
+    Base.metadata.create_all(bind=engine, tables=[Alert.__table__, AlertEvaluation.__table__])
+    universe = "test_concurrent_store"
+    alert = {**FIXED_ALERTS["delay"][0], "source": "delay"}
+    errors = []
+
+    def store(version):
+        db = SessionLocal()
+        try:
+            AlertStore.store_evaluation(db, universe, [alert], version, sources=["delay"])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    print("=== TEST ÉCRITURES CONCURRENTES ===")
+    for _ in range(5):
+        db = SessionLocal()
+        db.query(Alert).filter(Alert.universe_key == universe).delete()
+        db.commit()
+        db.close()
+        threads = [threading.Thread(target=store, args=(version,)) for version in (1, None, None)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+
+    db = SessionLocal()
+    try:
+        assert db.query(Alert).filter(Alert.universe_key == universe, Alert.is_active == True).count() == 1
+    finally:
+        db.close()
+    print("  Une seule alerte, aucune erreur d'intégrité: ✅")
+    return True
+
+if __name__ == "__main__":
+    test_alert_engine()
+    test_alert_ttl_refresh()
+    test_failed_source_keeps_alerts()
+    test_failed_generator_keeps_alerts()
+    test_concurrent_store_evaluation()
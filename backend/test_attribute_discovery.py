@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le registre des attributs
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.connection import get_db
+from app.services.attribute_discovery_service import AttributeDiscoveryService
+
+def test_registry_values():
+    """Valeurs du registre : bornées, complètes et triées par la base"""
+
+    print("=== TEST REGISTRE DES ATTRIBUTS ===")
+    db = next(get_db())
+
+    try:
+        AttributeDiscoveryService.bump_data_version()
+        registry = AttributeDiscoveryService.get_registry(db, "mundo")
+        limit = AttributeDiscoveryService.VALUES_LIMIT
+
+        for attribute, metadata in registry["metadata"].items():
+            values = metadata["values"]
+            # Une valeur contenant une virgule reste une seule valeur
+            assert len(values) == min(metadata["unique_values"], limit), attribute
+            assert len(set(values)) == len(values), attribute
+            # Ordre de la base : numérique pour les colonnes entières
+            if all(isinstance(value, (int, float)) for value in values):
+                assert values == sorted(values), attribute
+            print(f"  {attribute}: {metadata['unique_values']} valeurs, {len(values)} conservées")
+
+            if metadata["unique_values"] > limit:
+                more = AttributeDiscoveryService.get_attribute_values(db, attribute, "mundo", limit * 2)
+                assert len(more) == min(metadata["unique_values"], limit * 2)
+                assert more[:limit] == values
+
+        print("  Valeurs bornées et triées: ✅")
+
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_registry_values()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le cache des tokens et les métriques d'authentification
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import time
+from datetime import timedelta
+from auth import TokenCache, AuthMetrics, UserPrincipal, create_access_token, token_cache
+
+def _principal(user_id: int) -> UserPrincipal:
+    return UserPrincipal(user_id, f"user{user_id}", f"user{user_id}@example.com")
+
+def test_token_cache():
+    """TTL borné par l'expiration du token, éviction LRU, hits et misses"""
+
+    print("=== TEST CACHE DES TOKENS ===")
+    cache = TokenCache(ttl=60, max_entries=2)
+
+    assert cache.get("a") is None
+    cache.put("a", _principal(1))
+    assert cache.get("a") == _principal(1)
+    print("  Miss puis hit: ✅")
+
+    # Le token expire avant le TTL du cache : l'entrée expire avec lui
+    cache.put("expiring", _principal(2), token_expiry=time.time() + 0.05)
+    assert cache.get("expiring") == _principal(2)
+    time.sleep(0.1)
+    assert cache.get("expiring") is None
+    print("  TTL borné par l'expiration du token: ✅")
+
+    # LRU : "a" relu récemment, "b" est évincé par "c"
+    cache.put("b", _principal(3))
+    assert cache.get("a") is not None
+    cache.put("c", _principal(4))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    print("  Éviction LRU: ✅")
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert (stats["hits"], stats["misses"]) == (5, 3)
+    assert stats["hit_rate"] == 0.625
+    print(f"  Statistiques: {stats} ✅")
+
+    return True
+
+def test_auth_metrics():
+    """Latences et débits sur la fenêtre glissante"""
+
+    print("\n=== TEST MÉTRIQUES D'AUTHENTIFICATION ===")
+    metrics = AuthMetrics()
+    now = time.perf_counter()
+    for elapsed_ms in (10, 20, 30, 40):
+        metrics.record("login", now - elapsed_ms / 1000)
+
+    # Échantillon hors fenêtre : compté dans le total, pas dans les latences
+    metrics.record("login", now - 5)
+    samples = metrics._samples["login"]
+    samples[-1] = (time.time() - metrics.WINDOW_SECONDS - 1, samples[-1][1])
+
+    login = metrics.snapshot()["operations"]["login"]
+    assert login["total"] == 5
+    assert login["window_count"] == 4
+    assert 10 <= login["p50_ms"] < 40 and 40 <= login["max_ms"] < 1000
+    assert 25 <= login["avg_ms"] < 100
+    print(f"  {login} ✅")
+
+    return True
+
+def test_get_current_user_cache():
+    """Un token en cache est résolu sans requête User"""
+
+    print("\n=== TEST get_current_user ===")
+    import main
+    from database import SessionLocal, engine
+    from models import User
+
+    if not main.AUTH_AVAILABLE:
+        print("⚠️ Authentification indisponible")
+        return True
+
+    User.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    user = User(username="cache_test", email="cache_test@example.com", password_hash="x", is_active=True)
+    db.add(user)
+    db.commit()
+
+    class NoQuerySession:
+        """Session qui échoue à la moindre requête"""
+        def query(self, *args, **kwargs):
+            raise AssertionError("requête User sur un token en cache")
+
+    try:
+        token = create_access_token({"sub": str(user.id)}, timedelta(minutes=5))
+        token_cache._entries.pop(token, None)
+
+        principal = asyncio.run(main.get_current_user(token, db))
+        assert principal.id == user.id and principal.username == "cache_test"
+
+        cached = asyncio.run(main.get_current_user(token, NoQuerySession()))
+        assert cached == principal
+        print("  Second appel servi par le cache, sans requête: ✅")
+    finally:
+        db.delete(user)
+        db.commit()
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_token_cache()
+    test_auth_metrics()
+    test_get_current_user_cache()
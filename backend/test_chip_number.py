@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le chip normalisé des combinaisons sans chip_number
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.database.connection import get_db, Base, engine
+from app.models.combination import Combination
+from app.services.katula_table_service import KatulaTableService, CHIP_NUMBER
+
+UNIVERSE = "test_chip_number"
+
+def test_null_chip_number():
+    """Une ligne sans chip_number est placée sur son chip réel, pas sur le chip 1"""
+
+    Base.metadata.create_all(bind=engine, tables=[Combination.__table__])
+    db = next(get_db())
+
+    print("=== TEST CHIP_NUMBER NON RENSEIGNÉ ===")
+    try:
+        # Lignes non migrées : insertion directe, sans l'événement ORM
+        db.execute(Combination.__table__.insert(), [
+            {"combination_id": 990001, "univers": UNIVERSE, "num1": 1, "num2": 2, "chip": None, "chip_id": 50, "chip_number": None},
+            {"combination_id": 990002, "univers": UNIVERSE, "num1": 3, "num2": 4, "chip": "chip7", "chip_id": None, "chip_number": None},
+        ])
+        # Insertion ORM : chip_number renseigné depuis chip_id
+        db.add(Combination(combination_id=990003, univers=UNIVERSE, num1=5, num2=6, chip_id=12))
+        db.commit()
+
+        inserted = db.query(Combination).filter(Combination.combination_id == 990003).one()
+        assert inserted.chip_number == 12
+        print("  Insertion ORM: chip_number renseigné: ✅")
+
+        mapped = KatulaTableService.map_combination_to_katula(db, 990001, UNIVERSE)
+        assert mapped["chip_mapping"]["chip_number"] == 2, mapped
+        mapped = KatulaTableService.map_combination_to_katula(db, 990002, UNIVERSE)
+        assert mapped["chip_mapping"]["chip_number"] == 7, mapped
+        print("  Mapping Katula depuis chip_id puis chip: ✅")
+
+        # Filtre du service Katula enrichi
+        matching = db.execute(
+            text(f"SELECT combination_id FROM combinations WHERE univers = :universe AND {CHIP_NUMBER} = :chip_number"),
+            {"universe": UNIVERSE, "chip_number": 2}
+        ).scalars().all()
+        assert matching == [990001]
+        print("  Filtre par chip normalisé: ✅")
+    finally:
+        db.rollback()
+        db.query(Combination).filter(Combination.univers == UNIVERSE).delete()
+        db.commit()
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_null_chip_number()
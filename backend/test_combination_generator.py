@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Script de test pour la sélection diversifiée des combinaisons (MMR)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import tracemalloc
+import numpy as np
+from app.database.connection import get_db
+from app.services.combination_search_service import CombinationSearchService
+from app.services.combination_generator_service import CombinationGeneratorService
+
+def test_similarity_matrix():
+    """La similarité one-hot doit égaler la part d'attributs communs"""
+
+    print("=== TEST MATRICE DE SIMILARITÉ ===")
+    rng = np.random.default_rng(7)
+    codes = rng.integers(0, 4, size=(60, 7)).astype(np.int32)
+    codes[::5, 3] = -1  # Valeurs absentes
+
+    similarity = CombinationSearchService.similarity_matrix(codes)
+    expected = ((codes[:, None, :] == codes[None, :, :]) & (codes[:, None, :] >= 0)).sum(axis=2) / 7
+
+    same = np.allclose(similarity, expected, atol=1e-6)
+    print(f"  X·Xᵀ / a == comptage direct: {'✅' if same else '❌'}")
+    assert same
+
+def test_select_diverse_constraints():
+    """Les contraintes de distance et de répétition doivent être respectées"""
+
+    print("\n=== TEST CONTRAINTES DE DIVERSITÉ ===")
+    rng = np.random.default_rng(42)
+    codes = rng.integers(0, 8, size=(1000, 7)).astype(np.int32)
+    relevance = rng.random(1000)
+
+    start = time.perf_counter()
+    selected, relaxed = CombinationSearchService.select_diverse(
+        relevance, codes, 20, min_distance=0.7, max_consecutive=2
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {len(selected)} sélectionnées parmi 1000 en {elapsed:.1f} ms (relâchées: {relaxed})")
+
+    assert len(selected) == 20 and len(set(selected.tolist())) == 20
+    assert not relaxed
+
+    distances = CombinationSearchService.mean_pairwise_distance(codes[selected])
+    print(f"  Distance moyenne: {distances['mean']:.3f} - minimale: {distances['min']:.3f}")
+    assert distances["min"] >= 0.7 - 1e-6
+
+    chosen = codes[selected]
+    for j in range(chosen.shape[1]):
+        run = 1
+        for i in range(1, len(chosen)):
+            run = run + 1 if chosen[i, j] == chosen[i - 1, j] else 1
+            assert run <= 2
+    print("  Répétitions consécutives <= 2: ✅")
+
+    # Le premier retenu est toujours le plus pertinent
+    assert selected[0] == int(np.argmax(relevance))
+
+def test_select_diverse_large_pool():
+    """Grand vivier : mémoire linéaire en m, pas de matrice (m, m)"""
+
+    print("\n=== TEST GRAND VIVIER ===")
+    rng = np.random.default_rng(3)
+    m = 20000
+    codes = rng.integers(0, 8, size=(m, 7)).astype(np.int32)
+    relevance = rng.random(m)
+
+    tracemalloc.start()
+    try:
+        selected, _ = CombinationSearchService.select_diverse(relevance, codes, 100, min_distance=0.5)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # Une matrice (m, m) float32 occuperait 1,6 Go
+    print(f"  {len(selected)} sélectionnées parmi {m}, pic mémoire {peak / 1e6:.1f} Mo")
+    assert len(selected) == 100
+    assert peak < 50e6
+    assert CombinationSearchService.mean_pairwise_distance(codes[selected])["min"] >= 0.5 - 1e-6
+
+def test_generation():
+    """Test de la génération sur la base"""
+
+    print("\n=== TEST GÉNÉRATION ===")
+    db = next(get_db())
+
+    try:
+        for strategy in CombinationGeneratorService.GENERATION_STRATEGIES:
+            start = time.perf_counter()
+            result = CombinationGeneratorService.generate_combinations(db, "mundo", strategy, 10)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            stats = result.get("statistics", {})
+            print(f"  {strategy}: {stats.get('total_generated', 0)} combinaisons en {elapsed:.0f} ms, "
+                  f"diversité {stats.get('diversity_index', 0)}")
+
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_similarity_matrix()
+    test_select_diverse_constraints()
+    test_select_diverse_large_pool()
+    test_generation()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Script de test pour l'import en masse des tirages
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.connection import get_db, Base, engine
+from app.models.draw import Draw, DrawAnalysis
+from app.models.combination import Combination
+from app.services.draw_ingestion_service import DrawIngestionService
+
+HEADER = "lottery_name,draw_date,winning_numbers\n"
+FIRST_DRAW = "test_ingestion,01/01/2020,1 2 3 4 5\n"
+CSV_CONTENT = HEADER + FIRST_DRAW + """test_ingestion,01/01/2020,6 7 8 9 10
+test_ingestion,02/01/2020,11 12 13 14 15
+"""
+
+def test_duplicate_dates_keep_their_ids():
+    """Sans skip_existing, chaque tirage reçoit sa propre analyse"""
+
+    Base.metadata.create_all(bind=engine, tables=[Draw.__table__, DrawAnalysis.__table__, Combination.__table__])
+    db = next(get_db())
+
+    print("=== TEST IMPORT DE TIRAGES ===")
+    try:
+        # Un tirage déjà en base à la même date ne doit pas recevoir d'analyse
+        existing = DrawIngestionService.ingest_content(db, HEADER + FIRST_DRAW, "csv")
+        assert existing["inserted"] == 1
+        before = {draw_id for (draw_id,) in db.query(Draw.id).filter(Draw.lottery_name == "test_ingestion")}
+
+        result = DrawIngestionService.ingest_content(db, CSV_CONTENT, "csv", skip_existing=False)
+        print(f"📥 {result['inserted']} tirages insérés, {result['skipped_existing']} ignorés")
+        assert result["inserted"] == 3 and result["skipped_existing"] == 0
+
+        draws = db.query(Draw).filter(Draw.lottery_name == "test_ingestion", ~Draw.id.in_(before)).order_by(Draw.id).all()
+        assert [draw.winning_numbers for draw in draws] == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10], [11, 12, 13, 14, 15]]
+
+        analysed = [draw_id for (draw_id,) in db.query(DrawAnalysis.draw_id).filter(
+            DrawAnalysis.draw_id.in_([draw.id for draw in draws])
+        ).order_by(DrawAnalysis.draw_id)]
+        print(f"  Tirages {[draw.id for draw in draws]} -> analyses {analysed}")
+        assert analysed == [draw.id for draw in draws]
+        assert db.query(DrawAnalysis).filter(DrawAnalysis.draw_id.in_(before)).count() == 1
+        print("  Une analyse par tirage inséré: ✅")
+
+        # Avec skip_existing, les dates déjà importées sont ignorées
+        again = DrawIngestionService.ingest_content(db, CSV_CONTENT, "csv")
+        assert again["inserted"] == 0 and again["skipped_existing"] == 3
+        print("  Tirages existants ignorés: ✅")
+    finally:
+        ids = [draw_id for (draw_id,) in db.query(Draw.id).filter(Draw.lottery_name == "test_ingestion")]
+        db.query(DrawAnalysis).filter(DrawAnalysis.draw_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Draw).filter(Draw.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_duplicate_dates_keep_their_ids()
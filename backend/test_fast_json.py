@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Script de test pour les réponses JSON rapides (orjson et repli json)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from decimal import Decimal
+import numpy as np
+from app.routes import responses
+from app.routes.responses import FastJSONResponse
+
+PAYLOAD = {
+    "score": float("nan"),
+    "ratio": float("inf"),
+    "nested": {"values": [1.5, float("-inf"), (2, float("nan"))]},
+    "array": np.array([0.25, np.nan]),
+    "scalar": np.float32("nan"),
+    "decimal": Decimal("2.5"),
+}
+
+EXPECTED = {
+    "score": None,
+    "ratio": None,
+    "nested": {"values": [1.5, None, [2, None]]},
+    "array": [0.25, None],
+    "scalar": None,
+    "decimal": 2.5,
+}
+
+def test_non_finite_floats():
+    """Les deux sérialisations écrivent null pour NaN et ±Infinity"""
+
+    print("=== TEST VALEURS NON FINIES ===")
+    orjson = responses.orjson
+    try:
+        responses.orjson = None
+        fallback = FastJSONResponse(PAYLOAD).body
+        print(f"  Repli json: {fallback.decode()}")
+        assert json.loads(fallback) == EXPECTED
+        assert b"NaN" not in fallback and b"Infinity" not in fallback
+    finally:
+        responses.orjson = orjson
+
+    if orjson is not None:
+        fast = FastJSONResponse(PAYLOAD).body
+        print(f"  orjson:     {fast.decode()}")
+        assert json.loads(fast) == EXPECTED
+    print("  Sorties identiques: ✅")
+
+    return True
+
+if __name__ == "__main__":
+    test_non_finite_floats()
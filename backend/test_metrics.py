@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Script de test pour les métriques de performance (/metrics)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app import metrics
+
+def test_metrics():
+    """Latence par route, requêtes SQL par requête, caches et journal des lentes"""
+
+    print("=== TEST MÉTRIQUES DE PERFORMANCE ===")
+    metrics.install_db_hooks()
+    engine = create_engine("sqlite://")
+
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware, slow_request_ms=0)
+
+    @app.get("/api/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT :id"), {"id": item_id})
+        with metrics.timer("model_inference_seconds", model="test", attribute="forme"):
+            pass
+        return {"item_id": item_id}
+
+    metrics.register_cache("test", lambda: {"hits": 3, "misses": 1, "size": 2, "hit_rate": 0.75})
+    client = TestClient(app)
+
+    for item_id in (1, 2):
+        assert client.get(f"/api/items/{item_id}").status_code == 200
+    assert client.get("/api/unknown").status_code == 404
+
+    output = metrics.render()
+    route = 'method="GET",route="/api/items/{item_id}",status="200"'
+    assert f"eazzylotto_http_request_duration_seconds_count{{{route}}} 2" in output
+    assert 'eazzylotto_http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"} 1' in output
+    print("  Latence par modèle de route: ✅")
+
+    assert 'eazzylotto_http_request_db_queries_sum{route="/api/items/{item_id}"} 6' in output
+    assert 'eazzylotto_db_query_duration_seconds_count{statement="SELECT"}' in output
+    print("  Requêtes SQL comptées par requête HTTP: ✅")
+
+    assert 'eazzylotto_cache_hit_ratio{cache="test"} 0.75' in output
+    assert 'eazzylotto_model_inference_seconds_count{attribute="forme",model="test"} 2' in output
+    print("  Caches et inférence exposés: ✅")
+
+    slow = metrics.slow_requests()
+    assert slow[0]["route"] == "<unmatched>"
+    assert slow[1]["db_queries"] == 3 and slow[1]["queries"][0]["sql"] == "SELECT ?"
+    print(f"  Journal des requêtes lentes ({len(slow)} entrées): ✅")
+
+    return True
+
+if __name__ == "__main__":
+    test_metrics()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Script de test pour l'index inversé attributs -> paires de numéros
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+import time
+from sqlalchemy import text
+from app.database.connection import get_db
+from app.services.number_generator_service import NumberGeneratorService
+
+def test_index_matches_sql():
+    """Les correspondances de l'index doivent être celles de la requête SQL"""
+
+    print("=== TEST INDEX / SQL ===")
+    db = next(get_db())
+
+    try:
+        rows = db.execute(text("""
+            SELECT c.combination_id, c.forme, c.engine, c.beastie, c.tome, p.parite, u.unidos, c.chip
+            FROM combinations c
+            LEFT JOIN parite p ON c.parite_id = p.parite_id
+            LEFT JOIN unidos u ON c.unidos_id = u.unidos_id
+            WHERE c.univers = 'mundo'
+            AND c.num1 IS NOT NULL AND c.num2 IS NOT NULL
+            ORDER BY c.combination_id DESC
+        """)).fetchall()
+
+        if not rows:
+            print("⚠️ Aucune combinaison pour mundo")
+            return True
+
+        attribute_types = NumberGeneratorService.ATTRIBUTE_TYPES
+        random.seed(42)
+
+        for _ in range(50):
+            row = random.choice(rows)
+            attributes = {
+                attr: row[j + 1] for j, attr in enumerate(attribute_types)
+                if row[j + 1] is not None and random.random() < 0.5
+            }
+            if not attributes:
+                continue
+
+            expected = [
+                r[0] for r in rows
+                if all(str(r[attribute_types.index(attr) + 1]) == str(value) for attr, value in attributes.items())
+            ][:NumberGeneratorService.MAX_MATCHES]
+
+            result = NumberGeneratorService.convert_attributes_to_numbers(db, attributes, "mundo")
+            found = [pair["combination_id"] for pair in result["number_pairs"]]
+
+            assert result["method"] == "historical_lookup"
+            assert found == expected, f"{attributes}: {found} != {expected}"
+
+        print("  50 recherches identiques à la requête SQL: ✅")
+
+        # Valeur inconnue : repli sur les combinaisons les plus proches
+        attributes = {"forme": rows[0][1], "tome": "__inconnu__"}
+        result = NumberGeneratorService.convert_attributes_to_numbers(db, attributes, "mundo")
+        print(f"  Repli similaire: {result['method']} ({result['total_found']} paires)")
+        assert result["method"] == "similar_attributes"
+        assert all(pair["matching_attributes"] == ["forme"] for pair in result["number_pairs"])
+
+    finally:
+        db.close()
+
+    return True
+
+def test_unindexed_attributes():
+    """Les attributs hors index restreignent la recherche au lieu d'être ignorés"""
+
+    print("\n=== TEST ATTRIBUTS HORS INDEX ===")
+    db = next(get_db())
+
+    try:
+        row = db.execute(text("""
+            SELECT forme, denomination FROM combinations
+            WHERE univers = 'mundo' AND forme IS NOT NULL AND denomination IS NOT NULL
+            AND num1 IS NOT NULL AND num2 IS NOT NULL
+            ORDER BY combination_id DESC
+        """)).first()
+
+        if row is None:
+            print("⚠️ Aucune combinaison avec dénomination pour mundo")
+            return True
+
+        # Colonne de combinations hors index : filtrée en SQL
+        attributes = {"forme": row[0], "denomination": row[1]}
+        expected = [r[0] for r in db.execute(text("""
+            SELECT combination_id FROM combinations
+            WHERE univers = 'mundo' AND forme = :forme AND denomination = :denomination
+            AND num1 IS NOT NULL AND num2 IS NOT NULL
+            ORDER BY combination_id DESC
+        """), attributes).fetchall()][:NumberGeneratorService.MAX_MATCHES]
+
+        result = NumberGeneratorService.convert_attributes_to_numbers(db, attributes, "mundo")
+        found = [pair["combination_id"] for pair in result["number_pairs"]]
+        assert result["method"] == "historical_lookup"
+        assert found == expected, f"{found} != {expected}"
+        print(f"  Dénomination filtrée en SQL ({len(found)} paires): ✅")
+
+        # Attribut inconnu : aucune correspondance exacte, signalé dans la réponse
+        attributes = {"forme": row[0], "pas_une_colonne": "x"}
+        result = NumberGeneratorService.convert_attributes_to_numbers(db, attributes, "mundo")
+        assert result["method"] == "similar_attributes"
+        assert result["unknown_attributes"] == ["pas_une_colonne"]
+        assert all(pair["matching_attributes"] == ["forme"] for pair in result["number_pairs"])
+        print("  Attribut inconnu signalé, pas de correspondance élargie: ✅")
+
+    finally:
+        db.close()
+
+    return True
+
+def test_batch_conversion():
+    """Conversion d'un lot sans requête par combinaison"""
+
+    print("\n=== TEST CONVERSION PAR LOT ===")
+    db = next(get_db())
+
+    try:
+        index = NumberGeneratorService.get_index(db, "mundo")
+        combinations = [
+            {"id": f"combo_{i}", "attributes": {"forme": value}}
+            for i, value in enumerate(list(index.postings.get("forme", {}))[:5] * 100)
+        ]
+
+        start = time.perf_counter()
+        result = NumberGeneratorService.batch_generate_numbers(db, combinations, "mundo")
+        elapsed = (time.perf_counter() - start) * 1000
+
+        print(f"  {result['successful_conversions']}/{result['total_combinations']} conversions en {elapsed:.1f} ms")
+        assert result["failed_conversions"] == 0
+
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_index_matches_sql()
+    test_unindexed_attributes()
+    test_batch_conversion()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Script de test pour l'inférence LSTM en NumPy (parité avec Keras)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import tempfile
+import time
+import numpy as np
+from app.ml import registry
+from app.ml.models import numpy_lstm
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _random_export(path, num_classes=7, embedding=5, units=(16, 8), dense=6):
+    """Modèle exporté aléatoire : Embedding -> LSTM -> LSTM -> Dense relu -> Dense softmax"""
+    rng = np.random.default_rng(11)
+    arrays = {"0_embeddings": rng.normal(size=(num_classes, embedding))}
+    layers = [{"type": "embedding"}]
+    inputs = embedding
+    for index, size in enumerate(units, start=1):
+        arrays[f"{index}_kernel"] = rng.normal(scale=0.5, size=(inputs, 4 * size))
+        arrays[f"{index}_recurrent_kernel"] = rng.normal(scale=0.5, size=(size, 4 * size))
+        arrays[f"{index}_bias"] = rng.normal(scale=0.1, size=4 * size)
+        layers.append({
+            "type": "lstm", "units": size, "return_sequences": index < len(units),
+            "activation": "tanh", "recurrent_activation": "sigmoid"
+        })
+        inputs = size
+    for index, (size, activation) in enumerate([(dense, "relu"), (num_classes, "softmax")], start=len(layers)):
+        arrays[f"{index}_kernel"] = rng.normal(size=(inputs, size))
+        arrays[f"{index}_bias"] = rng.normal(size=size)
+        layers.append({"type": "dense", "activation": activation})
+        inputs = size
+
+    arrays = {name: value.astype(np.float32) for name, value in arrays.items()}
+    arrays["architecture"] = np.array(json.dumps({"format_version": numpy_lstm.FORMAT_VERSION, "layers": layers}))
+    arrays["classes"] = np.array([f"valeur_{i}" for i in range(num_classes)])
+    np.savez(path, **arrays)
+    return arrays
+
+def _reference_forward(arrays, sequence):
+    """Passe avant d'une séquence, pas à pas et en float64 (formules Keras)"""
+    x = arrays["0_embeddings"].astype(np.float64)[sequence]
+    for index in (1, 2):
+        W, U, b = (arrays[f"{index}_{name}"].astype(np.float64) for name in ("kernel", "recurrent_kernel", "bias"))
+        units = U.shape[0]
+        h, c, outputs = np.zeros(units), np.zeros(units), []
+        for x_t in x:
+            z = x_t @ W + h @ U + b
+            i, f = _sigmoid(z[:units]), _sigmoid(z[units:2 * units])
+            g, o = np.tanh(z[2 * units:3 * units]), _sigmoid(z[3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            outputs.append(h)
+        x = np.array(outputs)
+    x = np.maximum(x[-1] @ arrays["3_kernel"] + arrays["3_bias"], 0)
+    logits = x @ arrays["4_kernel"] + arrays["4_bias"]
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+def test_forward_matches_reference():
+    """La passe avant vectorisée (mmap) doit égaler le calcul pas à pas"""
+
+    print("=== TEST PASSE AVANT NUMPY ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "modele.npz")
+        arrays = _random_export(path)
+
+        start = time.perf_counter()
+        model = numpy_lstm.NumpyLSTM.load(path)
+        print(f"  Chargement mmap: {(time.perf_counter() - start) * 1000:.2f} ms")
+        assert isinstance(model.arrays["1_kernel"], np.memmap)
+        assert model.classes[0] == "valeur_0"
+
+        sequences = np.random.default_rng(2).integers(0, 7, size=(32, 10))
+        probabilities = model.predict_proba(sequences)
+        expected = np.array([_reference_forward(arrays, sequence) for sequence in sequences])
+        assert np.allclose(probabilities, expected, atol=1e-5)
+        print(f"  Écart max avec la référence: {np.abs(probabilities - expected).max():.2e} ✅")
+
+        in_memory = numpy_lstm.NumpyLSTM.load(path, mmap=False)
+        assert np.array_equal(in_memory.predict_proba(sequences), probabilities)
+        print("  Lecture mmap identique à la lecture en mémoire: ✅")
+
+def test_keras_parity():
+    """Un modèle construit par LSTMPredictor doit donner les mêmes sorties après export"""
+
+    print("\n=== TEST PARITÉ KERAS ===")
+    if not registry.is_available("lstm"):
+        print("⚠️ TensorFlow non installé (requirements-ml.txt), test ignoré")
+        return True
+
+    LSTMPredictor = registry.get_backend("lstm")
+    predictor = LSTMPredictor("forme", "mundo")
+    num_classes = 12
+    model = predictor.build_model(num_classes)
+    sequences = np.random.default_rng(4).integers(0, num_classes, size=(64, predictor.sequence_length))
+    expected = model.predict(sequences, verbose=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "forme.npz")
+        numpy_lstm.export_keras_model(model, [f"v{i}" for i in range(num_classes)], path)
+        probabilities = numpy_lstm.NumpyLSTM.load(path).predict_proba(sequences)
+
+    assert probabilities.shape == expected.shape
+    assert np.allclose(probabilities, expected, atol=1e-5)
+    assert np.array_equal(probabilities.argmax(axis=1), expected.argmax(axis=1))
+    print(f"  Écart max avec Keras: {np.abs(probabilities - expected).max():.2e} ✅")
+    return True
+
+if __name__ == "__main__":
+    test_forward_matches_reference()
+    test_keras_parity()
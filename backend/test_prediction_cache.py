@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le cache des prédictions LSTM
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+from app.services.prediction_cache import PredictionCache
+
+def test_prediction_cache():
+    """Clés versionnées, remplacement des anciennes versions et borne LRU"""
+
+    print("=== TEST CACHE DES PRÉDICTIONS ===")
+    PredictionCache.clear()
+    start = PredictionCache.stats()
+
+    assert PredictionCache.get("mundo", "forme", "v1", 100) is None
+    PredictionCache.put("mundo", "forme", "v1", 100, {"predictions": ["carre"]})
+    assert PredictionCache.get("mundo", "forme", "v1", 100) == {"predictions": ["carre"]}
+    print("  Miss puis hit sur la même clé: ✅")
+
+    # Nouvelle combinaison ou modèle réentraîné : nouvelle clé, ancienne retirée
+    assert PredictionCache.get("mundo", "forme", "v1", 101) is None
+    PredictionCache.put("mundo", "forme", "v1", 101, {"predictions": ["cercle"]})
+    PredictionCache.put("mundo", "forme", "v2", 101, {"predictions": ["triangle"]})
+    assert PredictionCache.stats()["size"] == 1
+    print("  Versions antérieures remplacées: ✅")
+
+    max_entries = PredictionCache.MAX_ENTRIES
+    PredictionCache.MAX_ENTRIES = 3
+    try:
+        for attribute in ("engine", "tome", "chip"):
+            PredictionCache.put("mundo", attribute, "v1", 101, {"attribute": attribute})
+        assert PredictionCache.get("mundo", "forme", "v2", 101) is None  # Le plus ancien est évincé
+        assert PredictionCache.get("mundo", "chip", "v1", 101) == {"attribute": "chip"}
+    finally:
+        PredictionCache.MAX_ENTRIES = max_entries
+    print("  Éviction LRU: ✅")
+
+    stats = PredictionCache.stats()
+    assert stats["hits"] - start["hits"] == 2
+    assert stats["misses"] - start["misses"] == 3
+    print(f"  Statistiques: {stats} ✅")
+
+    PredictionCache.clear()
+    return True
+
+def test_prediction_warmup():
+    """Réchauffages sérialisés sur un worker, ignorés si rien n'a changé"""
+
+    from app.services.ml_service import MLService
+
+    print("\n=== TEST RÉCHAUFFAGE DU CACHE ===")
+    state = {"last_id": 100, "version": "v1"}
+    threads = []
+    started, release = threading.Event(), threading.Event()
+
+    def predict_all_lstm(db, universe):
+        threads.append(threading.current_thread().name)
+        started.set()
+        assert release.wait(5)
+        return {}
+
+    originals = (MLService.predict_all_lstm, MLService.model_version, MLService.last_combination_id)
+    MLService.predict_all_lstm = staticmethod(predict_all_lstm)
+    MLService.model_version = staticmethod(lambda attribute, universe="mundo": state["version"] if universe == "mundo" else None)
+    MLService.last_combination_id = staticmethod(lambda db, universe="mundo": state["last_id"])
+    MLService._warmed_states.clear()
+    try:
+        # Rafale de tirages : un réchauffage en cours, un seul en attente
+        running = MLService.warm_prediction_cache_async(["mundo"])
+        assert started.wait(5)
+        queued = MLService.warm_prediction_cache_async(["mundo"])
+        assert queued is not None
+        assert MLService.warm_prediction_cache_async(["mundo"]) is None
+        release.set()
+        assert running.result(5)["warmed_universes"] == ["mundo"]
+        assert queued.result(5)["unchanged_universes"] == ["mundo"]
+        assert len(threads) == 1
+        print("  Rafale coalescée, réchauffage inchangé ignoré: ✅")
+
+        # Nouvelle combinaison puis modèle réentraîné : réchauffage refait
+        state["last_id"] = 101
+        assert MLService.warm_prediction_cache_async(["mundo"]).result(5)["warmed_universes"] == ["mundo"]
+        state["version"] = "v2"
+        assert MLService.warm_prediction_cache_async(["mundo"]).result(5)["warmed_universes"] == ["mundo"]
+        assert MLService.warm_prediction_cache_async(["mundo", "fruity"]).result(5)["warmed_universes"] == []
+        assert len(threads) == 3 and all(name.startswith("prediction-cache-warmup") for name in threads)
+        print("  Réchauffage refait sur changement, sur un seul worker: ✅")
+    finally:
+        release.set()
+        MLService.predict_all_lstm, MLService.model_version, MLService.last_combination_id = (
+            staticmethod(originals[0]), staticmethod(originals[1]), staticmethod(originals[2])
+        )
+        MLService._warmed_states.clear()
+
+    return True
+
+if __name__ == "__main__":
+    test_prediction_cache()
+    test_prediction_warmup()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Script de test pour la construction des séquences LSTM (fenêtres sans copie)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import numpy as np
+from sqlalchemy import text
+from app.database.connection import get_db
+from app.ml.sequence_dataset import SequenceDataset
+
+def test_windows_match_loop():
+    """Les vues glissantes doivent égaler les séquences construites en boucle"""
+
+    print("=== TEST FENÊTRES GLISSANTES ===")
+    codes = np.random.default_rng(3).integers(0, 12, size=50000).astype(np.int32)
+    sequence_length = 10
+
+    start = time.perf_counter()
+    X_loop, y_loop = [], []
+    for i in range(len(codes) - sequence_length):
+        X_loop.append(codes[i:(i + sequence_length)])
+        y_loop.append(codes[i + sequence_length])
+    X_loop, y_loop = np.array(X_loop), np.array(y_loop)
+    loop_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    X, y = SequenceDataset.windows(codes, sequence_length)
+    view_ms = (time.perf_counter() - start) * 1000
+
+    print(f"  Boucle: {loop_ms:.1f} ms - Vues: {view_ms:.3f} ms")
+    assert np.array_equal(X, X_loop) and np.array_equal(y, y_loop)
+    assert np.shares_memory(X, codes) and np.shares_memory(y, codes)
+    print("  Séquences identiques, sans copie: ✅")
+
+    # Les lots couvrent chaque échantillon une seule fois
+    seen = np.concatenate([batch_y for _, batch_y in SequenceDataset.batches(X, y, batch_size=256, seed=1)])
+    assert np.array_equal(np.sort(seen), np.sort(y))
+    print("  Lots complets: ✅")
+
+def test_fetch_codes():
+    """L'encodage en flux doit suivre l'ordre trié des valeurs (comme LabelEncoder)"""
+
+    print("\n=== TEST LECTURE EN FLUX ===")
+    db = next(get_db())
+
+    try:
+        rows = db.execute(text(
+            SequenceDataset.attribute_query("forme")
+        ), {"universe": "mundo"}).fetchall()
+        values = [row[0] for row in rows]
+
+        if not values:
+            print("⚠️ Aucune combinaison pour mundo")
+            return True
+
+        codes, classes, last_id = SequenceDataset.fetch_codes(db, "forme", "mundo")
+        assert classes == sorted(set(values))
+        assert [classes[c] for c in codes] == values
+        assert last_id == rows[-1][1]
+        print(f"  {len(codes)} valeurs encodées, {len(classes)} classes: ✅")
+
+        recent, _, recent_last_id = SequenceDataset.fetch_codes(db, "forme", "mundo", max_rows=100)
+        assert [classes[c] for c in recent] == values[-100:]
+        assert recent_last_id == last_id
+        print("  max_rows garde les plus récentes dans l'ordre: ✅")
+
+        # Reprise : lignes après un point de reprise, encodées avec un vocabulaire existant
+        checkpoint = rows[-50][1]
+        vocabulary = list(reversed(classes))
+        new_codes, new_classes, _ = SequenceDataset.fetch_codes(
+            db, "forme", "mundo", classes=vocabulary, after_id=checkpoint
+        )
+        assert new_classes == vocabulary
+        assert [vocabulary[c] for c in new_codes] == values[-49:]
+        print("  Lignes postérieures au point de reprise, vocabulaire conservé: ✅")
+
+    finally:
+        db.close()
+
+    return True
+
+def test_fetch_attributes():
+    """Une lecture commune doit donner les mêmes séquences que fetch_codes par attribut"""
+
+    print("\n=== TEST LECTURE MULTI-ATTRIBUTS ===")
+    db = next(get_db())
+    attributes = SequenceDataset.DIRECT_ATTRIBUTES + list(SequenceDataset.JOINED_ATTRIBUTES)
+
+    try:
+        start = time.perf_counter()
+        datasets = SequenceDataset.fetch_attributes(db, attributes, "mundo")
+        shared_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for attribute in attributes:
+            codes, classes, last_id = SequenceDataset.fetch_codes(db, attribute, "mundo")
+            shared_codes, shared_classes, shared_last_id = datasets[attribute]
+            assert np.array_equal(shared_codes, codes), attribute
+            assert shared_classes == classes and shared_last_id == last_id, attribute
+        separate_ms = (time.perf_counter() - start) * 1000
+
+        print(f"  Lecture commune: {shared_ms:.1f} ms - Lectures séparées: {separate_ms:.1f} ms")
+        print(f"  {len(attributes)} séquences identiques: ✅")
+
+        codes, classes, _ = datasets["forme"]
+        if classes:
+            target = list(reversed(classes))
+            reencoded = SequenceDataset.reencode(codes, classes, target)
+            assert [target[c] for c in reencoded] == [classes[c] for c in codes]
+            print("  Réencodage dans le vocabulaire d'un modèle: ✅")
+
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_windows_match_loop()
+    test_fetch_codes()
+    test_fetch_attributes()
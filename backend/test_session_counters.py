@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Script de test pour les compteurs et le tirage actuel des sessions
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+from app.database.connection import get_db, Base, engine
+from app.models.session import WorkSession, SessionDraw
+from app.services.session_service import SessionService
+
+def test_delete_then_save():
+    """Après suppression d'un tirage, la saisie avance toujours jusqu'au dernier"""
+
+    Base.metadata.create_all(bind=engine, tables=[WorkSession.__table__, SessionDraw.__table__])
+    db = next(get_db())
+
+    print("=== TEST COMPTEURS DE SESSION ===")
+    session = SessionService.create_work_session(
+        db, "test_compteurs", "test", 5, 5, [], datetime(2024, 1, 1)
+    )
+    try:
+        draws = {draw.draw_number: draw for draw in db.query(SessionDraw).filter(SessionDraw.session_id == session.id)}
+        assert sorted(draws) == [1, 2, 3, 4, 5]
+
+        # Suppression au milieu de la session : 4 tirages restants
+        assert SessionService.delete_draw(db, session.id, draws[3].id) == 3
+
+        for draw_number in (1, 2, 4):
+            SessionService.save_draw_numbers(db, session.id, draw_number, [1, 2, 3, 4, 5])
+            db.refresh(session)
+            print(f"  Tirage {draw_number} saisi -> tirage actuel {session.current_draw}")
+
+        assert session.current_draw == 5
+        assert session.total_draws == 4
+        assert session.completed_draws == 3
+        print("  Tirage actuel avancé jusqu'au dernier tirage: ✅")
+
+        # Dernier tirage : le tirage actuel ne dépasse pas la session
+        SessionService.save_draw_numbers(db, session.id, 5, [1, 2, 3, 4, 5])
+        db.refresh(session)
+        assert session.current_draw == 5 and session.completed_draws == 4
+
+        # Les compteurs incrémentaux correspondent au recalcul complet
+        SessionService.recompute_counters(db, session.id)
+        db.refresh(session)
+        assert (session.total_draws, session.completed_draws, session.no_draw_count) == (4, 4, 0)
+        print("  Compteurs identiques au recalcul: ✅")
+    finally:
+        db.query(SessionDraw).filter(SessionDraw.session_id == session.id).delete(synchronize_session=False)
+        db.query(WorkSession).filter(WorkSession.id == session.id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    test_delete_then_save()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le service des statiques précompressés
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.static_files import PrecompressedStaticFiles, ApiGZipMiddleware, IMMUTABLE_CACHE_CONTROL, accepted_encodings
+
+def test_static_files():
+    """Variante gzip, ETag/304, Cache-Control et GZip des réponses /api"""
+
+    print("=== TEST STATIQUES PRÉCOMPRESSÉS ===")
+    with tempfile.TemporaryDirectory() as root:
+        frontend = os.path.join(root, "frontend")
+        os.makedirs(frontend)
+        script = "console.log('eazzylotto');\n" * 200
+        with open(os.path.join(frontend, "app.js"), "w") as f:
+            f.write(script)
+        with open(os.path.join(frontend, "vendor.3f9c2a1b.js"), "w") as f:
+            f.write(script)
+
+        app = FastAPI()
+        app.add_middleware(ApiGZipMiddleware, minimum_size=1000)
+
+        @app.get("/api/big")
+        async def big():
+            return {"values": list(range(1000))}
+
+        app.mount("/", PrecompressedStaticFiles(directory=frontend, cache_dir=os.path.join(root, "cache")), name="frontend")
+        client = TestClient(app)
+
+        response = client.get("/app.js", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == script
+        assert response.headers["cache-control"] == "no-cache"
+        assert response.headers["vary"] == "Accept-Encoding"
+        print(f"  Variante gzip servie ({response.headers['content-length']} octets): ✅")
+
+        plain = client.get("/app.js", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["etag"] == response.headers["etag"]
+        print("  Sans Accept-Encoding: fichier original, même ETag: ✅")
+
+        for header in ("gzip;q=0", "br;q=0, gzip;q=0", "*;q=0", "gzip;q=0, *"):
+            refused = client.get("/app.js", headers={"Accept-Encoding": header})
+            assert refused.headers.get("content-encoding") in (None, "br"), header
+            assert refused.headers.get("content-encoding") != "gzip" and refused.text == script
+        weighted = client.get("/app.js", headers={"Accept-Encoding": "br;q=0.1, gzip;q=0.8"})
+        assert weighted.headers["content-encoding"] == "gzip"
+        print("  Poids q respectés (q=0 refusé): ✅")
+
+        cached = client.get("/app.js", headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304 and cached.content == b""
+        print("  If-None-Match: 304 sans corps: ✅")
+
+        fingerprinted = client.get("/vendor.3f9c2a1b.js")
+        assert fingerprinted.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        print("  Fichier empreinté: cache immutable: ✅")
+
+        # Fichier modifié après le démarrage : nouvel ETag, variante régénérée
+        with open(os.path.join(frontend, "app.js"), "w") as f:
+            f.write(script * 2)
+        os.utime(os.path.join(frontend, "app.js"), (0, 1))
+        updated = client.get("/app.js", headers={"Accept-Encoding": "gzip"})
+        assert updated.headers["etag"] != response.headers["etag"]
+        assert updated.text == script * 2
+        print("  Fichier modifié: ETag et variante mis à jour: ✅")
+
+        api = client.get("/api/big", headers={"Accept-Encoding": "gzip"})
+        assert api.headers["content-encoding"] == "gzip"
+        assert api.json()["values"][-1] == 999
+        print("  Réponse /api compressée: ✅")
+
+    return True
+
+def test_accepted_encodings():
+    """Analyse des poids q de l'en-tête Accept-Encoding"""
+
+    assert accepted_encodings("gzip, br;q=0.5, identity;q=0") == {"gzip": 1.0, "br": 0.5, "identity": 0.0}
+    assert accepted_encodings("GZIP ; Q=0") == {"gzip": 0.0}
+    assert accepted_encodings("br;q=abc") == {"br": 0.0}
+    assert accepted_encodings("") == {}
+    return True
+
+if __name__ == "__main__":
+    test_static_files()
+    test_accepted_encodings()
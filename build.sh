@@ -1,2 +1,3 @@
 #!/bin/bash
-pip install -r backend/requirements.txt
\ No newline at end of file
+pip install -r backend/requirements.txt
+python backend/precompress_static.py
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 import sqlite3
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from app.database.universe_tables import normalize_chip_number
 
 db_path = "backend/data/katula.db"
 
@@ -15,6 +19,10 @@ if os.path.exists(db_path):
     tomes = ["tome1", "tome2", "tome3", "tome4"]
     alphas = ["a", "b", "c", "d"]
     
+    # chip_number renseigné dès l'insertion si la colonne existe (base migrée)
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(combinations)")}
+    with_chip_number = "chip_number" in columns
+    
     print("Ajout des données pour chips 9-48...")
     
     for chip in range(9, 49):  # Chips 9 à 48
@@ -27,11 +35,18 @@ if os.path.exists(db_path):
             petique = petiques[i % 4]
             tome = tomes[i % 4]
             
-            cursor.execute("""
-                INSERT INTO combinations 
-                (univers, forme, chip, denomination, num1, num2, alpha_ranking, granque_name, petique, tome)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, ("mundo", forme, chip, denomination, num1, num2, alpha, granque, petique, tome))
+            if with_chip_number:
+                cursor.execute("""
+                    INSERT INTO combinations 
+                    (univers, forme, chip, chip_number, denomination, num1, num2, alpha_ranking, granque_name, petique, tome)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, ("mundo", forme, chip, normalize_chip_number(chip), denomination, num1, num2, alpha, granque, petique, tome))
+            else:
+                cursor.execute("""
+                    INSERT INTO combinations 
+                    (univers, forme, chip, denomination, num1, num2, alpha_ranking, granque_name, petique, tome)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, ("mundo", forme, chip, denomination, num1, num2, alpha, granque, petique, tome))
     
     conn.commit()
     